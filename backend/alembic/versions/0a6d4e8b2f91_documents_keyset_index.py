@@ -0,0 +1,54 @@
+"""documents: índice (user_id, created_at DESC, id DESC) para listar por keyset
+
+Revision ID: 0a6d4e8b2f91
+Revises: f1b83c6e0d25
+Create Date: 2026-10-17 19:12:36.447803
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0a6d4e8b2f91"
+down_revision: Union[str, Sequence[str], None] = "f1b83c6e0d25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+INDEX = f"ix_{SCHEMA}_documents_user_created_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (created_at, id) < (?, ?) no encuentra filas con created_at NULL: las
+    # dejamos al final del listado (epoch) y prohibimos NULL de ahora en más.
+    #
+    # SET NOT NULL a secas escanea la tabla con ACCESS EXCLUSIVE (bloquea
+    # hasta las lecturas). Con un CHECK ya validado, Postgres (12+) se saltea
+    # el escaneo: el CHECK NOT VALID es instantáneo (y frena NULLs nuevos
+    # antes del UPDATE) y VALIDATE sólo toma SHARE UPDATE EXCLUSIVE. Cada paso
+    # en su propia transacción (autocommit): dentro de una sola, el ACCESS
+    # EXCLUSIVE del ADD CONSTRAINT duraría también el UPDATE y el VALIDATE.
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            ALTER TABLE {SCHEMA}.documents
+            ADD CONSTRAINT documents_created_at_not_null CHECK (created_at IS NOT NULL) NOT VALID;
+        """)
+        op.execute(f"UPDATE {SCHEMA}.documents SET created_at = to_timestamp(0) WHERE created_at IS NULL;")
+        op.execute(f"ALTER TABLE {SCHEMA}.documents VALIDATE CONSTRAINT documents_created_at_not_null;")
+        op.execute(f"ALTER TABLE {SCHEMA}.documents ALTER COLUMN created_at SET NOT NULL;")
+        op.execute(f"ALTER TABLE {SCHEMA}.documents DROP CONSTRAINT documents_created_at_not_null;")
+
+    # CONCURRENTLY: no bloquea escrituras en documents mientras se construye
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX}
+            ON {SCHEMA}.documents (user_id, created_at DESC, id DESC);
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.{INDEX};")
+    op.execute(f"ALTER TABLE {SCHEMA}.documents ALTER COLUMN created_at DROP NOT NULL;")
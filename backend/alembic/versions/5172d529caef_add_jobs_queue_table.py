@@ -0,0 +1,71 @@
+"""add jobs table (cola de trabajos de IA)
+
+Revision ID: 5172d529caef
+Revises: 36fd62af36de
+Create Date: 2026-10-17 09:12:41.318204
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5172d529caef"
+down_revision: Union[str, Sequence[str], None] = "36fd62af36de"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), server_default="pending", nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("params", postgresql.JSONB(astext_type=sa.Text()), server_default="{}", nullable=False),
+        sa.Column("result", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_attempts", sa.Integer(), server_default="3", nullable=False),
+        sa.Column("run_after", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("locked_by", sa.String(length=100), nullable=True),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.CheckConstraint(
+            "status IN ('pending', 'running', 'done', 'failed')",
+            name="jobs_status_valid",
+        ),
+        sa.ForeignKeyConstraint(["user_id"], [f"{SCHEMA}.users.id"]),
+        sa.ForeignKeyConstraint(["document_id"], [f"{SCHEMA}.documents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        schema=SCHEMA,
+    )
+    op.create_index("ix_studyforge_jobs_user_id", "jobs", ["user_id"], unique=False, schema=SCHEMA)
+    op.create_index("ix_studyforge_jobs_document_id", "jobs", ["document_id"], unique=False, schema=SCHEMA)
+    # Índice para el "claim" de los workers: WHERE status='pending' AND run_after <= now()
+    op.create_index("ix_studyforge_jobs_status_run_after", "jobs", ["status", "run_after"], unique=False, schema=SCHEMA)
+    # Dedupe de enqueue a prueba de carreras: un solo job activo igual por usuario
+    op.create_index(
+        "uq_studyforge_jobs_active",
+        "jobs",
+        ["user_id", "kind", "document_id", "params"],
+        unique=True,
+        schema=SCHEMA,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_studyforge_jobs_active", table_name="jobs", schema=SCHEMA)
+    op.drop_index("ix_studyforge_jobs_status_run_after", table_name="jobs", schema=SCHEMA)
+    op.drop_index("ix_studyforge_jobs_document_id", table_name="jobs", schema=SCHEMA)
+    op.drop_index("ix_studyforge_jobs_user_id", table_name="jobs", schema=SCHEMA)
+    op.drop_table("jobs", schema=SCHEMA)
@@ -0,0 +1,67 @@
+"""add question_bank (banco de preguntas por documento)
+
+Revision ID: 8b3e1f0c2a77
+Revises: 5172d529caef
+Create Date: 2026-10-17 11:40:05.512930
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8b3e1f0c2a77"
+down_revision: Union[str, Sequence[str], None] = "5172d529caef"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "question_bank",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("options_json", sa.Text(), nullable=False),
+        sa.Column("answer_index", sa.Integer(), nullable=False),
+        sa.Column("explanation", sa.Text(), nullable=True),
+        sa.Column("text_hash", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["document_id"], [f"{SCHEMA}.documents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("document_id", "text_hash", name="uq_question_bank_document_text"),
+        schema=SCHEMA,
+    )
+    op.create_index("ix_studyforge_question_bank_document_id", "question_bank", ["document_id"], unique=False, schema=SCHEMA)
+
+    op.add_column(
+        "quiz_questions",
+        sa.Column("bank_question_id", sa.Integer(), nullable=True),
+        schema=SCHEMA,
+    )
+    op.create_foreign_key(
+        "quiz_questions_bank_question_id_fkey",
+        "quiz_questions",
+        "question_bank",
+        ["bank_question_id"],
+        ["id"],
+        source_schema=SCHEMA,
+        referent_schema=SCHEMA,
+        ondelete="SET NULL",
+    )
+    op.create_index(
+        "ix_studyforge_quiz_questions_bank_question_id", "quiz_questions", ["bank_question_id"], unique=False, schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_studyforge_quiz_questions_bank_question_id", table_name="quiz_questions", schema=SCHEMA)
+    op.drop_constraint("quiz_questions_bank_question_id_fkey", "quiz_questions", schema=SCHEMA, type_="foreignkey")
+    op.drop_column("quiz_questions", "bank_question_id", schema=SCHEMA)
+    op.drop_index("ix_studyforge_question_bank_document_id", table_name="question_bank", schema=SCHEMA)
+    op.drop_table("question_bank", schema=SCHEMA)
@@ -0,0 +1,42 @@
+"""quiz options_json: TEXT -> JSONB (quiz_questions y question_bank)
+
+Revision ID: c41d7a9e5b10
+Revises: 8b3e1f0c2a77
+Create Date: 2026-10-17 13:05:27.104388
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41d7a9e5b10"
+down_revision: Union[str, Sequence[str], None] = "8b3e1f0c2a77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+TABLES = ("quiz_questions", "question_bank")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        # Filas viejas: siempre se escribieron con json.dumps; vacías → []
+        op.execute(f"""
+            ALTER TABLE {SCHEMA}.{table}
+            ALTER COLUMN options_json TYPE JSONB
+            USING CASE
+                WHEN options_json IS NULL OR btrim(options_json) = '' THEN '[]'::jsonb
+                ELSE options_json::jsonb
+            END;
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"""
+            ALTER TABLE {SCHEMA}.{table}
+            ALTER COLUMN options_json TYPE TEXT
+            USING options_json::text;
+        """)
@@ -0,0 +1,33 @@
+"""quiz_results: respuestas por pregunta (JSONB) e índice por usuario/fecha
+
+Revision ID: d7e2a4f9c318
+Revises: c41d7a9e5b10
+Create Date: 2026-10-17 15:41:09.552120
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7e2a4f9c318"
+down_revision: Union[str, Sequence[str], None] = "c41d7a9e5b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"ALTER TABLE {SCHEMA}.quiz_results ADD COLUMN IF NOT EXISTS answers JSONB;")
+    # Historial de un usuario, más reciente primero
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_{SCHEMA}_quiz_results_user_created
+        ON {SCHEMA}.quiz_results (user_id, created_at DESC);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP INDEX IF EXISTS {SCHEMA}.ix_{SCHEMA}_quiz_results_user_created;")
+    op.execute(f"ALTER TABLE {SCHEMA}.quiz_results DROP COLUMN IF EXISTS answers;")
@@ -0,0 +1,75 @@
+"""quiz_stats y quiz_question_stats: contadores incrementales de intentos
+
+Revision ID: e5a9c2d41b73
+Revises: d7e2a4f9c318
+Create Date: 2026-10-17 16:22:48.310274
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a9c2d41b73"
+down_revision: Union[str, Sequence[str], None] = "d7e2a4f9c318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.quiz_stats (
+            quiz_id INTEGER PRIMARY KEY
+                REFERENCES {SCHEMA}.quizzes(id) ON DELETE CASCADE,
+            attempts BIGINT NOT NULL DEFAULT 0,
+            score_sum BIGINT NOT NULL DEFAULT 0,
+            total_sum BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ DEFAULT now()
+        );
+    """)
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.quiz_question_stats (
+            question_id INTEGER PRIMARY KEY
+                REFERENCES {SCHEMA}.quiz_questions(id) ON DELETE CASCADE,
+            quiz_id INTEGER NOT NULL
+                REFERENCES {SCHEMA}.quizzes(id) ON DELETE CASCADE,
+            attempts BIGINT NOT NULL DEFAULT 0,
+            correct BIGINT NOT NULL DEFAULT 0
+        );
+    """)
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_{SCHEMA}_quiz_question_stats_quiz_id
+        ON {SCHEMA}.quiz_question_stats (quiz_id);
+    """)
+
+    # Backfill (única vez) desde los intentos ya guardados
+    op.execute(f"""
+        INSERT INTO {SCHEMA}.quiz_stats (quiz_id, attempts, score_sum, total_sum)
+        SELECT quiz_id, count(*), sum(score), sum(total)
+        FROM {SCHEMA}.quiz_results
+        GROUP BY quiz_id
+        ON CONFLICT (quiz_id) DO NOTHING;
+    """)
+    # answers[i] corresponde a la i-ésima pregunta del quiz ordenada por id
+    op.execute(f"""
+        INSERT INTO {SCHEMA}.quiz_question_stats (question_id, quiz_id, attempts, correct)
+        SELECT qq.id, qq.quiz_id, count(*),
+               count(*) FILTER (WHERE r.answers ->> (qq.rn - 1)::int = qq.answer_index::text)
+        FROM {SCHEMA}.quiz_results r
+        JOIN (
+            SELECT id, quiz_id, answer_index,
+                   row_number() OVER (PARTITION BY quiz_id ORDER BY id) AS rn
+            FROM {SCHEMA}.quiz_questions
+        ) qq ON qq.quiz_id = r.quiz_id
+        WHERE r.answers IS NOT NULL
+        GROUP BY qq.id, qq.quiz_id
+        ON CONFLICT (question_id) DO NOTHING;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP TABLE IF EXISTS {SCHEMA}.quiz_question_stats;")
+    op.execute(f"DROP TABLE IF EXISTS {SCHEMA}.quiz_stats;")
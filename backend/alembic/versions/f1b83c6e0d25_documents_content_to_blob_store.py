@@ -0,0 +1,99 @@
+"""documents: cuerpo al blob store (content_hash/size/preview, content nullable)
+
+Revision ID: f1b83c6e0d25
+Revises: e5a9c2d41b73
+Create Date: 2026-10-17 18:03:51.906127
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.services.blob_store import get_blob_store, store_document_text
+
+# revision identifiers, used by Alembic.
+revision: str = "f1b83c6e0d25"
+down_revision: Union[str, Sequence[str], None] = "e5a9c2d41b73"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "studyforge"
+BATCH = 200
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"""
+        ALTER TABLE {SCHEMA}.documents
+            ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64),
+            ADD COLUMN IF NOT EXISTS content_size BIGINT,
+            ADD COLUMN IF NOT EXISTS content_preview VARCHAR(500),
+            ALTER COLUMN content DROP NOT NULL;
+    """)
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_{SCHEMA}_documents_content_hash
+        ON {SCHEMA}.documents (content_hash);
+    """)
+    # El cuerpo puede estar en la columna (filas viejas) o en el blob store
+    op.execute(f"ALTER TABLE {SCHEMA}.documents DROP CONSTRAINT IF EXISTS documents_content_not_blank;")
+    op.execute(f"""
+        ALTER TABLE {SCHEMA}.documents
+        ADD CONSTRAINT documents_content_present
+            CHECK (content_hash IS NOT NULL OR (content IS NOT NULL AND char_length(btrim(content)) > 0));
+    """)
+
+    # Backfill: cada cuerpo al blob store (en lotes, sin traer la tabla entera)
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                f"SELECT id, content FROM {SCHEMA}.documents"
+                " WHERE id > :last_id AND content_hash IS NULL AND content IS NOT NULL"
+                " ORDER BY id LIMIT :batch"
+            ),
+            {"last_id": last_id, "batch": BATCH},
+        ).all()
+        if not rows:
+            break
+        for doc_id, content in rows:
+            conn.execute(
+                sa.text(
+                    f"UPDATE {SCHEMA}.documents"
+                    " SET content_hash = :content_hash, content_size = :content_size,"
+                    " content_preview = :content_preview, content = NULL"
+                    " WHERE id = :id"
+                ),
+                {"id": doc_id, **store_document_text(content)},
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Devuelve los cuerpos a la columna (los blobs quedan en el store)
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text(f"SELECT id, content_hash FROM {SCHEMA}.documents WHERE content IS NULL AND content_hash IS NOT NULL")
+    ).all()
+    store = get_blob_store()
+    for doc_id, content_hash in rows:
+        conn.execute(
+            sa.text(f"UPDATE {SCHEMA}.documents SET content = :content WHERE id = :id"),
+            {"id": doc_id, "content": store.get(content_hash).decode("utf-8")},
+        )
+    op.execute(f"UPDATE {SCHEMA}.documents SET content = '(empty)' WHERE content IS NULL;")
+    op.execute(f"ALTER TABLE {SCHEMA}.documents DROP CONSTRAINT IF EXISTS documents_content_present;")
+    op.execute(f"""
+        ALTER TABLE {SCHEMA}.documents
+        ADD CONSTRAINT documents_content_not_blank
+            CHECK (char_length(btrim(content)) > 0);
+    """)
+    op.execute(f"DROP INDEX IF EXISTS {SCHEMA}.ix_{SCHEMA}_documents_content_hash;")
+    op.execute(f"""
+        ALTER TABLE {SCHEMA}.documents
+            ALTER COLUMN content SET NOT NULL,
+            DROP COLUMN IF EXISTS content_preview,
+            DROP COLUMN IF EXISTS content_size,
+            DROP COLUMN IF EXISTS content_hash;
+    """)
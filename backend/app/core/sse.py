@@ -0,0 +1,8 @@
+# app/core/sse.py
+import json
+from typing import Any
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formatea un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -1,4 +1,7 @@
 ﻿# app/main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,8 +10,23 @@ from app.routers.documents import router as documents_router
 from app.routers.auth import router as auth_router
 from app.routers.summaries import router as summaries_router  # <= IMPORTANTE
 from app.routers.quizz import router as quizz_router
+from app.routers.jobs import router as jobs_router
+from app.services.http_pool import close_http_pool
+from app.services.pdf_pool import shutdown_pdf_pool
+from app.services.result_buffer import result_buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: cierra las conexiones keep-alive con el proveedor de IA
+    await close_http_pool()
+    # ...y escribe los intentos de quiz que quedaban en el buffer
+    await asyncio.to_thread(result_buffer.close)
+    shutdown_pdf_pool()
+
 
-app = FastAPI(title="StudyForge API")
+app = FastAPI(title="StudyForge API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,3 +46,4 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(documents_router)
 app.include_router(summaries_router)
 app.include_router(quizz_router)  # -> prefix "/quizzes"
+app.include_router(jobs_router)  # -> prefix "/jobs"
@@ -2,6 +2,7 @@
 from sqlalchemy.orm import Session
 from app.schemas.document_schemas import DocumentIn, DocumentOut, DocumentListOut
 from app.repositories.models import Document
+from app.services.blob_store import store_document_text
 
 class DocumentRepo:
     def list(self, db: Session) -> DocumentListOut:
@@ -10,7 +11,7 @@ class DocumentRepo:
         return DocumentListOut(items=items)
 
     def insert(self, db: Session, data: DocumentIn) -> DocumentOut:
-        obj = Document(title=data.title, description=data.description, content=data.content)
+        obj = Document(title=data.title, description=data.description, **store_document_text(data.content, db))
         db.add(obj)
         db.commit()
         db.refresh(obj)
@@ -1,6 +1,7 @@
 # app/repositories/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, relationship
 from app.db import Base
 
 # ===================== Users =====================
@@ -26,8 +27,13 @@ class Document(Base):
     user_id = Column(Integer, ForeignKey("studyforge.users.id"), nullable=True)
     title = Column(String(200), nullable=False)
     description = Column(String(300))
-    content = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Cuerpo en el blob store (ver services/blob_store.document_text); `content`
+    # sólo queda para filas viejas y es diferido para no arrastrarlo en cada query
+    content = deferred(Column(Text, nullable=True))
+    content_hash = Column(String(64), index=True)  # SHA-256 del texto (UTF-8)
+    content_size = Column(BigInteger)  # bytes sin comprimir
+    content_preview = Column(String(500))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("User", back_populates="documents")
@@ -43,6 +49,15 @@ class Document(Base):
     )
 
 
+# Listado paginado por keyset: WHERE user_id = ? AND (created_at, id) < (?, ?)
+Index(
+    "ix_studyforge_documents_user_created_id",
+    Document.user_id,
+    Document.created_at.desc(),
+    Document.id.desc(),
+)
+
+
 # ===================== Summaries =====================
 class Summary(Base):
     __tablename__ = "summaries"
@@ -89,8 +104,112 @@ class QuizQuestion(Base):
     id = Column(Integer, primary_key=True)
     quiz_id = Column(Integer, ForeignKey("studyforge.quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
     question = Column(Text, nullable=False)
-    options_json = Column(Text, nullable=False)  # JSON: ["A","B","C","D"]
+    options_json = Column(JSONB, nullable=False)  # ["A","B","C","D"]
     answer_index = Column(Integer, nullable=False)  # 0..3
     explanation = Column(Text)
+    # Pregunta del banco de la que se copió (para no repetírsela al usuario)
+    bank_question_id = Column(
+        Integer, ForeignKey("studyforge.question_bank.id", ondelete="SET NULL"), nullable=True, index=True
+    )
 
     quiz = relationship("Quiz", back_populates="questions")
+
+
+class QuizResult(Base):
+    """Intento de un usuario sobre un quiz (se escribe en lote, ver result_buffer)."""
+    __tablename__ = "quiz_results"
+    __table_args__ = {"schema": "studyforge"}
+
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("studyforge.quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("studyforge.users.id"), nullable=False, index=True)
+    score = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    answers = Column(JSONB)  # respuestas dadas, una por pregunta (null = sin responder)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class QuizStats(Base):
+    """Contadores por quiz, incrementados al escribir cada lote de intentos."""
+    __tablename__ = "quiz_stats"
+    __table_args__ = {"schema": "studyforge"}
+
+    quiz_id = Column(Integer, ForeignKey("studyforge.quizzes.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(BigInteger, nullable=False, default=0)
+    score_sum = Column(BigInteger, nullable=False, default=0)
+    total_sum = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class QuizQuestionStats(Base):
+    """Contadores por pregunta (intentos y aciertos)."""
+    __tablename__ = "quiz_question_stats"
+    __table_args__ = {"schema": "studyforge"}
+
+    question_id = Column(Integer, ForeignKey("studyforge.quiz_questions.id", ondelete="CASCADE"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("studyforge.quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    attempts = Column(BigInteger, nullable=False, default=0)
+    correct = Column(BigInteger, nullable=False, default=0)
+
+
+class BankQuestion(Base):
+    """
+    Banco de preguntas por documento, generado con IA y reutilizable: los
+    quizzes nuevos se arman muestreando de acá.
+    """
+    __tablename__ = "question_bank"
+    __table_args__ = (
+        UniqueConstraint("document_id", "text_hash", name="uq_question_bank_document_text"),
+        {"schema": "studyforge"},
+    )
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("studyforge.documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False, default=0)  # sección del documento de la que sale
+    question = Column(Text, nullable=False)
+    options_json = Column(JSONB, nullable=False)  # ["A","B","C","D"]
+    answer_index = Column(Integer, nullable=False)  # 0..3
+    explanation = Column(Text)
+    text_hash = Column(String(64), nullable=False)  # SHA-256 del enunciado normalizado
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ===================== Jobs (cola de trabajos IA) =====================
+class Job(Base):
+    """
+    Trabajo asíncrono de IA (resumen o quiz) consumido por `python -m app.worker`.
+
+    status: pending | running | done | failed
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_studyforge_jobs_status_run_after", "status", "run_after"),
+        # A lo sumo un job activo igual por usuario (respaldo del dedupe de enqueue)
+        Index(
+            "uq_studyforge_jobs_active",
+            "user_id", "kind", "document_id", "params",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+        {"schema": "studyforge"},
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)  # "summary" | "quiz"
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")
+
+    user_id = Column(Integer, ForeignKey("studyforge.users.id"), nullable=False, index=True)
+    document_id = Column(Integer, ForeignKey("studyforge.documents.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    params = Column(JSONB, nullable=False, default=dict, server_default="{}")
+    result = Column(JSONB)  # p. ej. {"summary_id": 1} / {"quiz_id": 2}
+    error = Column(Text)
+
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=3, server_default="3")
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime(timezone=True))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,309 @@
+# app/repositories/quiz_repo.py
+"""
+Escrituras en lote de quizzes y preguntas.
+
+- create_with_questions: el quiz y TODAS sus preguntas en una sola sentencia
+  (CTE INSERT ... RETURNING + jsonb_to_recordset) → un solo round-trip.
+- insert_questions: preguntas de un quiz existente en una sola sentencia
+  (executemany con RETURNING, "insertmanyvalues" de SQLAlchemy 2).
+- get_json: el quiz con sus preguntas en una query, armado en Postgres
+  (json_agg) y devuelto como texto JSON listo para la respuesta.
+- insert_results: intentos (quiz_results) en lote, en una sentencia; los de
+  quizzes borrados mientras esperaban en el buffer se descartan.
+- increment_stats / get_stats: contadores por quiz y por pregunta,
+  incrementados por lote (upsert) y leídos por clave sin recorrer intentos.
+- answer_key / explanations: sólo lo necesario para corregir (ids y
+  respuestas correctas; explicaciones aparte, cuando se piden).
+
+Las preguntas llegan ya normalizadas: {"question", "options", "answer_index",
+"explanation", "bank_question_id"?}.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from app.repositories.models import Quiz, QuizQuestion
+
+SCHEMA = "studyforge"
+
+_CREATE_WITH_QUESTIONS = text(
+    f"""
+    WITH new_quiz AS (
+        INSERT INTO {SCHEMA}.quizzes (user_id, document_id, title, size)
+        VALUES (:user_id, :document_id, :title, :size)
+        RETURNING id, created_at
+    ), new_questions AS (
+        INSERT INTO {SCHEMA}.quiz_questions
+            (quiz_id, question, options_json, answer_index, explanation, bank_question_id)
+        SELECT new_quiz.id, x.question, x.options_json, x.answer_index, x.explanation, x.bank_question_id
+        FROM new_quiz,
+             jsonb_to_recordset(CAST(:questions AS jsonb)) AS x(
+                 ord int, question text, options_json jsonb, answer_index int,
+                 explanation text, bank_question_id int
+             )
+        ORDER BY x.ord
+        RETURNING id
+    )
+    SELECT new_quiz.id, new_quiz.created_at, (SELECT count(*) FROM new_questions) AS inserted
+    FROM new_quiz
+    """
+)
+
+
+# Mismo formato que GET /quizzes/{id}; ::text para no decodificar en Python
+_GET_JSON = text(
+    f"""
+    SELECT json_build_object(
+        'id', q.id,
+        'document_id', q.document_id,
+        'title', q.title,
+        'questions', COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', qq.id,
+                        'question', qq.question,
+                        'options', qq.options_json,
+                        'answer_index', qq.answer_index,
+                        'explanation', qq.explanation
+                    )
+                    ORDER BY qq.id
+                )
+                FROM {SCHEMA}.quiz_questions qq
+                WHERE qq.quiz_id = q.id
+            ),
+            '[]'::json
+        )
+    )::text
+    FROM {SCHEMA}.quizzes q
+    WHERE q.id = :quiz_id AND q.user_id = :user_id
+    """
+)
+
+
+# Intentos en lote; el EXISTS evita que un quiz ya borrado tumbe todo el lote por FK
+_INSERT_RESULTS = text(
+    f"""
+    INSERT INTO {SCHEMA}.quiz_results (quiz_id, user_id, score, total, answers, created_at)
+    SELECT x.quiz_id, x.user_id, x.score, x.total, x.answers, x.created_at
+    FROM jsonb_to_recordset(CAST(:results AS jsonb)) AS x(
+        quiz_id int, user_id int, score int, total int, answers jsonb, created_at timestamptz
+    )
+    WHERE EXISTS (SELECT 1 FROM {SCHEMA}.quizzes q WHERE q.id = x.quiz_id)
+    """
+)
+
+
+# Contadores agregados: ({quiz_id: {attempts, score_sum, total_sum}},
+# {question_id: {attempts, correct}})
+StatDeltas = Tuple[Dict[int, Dict[str, int]], Dict[int, Dict[str, int]]]
+
+
+def stat_deltas(results: List[Dict[str, Any]], into: Optional[StatDeltas] = None) -> StatDeltas:
+    """Agrega intentos a contadores por quiz y por pregunta (sobre `into` si se pasa)."""
+    quizzes, questions = into if into is not None else ({}, {})
+    for r in results:
+        agg = quizzes.setdefault(r["quiz_id"], {"attempts": 0, "score_sum": 0, "total_sum": 0})
+        agg["attempts"] += 1
+        agg["score_sum"] += r["score"]
+        agg["total_sum"] += r["total"]
+        for qid, ok in zip(r.get("question_ids") or (), r.get("correct") or ()):
+            qagg = questions.setdefault(qid, {"attempts": 0, "correct": 0})
+            qagg["attempts"] += 1
+            qagg["correct"] += int(bool(ok))
+    return quizzes, questions
+
+
+def merge_stat_deltas(dst: StatDeltas, src: StatDeltas) -> StatDeltas:
+    """Suma los contadores de `src` sobre `dst`."""
+    for into, deltas in zip(dst, src):
+        for key, counts in deltas.items():
+            agg = into.setdefault(key, dict.fromkeys(counts, 0))
+            for field, n in counts.items():
+                agg[field] += n
+    return dst
+
+
+# Upserts con incremento; el lote llega ya agregado (una fila por clave) y ordenado
+_INCREMENT_QUIZ_STATS = text(
+    f"""
+    INSERT INTO {SCHEMA}.quiz_stats AS s (quiz_id, attempts, score_sum, total_sum, updated_at)
+    SELECT x.quiz_id, x.attempts, x.score_sum, x.total_sum, now()
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS x(
+        quiz_id int, attempts bigint, score_sum bigint, total_sum bigint
+    )
+    WHERE EXISTS (SELECT 1 FROM {SCHEMA}.quizzes q WHERE q.id = x.quiz_id)
+    ORDER BY x.quiz_id
+    ON CONFLICT (quiz_id) DO UPDATE SET
+        attempts = s.attempts + EXCLUDED.attempts,
+        score_sum = s.score_sum + EXCLUDED.score_sum,
+        total_sum = s.total_sum + EXCLUDED.total_sum,
+        updated_at = now()
+    """
+)
+
+_INCREMENT_QUESTION_STATS = text(
+    f"""
+    INSERT INTO {SCHEMA}.quiz_question_stats AS s (question_id, quiz_id, attempts, correct)
+    SELECT qq.id, qq.quiz_id, x.attempts, x.correct
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS x(question_id int, attempts bigint, correct bigint)
+    JOIN {SCHEMA}.quiz_questions qq ON qq.id = x.question_id
+    ORDER BY qq.id
+    ON CONFLICT (question_id) DO UPDATE SET
+        attempts = s.attempts + EXCLUDED.attempts,
+        correct = s.correct + EXCLUDED.correct
+    """
+)
+
+# Lectura por clave: una fila de quiz_stats + una por pregunta (nunca quiz_results)
+_GET_STATS = text(
+    f"""
+    SELECT json_build_object(
+        'quiz_id', q.id,
+        'attempts', COALESCE(s.attempts, 0),
+        'average_score', CASE WHEN s.attempts > 0 THEN round(s.score_sum::numeric / s.attempts, 2) ELSE 0 END,
+        'average_pct', CASE WHEN s.total_sum > 0 THEN round(100.0 * s.score_sum / s.total_sum, 1) ELSE 0 END,
+        'questions', COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'question_id', qq.id,
+                        'attempts', COALESCE(qs.attempts, 0),
+                        'correct', COALESCE(qs.correct, 0),
+                        'correct_rate', CASE WHEN qs.attempts > 0
+                            THEN round(qs.correct::numeric / qs.attempts, 4) ELSE 0 END
+                    )
+                    ORDER BY qq.id
+                )
+                FROM {SCHEMA}.quiz_questions qq
+                LEFT JOIN {SCHEMA}.quiz_question_stats qs ON qs.question_id = qq.id
+                WHERE qq.quiz_id = q.id
+            ),
+            '[]'::json
+        )
+    )
+    FROM {SCHEMA}.quizzes q
+    LEFT JOIN {SCHEMA}.quiz_stats s ON s.quiz_id = q.id
+    WHERE q.id = :quiz_id AND q.user_id = :user_id
+    """
+)
+
+
+# Dueño + (id, answer_index) por pregunta; LEFT JOIN para distinguir quiz vacío de inexistente
+_ANSWER_KEY = text(
+    f"""
+    SELECT q.user_id, qq.id, qq.answer_index
+    FROM {SCHEMA}.quizzes q
+    LEFT JOIN {SCHEMA}.quiz_questions qq ON qq.quiz_id = q.id
+    WHERE q.id = :quiz_id
+    ORDER BY qq.id
+    """
+)
+
+
+def _question_row(q: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "question": q["question"],
+        "options_json": q["options"],
+        "answer_index": q["answer_index"],
+        "explanation": q.get("explanation"),
+        "bank_question_id": q.get("bank_question_id"),
+    }
+
+
+class QuizRepo:
+    def create_with_questions(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        document_id: int,
+        title: str,
+        questions: List[Dict[str, Any]],
+    ) -> Quiz:
+        """
+        Inserta quiz + preguntas en un round-trip (no hace commit). Devuelve un
+        Quiz desacoplado de la sesión con id/created_at ya cargados.
+        """
+        rows = [{"ord": i, **_question_row(q)} for i, q in enumerate(questions)]
+        quiz_id, created_at, _ = db.execute(
+            _CREATE_WITH_QUESTIONS,
+            {
+                "user_id": user_id,
+                "document_id": document_id,
+                "title": title,
+                "size": len(questions),
+                "questions": json.dumps(rows, ensure_ascii=False),
+            },
+        ).one()
+        return Quiz(
+            id=quiz_id,
+            user_id=user_id,
+            document_id=document_id,
+            title=title,
+            size=len(questions),
+            created_at=created_at,
+        )
+
+    def get_json(self, db: Session, user_id: int, quiz_id: int) -> Optional[str]:
+        """Quiz + preguntas como JSON (texto) en un round-trip; None si no existe/no es del usuario."""
+        return db.execute(_GET_JSON, {"quiz_id": quiz_id, "user_id": user_id}).scalar_one_or_none()
+
+    def insert_questions(self, db: Session, quiz_id: int, questions: List[Dict[str, Any]]) -> List[int]:
+        """Inserta preguntas de un quiz en una sentencia; ids en el orden dado (sin commit)."""
+        if not questions:
+            return []
+        result = db.execute(
+            insert(QuizQuestion).returning(QuizQuestion.id, sort_by_parameter_order=True),
+            [{"quiz_id": quiz_id, **_question_row(q)} for q in questions],
+        )
+        return list(result.scalars())
+
+    def answer_key(self, db: Session, quiz_id: int) -> Optional[Tuple[int, List[int], List[int]]]:
+        """(user_id, ids, answer_index) del quiz, preguntas ordenadas por id; None si no existe."""
+        rows = db.execute(_ANSWER_KEY, {"quiz_id": quiz_id}).all()
+        if not rows:
+            return None
+        pairs = [(qid, idx) for _, qid, idx in rows if qid is not None]
+        return rows[0][0], [qid for qid, _ in pairs], [idx for _, idx in pairs]
+
+    def explanations(self, db: Session, quiz_id: int) -> Dict[int, Optional[str]]:
+        """{question_id: explanation} del quiz."""
+        return dict(
+            db.execute(
+                select(QuizQuestion.id, QuizQuestion.explanation).where(QuizQuestion.quiz_id == quiz_id)
+            ).all()
+        )
+
+    def insert_results(self, db: Session, results: List[Dict[str, Any]]) -> int:
+        """Inserta intentos {quiz_id, user_id, score, total, answers, created_at} (sin commit)."""
+        if not results:
+            return 0
+        return db.execute(
+            _INSERT_RESULTS, {"results": json.dumps(results, ensure_ascii=False, default=str)}
+        ).rowcount
+
+    def increment_stats(
+        self, db: Session, results: List[Dict[str, Any]], *, extra: Optional[StatDeltas] = None
+    ) -> None:
+        """
+        Suma un lote de intentos a quiz_stats / quiz_question_stats (sin commit).
+        Cada intento puede traer "question_ids" y "correct" (bools) en paralelo;
+        `extra` son contadores ya agregados (intentos que no llegan a quiz_results).
+        """
+        quizzes, questions = stat_deltas(results)
+        if extra is not None:
+            merge_stat_deltas((quizzes, questions), extra)
+
+        if quizzes:
+            rows = [{"quiz_id": k, **v} for k, v in sorted(quizzes.items())]
+            db.execute(_INCREMENT_QUIZ_STATS, {"rows": json.dumps(rows)})
+        if questions:
+            rows = [{"question_id": k, **v} for k, v in sorted(questions.items())]
+            db.execute(_INCREMENT_QUESTION_STATS, {"rows": json.dumps(rows)})
+
+    def get_stats(self, db: Session, user_id: int, quiz_id: int) -> Optional[Dict[str, Any]]:
+        """Estadísticas del quiz (contadores precalculados); None si no existe/no es del usuario."""
+        return db.execute(_GET_STATS, {"quiz_id": quiz_id, "user_id": user_id}).scalar_one_or_none()
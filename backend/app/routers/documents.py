@@ -1,10 +1,14 @@
 ﻿# app/routers/documents.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.schemas.document_schemas import DocumentIn, DocumentOut, DocumentListOut
-from app.services.document_service import DocumentService
+from app.services.document_service import DOCUMENTS_PAGE_MAX, DOCUMENTS_PAGE_SIZE, DocumentService
+from app.services.file_ingest import FileTooLargeError
+from app.services.pdf_pool import ExtractionBusyError
 from app.core.deps import get_current_user
 from app.repositories.models import User
 
@@ -15,21 +19,30 @@ service = DocumentService()
 async def extract_text(
     file: UploadFile = File(...)
 ):
-    from app.services.document_service import DocumentService
-    service = DocumentService()
-    return await service.extract_text_from_file(file)
+    try:
+        return await service.extract_text_from_file(file)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExtractionBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.get("", response_model=DocumentListOut, summary="List documents (only mine)")
 def list_documents(
+    limit: int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_PAGE_MAX, description="Documentos por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     db: Session = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
     """
-    Devuelve SOLO los documentos del usuario autenticado.
+    Devuelve SOLO los documentos del usuario autenticado, más nuevos primero.
+    Paginado por cursor: pasar el `next_cursor` recibido para la página siguiente.
     """
-    # Nota: el servicio debe filtrar por owner. Si tu servicio actual no lo hace aún,
-    # en el siguiente paso ajustamos DocumentService para soportar owner_id.
-    return service.list(db, owner_id=current.id)
+    try:
+        return service.list(db, owner_id=current.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("", response_model=DocumentOut, status_code=status.HTTP_201_CREATED, summary="Create document (as me)")
 def create_document(
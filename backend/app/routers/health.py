@@ -1,7 +1,54 @@
 ﻿from fastapi import APIRouter
 
+from app.services.answer_keys import answer_keys
+from app.services.extraction_cache import get_extraction_cache
+from app.services.http_pool import http_pool_stats
+from app.services.llm_factory import get_llm_cache
+from app.services.pdf_pool import pdf_pool_stats
+from app.services.question_bank import QUIZ_BANK_ENABLED
+from app.services.rate_limiter import rate_limiter_stats
+from app.services.result_buffer import result_buffer
+
 router = APIRouter()
 
 @router.get("", summary="Health check")
 def health():
     return {"status": "ok"}
+
+@router.get("/llm-cache", summary="LLM response cache stats")
+def llm_cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/quiz-bank", summary="Per-document question bank status")
+def quiz_bank_status():
+    return {"enabled": QUIZ_BANK_ENABLED}
+
+@router.get("/llm-limits", summary="LLM rate limiter stats (per model)")
+def llm_limits_stats():
+    return rate_limiter_stats()
+
+@router.get("/http-pool", summary="Shared LLM HTTP connection pool stats")
+def http_pool():
+    return http_pool_stats()
+
+@router.get("/answer-keys", summary="Quiz answer-key cache stats")
+def answer_keys_stats():
+    return answer_keys.stats()
+
+@router.get("/quiz-results", summary="Quiz results write-behind buffer stats")
+def quiz_results_stats():
+    return result_buffer.stats()
+
+@router.get("/pdf-pool", summary="PDF extraction process pool stats")
+def pdf_pool():
+    return pdf_pool_stats()
+
+@router.get("/extract-cache", summary="File text extraction cache stats")
+def extract_cache_stats():
+    cache = get_extraction_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
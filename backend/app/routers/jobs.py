@@ -0,0 +1,28 @@
+# app/routers/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.core.deps import get_current_user
+from app.repositories.models import User
+from app.schemas.job_schemas import JobOut
+from app.services.job_service import JobService
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+svc = JobService()
+
+
+@router.get("/{job_id}", response_model=JobOut, summary="Estado de un trabajo de IA")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Devuelve el estado (pending | running | done | failed) de un job del usuario.
+    Cuando está en done, `result` trae el id del resumen/quiz generado.
+    """
+    job = svc.get(db, me.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,33 +1,51 @@
 # app/routers/quizz.py
+import asyncio
 from typing import Optional, Dict, Any, List
-import json
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.db import SessionLocal, get_db
 from app.core.deps import get_current_user
-from app.repositories.models import User
-from app.services.quiz_service import QuizService
+from app.core.sse import sse_event
+from app.repositories.models import Document, User
+from app.services.job_service import JobService
+from app.services.quiz_service import QUIZ_MAX_SIZE, QuizService
+from app.schemas.job_schemas import JobAcceptedOut
 from app.schemas.quizz_schemas import QuizAnswersIn, QuizCheckOut
 
 router = APIRouter(prefix="/quizzes", tags=["quizzes"])
 svc = QuizService()
+jobs = JobService()
+
+
+def _owned_document(db: Session, user_id: int, document_id: int) -> Document:
+    doc = (
+        db.query(Document)
+        .filter(Document.id == document_id, Document.user_id == user_id)
+        .first()
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
 
 
 @router.post("/auto", status_code=status.HTTP_201_CREATED)
-def create_auto_quiz(
+async def create_auto_quiz(
     document_id: int = Query(..., description="ID del documento"),
-    size: int = Query(6, ge=3, le=10, description="Cantidad de preguntas"),
+    size: int = Query(6, ge=3, le=QUIZ_MAX_SIZE, description="Cantidad de preguntas"),
     db: Session = Depends(get_db),
     me: User = Depends(get_current_user),
 ):
     """
     Genera un quiz con IA (JSON estructurado) y lo persiste.
     Si el proveedor IA falla/timeout → 503.
+    Es async: mientras se espera a la IA no se ocupa un worker del threadpool
+    (el servicio manda las consultas a la DB a hilos).
     """
     try:
-        qz = svc.create_auto(db, me.id, document_id, size)
+        qz = await svc.create_auto(db, me.id, document_id, size)
         return {
             "id": qz.id,
             "document_id": qz.document_id,
@@ -43,6 +61,65 @@ def create_auto_quiz(
         raise HTTPException(status_code=503, detail=f"AI provider error: {e}")
 
 
+@router.post("/auto/jobs", response_model=JobAcceptedOut, status_code=status.HTTP_202_ACCEPTED)
+def enqueue_auto_quiz(
+    document_id: int = Query(..., description="ID del documento"),
+    size: int = Query(6, ge=3, le=QUIZ_MAX_SIZE, description="Cantidad de preguntas"),
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Encola la generación del quiz y responde 202 con el id del job.
+    Estado/resultado en GET /jobs/{job_id} (result.quiz_id cuando termina).
+    """
+    doc = _owned_document(db, me.id, document_id)
+
+    job = jobs.enqueue(db, me.id, "quiz", doc.id, {"size": size})
+    return JobAcceptedOut(job_id=job.id, status=job.status)
+
+
+@router.post(
+    "/auto/stream",
+    summary="Auto-generate Quiz (Server-Sent Events)",
+    response_class=StreamingResponse,
+)
+async def create_auto_quiz_stream(
+    document_id: int = Query(..., description="ID del documento"),
+    size: int = Query(6, ge=3, le=QUIZ_MAX_SIZE, description="Cantidad de preguntas"),
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Variante streaming de POST /quizzes/auto (text/event-stream).
+
+    Eventos: `quiz` (quiz creado), `question` (una por pregunta, ya guardada),
+    `done` (con partial=true si la IA se cortó a mitad) o `error`.
+    El front puede mostrar la pregunta 1 mientras se genera el resto.
+    """
+    doc = await asyncio.to_thread(_owned_document, db, me.id, document_id)
+
+    user_id, doc_id = me.id, doc.id
+
+    async def _events():
+        # La sesión del request no vive durante el stream: abrimos una propia
+        # (cerrarla devuelve la conexión al pool: también fuera del loop)
+        s = SessionLocal()
+        try:
+            async for event, data in svc.stream_auto(s, user_id, doc_id, size):
+                yield sse_event(event, data)
+        except Exception as e:
+            # Los headers ya salieron: el error viaja como evento
+            yield sse_event("error", {"detail": f"AI provider error: {e}"})
+        finally:
+            await asyncio.to_thread(s.close)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("")
 def list_quizzes(
     document_id: int = Query(..., description="ID del documento"),
@@ -77,25 +154,28 @@ def get_quiz(
     Devuelve el quiz con sus preguntas.
     Nota: incluye answer_index en la respuesta (el front NO debe mostrarlo).
     """
-    qz = svc.get(db, me.id, quiz_id)
-    if not qz:
+    # Una sola query: Postgres arma el JSON (json_agg) y lo pasamos tal cual
+    body = svc.get_json(db, me.id, quiz_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    return Response(content=body, media_type="application/json")
 
-    return {
-        "id": qz.id,
-        "document_id": qz.document_id,
-        "title": qz.title,
-        "questions": [
-            {
-                "id": qq.id,
-                "question": qq.question,
-                "options": json.loads(qq.options_json),
-                "answer_index": qq.answer_index,  # mantener para corrección en backend
-                "explanation": qq.explanation,
-            }
-            for qq in qz.questions
-        ],
-    }
+
+@router.get("/{quiz_id}/stats")
+def get_quiz_stats(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Estadísticas del quiz: intentos, promedio y tasa de acierto por pregunta.
+    Lee contadores precalculados (no depende de cuántos intentos haya); los
+    intentos recientes aparecen cuando se escribe su lote.
+    """
+    stats = svc.get_stats(db, me.id, quiz_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return stats
 
 
 @router.post("/{quiz_id}/answer")
@@ -111,9 +191,9 @@ def answer_quiz(
     answers: List[int] = payload.get("answers") or []
     try:
         score, total, correct = svc.compute_score(db, me.id, quiz_id, answers)
-        return {"score": score, "total": total, "correct": correct}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    return {"score": score, "total": total, "correct": correct}
 
 
 @router.delete("/{quiz_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -125,11 +205,8 @@ def delete_quiz(
     """
     Borra el quiz (y sus preguntas) si pertenece al usuario.
     """
-    qz = svc.get(db, me.id, quiz_id)
-    if not qz:
+    if not svc.delete(db, me.id, quiz_id):
         raise HTTPException(status_code=404, detail="Quiz not found")
-    db.delete(qz)
-    db.commit()
     return
 
 @router.post("/{quiz_id}/check", response_model=QuizCheckOut)
@@ -1,17 +1,40 @@
 # app/routers/summaries.py
+import asyncio
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.db import SessionLocal, get_db
 from app.core.deps import get_current_user
+from app.core.sse import sse_event
 from app.repositories.models import Document, User
+from app.schemas.job_schemas import JobAcceptedOut
 from app.schemas.summary_schemas import SummaryIn, SummaryOut, SummaryListOut
-from app.services.summary_service import SummaryService, summarize_strict
+from app.services.blob_store import document_text_async
+from app.services.job_service import JobService
+from app.services.summary_service import SummaryService, summarize_strict, summarize_stream
 
 router = APIRouter(prefix="/summaries", tags=["summaries"])
 service = SummaryService()
+jobs = JobService()
+
+
+def _owned_document(db: Session, user_id: int, document_id: int) -> Document:
+    doc = (
+        db.query(Document)
+        .filter(Document.id == document_id, Document.user_id == user_id)
+        .first()
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="documento no encontrado")
+    return doc
+
+
+def _save_summary(user_id: int, payload: SummaryIn) -> SummaryOut:
+    with SessionLocal() as s:
+        return service.create(db=s, user_id=user_id, payload=payload)
 
 
 @router.get("", response_model=SummaryListOut, summary="List Summaries")
@@ -39,13 +62,7 @@ def create_summary(
     Crea un resumen manual para un documento del usuario.
     """
     # Validamos que el documento exista y sea del usuario
-    doc = (
-        db.query(Document)
-        .filter(Document.id == payload.document_id, Document.user_id == me.id)
-        .first()
-    )
-    if not doc:
-        raise HTTPException(status_code=404, detail="documento no encontrado")
+    doc = _owned_document(db, me.id, payload.document_id)
 
     return service.create(db=db, user_id=me.id, payload=payload)
 
@@ -76,7 +93,7 @@ def delete_summary(
     status_code=status.HTTP_201_CREATED,
     summary="Auto-generate Summary for a document",
 )
-def auto_summary(
+async def auto_summary(
     document_id: int = Query(..., description="ID del documento a resumir"),
     max_sentences: int = Query(5, ge=1, le=12, description="Máx. oraciones"),
     db: Session = Depends(get_db),
@@ -84,21 +101,17 @@ def auto_summary(
 ):
     """
     Genera un resumen con IA para un documento del usuario y lo guarda en DB.
+    Es async: la espera a la IA no bloquea el threadpool del resto de la API,
+    y las consultas (sync) a la DB van a un hilo para no bloquear el loop.
     """
     # 1) Validar que el documento existe y pertenece al usuario
-    doc = (
-        db.query(Document)
-        .filter(Document.id == document_id, Document.user_id == me.id)
-        .first()
-    )
-    if not doc:
-        raise HTTPException(status_code=404, detail="documento no encontrado")
+    doc = await asyncio.to_thread(_owned_document, db, me.id, document_id)
 
     # 2) Pedir resumen a la IA (sin fallback)
     try:
-        content, provider, chunks_used = summarize_strict(
+        content, provider, chunks_used = await summarize_strict(
             doc.title or "",
-            doc.content or "",
+            await document_text_async(doc),
             max_sentences=max_sentences,
         )
     except Exception as e:
@@ -114,4 +127,68 @@ def auto_summary(
         content=content,
         document_id=doc.id,
     )
-    return service.create(db=db, user_id=me.id, payload=payload)
+    return await asyncio.to_thread(service.create, db=db, user_id=me.id, payload=payload)
+
+
+@router.post(
+    "/auto/jobs",
+    response_model=JobAcceptedOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Enqueue auto-summary generation (async job)",
+)
+def enqueue_auto_summary(
+    document_id: int = Query(..., description="ID del documento a resumir"),
+    max_sentences: int = Query(5, ge=1, le=12, description="Máx. oraciones"),
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Encola la generación del resumen y responde 202 de inmediato.
+    El trabajo lo procesa `python -m app.worker`; el estado se consulta en GET /jobs/{job_id}.
+    """
+    doc = _owned_document(db, me.id, document_id)
+
+    job = jobs.enqueue(db, me.id, "summary", doc.id, {"max_sentences": max_sentences})
+    return JobAcceptedOut(job_id=job.id, status=job.status)
+
+
+@router.post(
+    "/auto/stream",
+    summary="Auto-generate Summary (Server-Sent Events)",
+    response_class=StreamingResponse,
+)
+async def auto_summary_stream(
+    document_id: int = Query(..., description="ID del documento a resumir"),
+    max_sentences: int = Query(5, ge=1, le=12, description="Máx. oraciones"),
+    db: Session = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Variante streaming de POST /summaries/auto (text/event-stream).
+
+    Eventos: `start`, `chunk` (progreso de la fase map), `reduce`, `delta`
+    (tokens del resumen final), `summary` (fila guardada) o `error`.
+    """
+    doc = await asyncio.to_thread(_owned_document, db, me.id, document_id)
+
+    # Copiamos lo necesario: la sesión del request no vive durante el stream
+    user_id, doc_id, title, text = me.id, doc.id, doc.title, await document_text_async(doc)
+
+    async def _events():
+        try:
+            async for event, data in summarize_stream(title or "", text, max_sentences=max_sentences):
+                if event == "final":
+                    payload = SummaryIn(title=title, content=data["content"], document_id=doc_id)
+                    out = await asyncio.to_thread(_save_summary, user_id, payload)
+                    yield sse_event("summary", out.model_dump(mode="json"))
+                else:
+                    yield sse_event(event, data)
+        except Exception as e:
+            # Los headers ya salieron: el error viaja como evento
+            yield sse_event("error", {"detail": f"AI provider error: {e}"})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -16,3 +16,5 @@ class DocumentOut(BaseModel):
 
 class DocumentListOut(BaseModel):
     items: list[DocumentOut]
+    # Cursor opaco para la página siguiente (None = no hay más)
+    next_cursor: str | None = None
@@ -0,0 +1,26 @@
+# app/schemas/job_schemas.py
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class JobAcceptedOut(BaseModel):
+    """Respuesta 202 al encolar: el cliente consulta luego GET /jobs/{job_id}."""
+    job_id: int
+    status: str
+
+
+class JobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str                           # "summary" | "quiz"
+    status: str                         # pending | running | done | failed
+    document_id: int
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None   # {"summary_id": ..} / {"quiz_id": ..}
+    error: Optional[str] = None
+    attempts: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,118 @@
+# app/services/answer_keys.py
+"""
+Caché en memoria de claves de respuesta para corregir quizzes.
+
+Un quiz no cambia una vez creado, así que su clave (dueño, ids de preguntas
+y respuestas correctas) se guarda compacta y la corrección pasa a ser una
+búsqueda en memoria + una comparación byte a byte. Las explicaciones sólo se
+cargan si alguien pide la corrección detallada.
+
+- LRU acotado por cantidad de quizzes (OrderedDict) con TTL.
+- Se invalida al borrar el quiz y al agregarle preguntas (stream), pero
+  sólo en el proceso que hizo el cambio: la caché es local a cada worker de
+  uvicorn. En los demás, un quiz borrado se puede seguir corrigiendo (y uno
+  al que el stream le agregó preguntas se corrige con la clave vieja) hasta
+  ANSWER_KEY_CACHE_TTL_S segundos. Por eso el TTL por defecto es corto (60 s);
+  con ANSWER_KEY_CACHE_TTL_S=0 no se cachea nada.
+"""
+from __future__ import annotations
+
+import operator
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# =========================
+# Configuración
+# =========================
+ANSWER_KEY_CACHE_ITEMS: int = int(os.getenv("ANSWER_KEY_CACHE_ITEMS", "4096"))
+ANSWER_KEY_CACHE_TTL_S: float = float(os.getenv("ANSWER_KEY_CACHE_TTL_S", "60"))
+
+# Respuesta ausente o fuera de rango: nunca coincide con un answer_index (0..3)
+_NO_ANSWER = 255
+
+
+class AnswerKey:
+    """Clave de un quiz: dueño, ids de preguntas y un byte por respuesta correcta."""
+
+    __slots__ = ("owner_id", "question_ids", "correct", "explanations", "expires_at")
+
+    def __init__(self, owner_id: int, question_ids: Sequence[int], correct: Sequence[int], expires_at: float) -> None:
+        self.owner_id = owner_id
+        self.question_ids = array("q", question_ids)
+        self.correct = bytes(correct)
+        self.explanations: Optional[Tuple[Optional[str], ...]] = None  # lazy
+        self.expires_at = expires_at
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    def grade(self, answers: Sequence[Any]) -> List[bool]:
+        """Un bool por pregunta; respuestas de más se ignoran, de menos cuentan como falladas."""
+        given = bytes(_encode(a) for a in answers[: len(self.correct)])
+        return list(map(operator.eq, given, self.correct)) + [False] * (len(self.correct) - len(given))
+
+
+def _encode(answer: Any) -> int:
+    # bool es int: True == 1, igual que la comparación original (given == answer_index)
+    if isinstance(answer, int) and 0 <= answer < _NO_ANSWER:
+        return int(answer)
+    return _NO_ANSWER
+
+
+class AnswerKeyCache:
+    def __init__(self, max_items: int = ANSWER_KEY_CACHE_ITEMS, ttl_s: float = ANSWER_KEY_CACHE_TTL_S) -> None:
+        self.max_items = max(0, max_items)
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[int, AnswerKey]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, quiz_id: int) -> Optional[AnswerKey]:
+        now = time.time()
+        with self._lock:
+            key = self._items.get(quiz_id)
+            if key is not None and key.expires_at > now:
+                self._items.move_to_end(quiz_id)
+                self._stats["hits"] += 1
+                return key
+            if key is not None:
+                del self._items[quiz_id]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, quiz_id: int, owner_id: int, question_ids: Sequence[int], correct: Sequence[int]) -> AnswerKey:
+        key = AnswerKey(owner_id, question_ids, correct, time.time() + self.ttl_s)
+        if self.max_items == 0 or self.ttl_s <= 0:
+            return key
+        with self._lock:
+            self._items[quiz_id] = key
+            self._items.move_to_end(quiz_id)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+        return key
+
+    def invalidate(self, quiz_id: int) -> None:
+        with self._lock:
+            if self._items.pop(quiz_id, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["items"] = len(self._items)
+            out["questions"] = sum(len(k) for k in self._items.values())
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        return out
+
+
+answer_keys = AnswerKeyCache()
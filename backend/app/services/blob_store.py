@@ -0,0 +1,197 @@
+# app/services/blob_store.py
+"""
+Almacén de blobs direccionado por contenido para el texto de los documentos.
+
+El cuerpo de un documento ya no vive en la fila de `documents`: se guarda
+comprimido bajo su SHA-256 y la fila sólo tiene hash, tamaño y un preview.
+Dos uploads iguales comparten el mismo blob (dedupe gratis), los scans y
+backups de la tabla quedan chicos, y sólo quien necesita el texto (la
+pipeline de IA) paga por leerlo.
+
+- BlobStore: interfaz mínima (put/get/exists/delete). LocalBlobStore la
+  implementa sobre disco; un backend S3/MinIO (ROADMAP, Fase 4) sólo
+  necesita las mismas cuatro operaciones.
+- Compresión: zstd si está instalado `zstandard`, si no zlib. La extensión
+  del archivo indica con qué se comprimió, así se pueden leer ambos.
+- document_text(_async) / store_document_text: los únicos puntos por donde
+  el resto del código lee o escribe el cuerpo de un documento. Desde código
+  async se usa document_text_async (la lectura va a un hilo).
+- lock_blob: lock transaccional de Postgres por hash. El alta (put + INSERT)
+  y el GC (¿alguien lo usa? + delete) del mismo blob lo toman, así un upload
+  igual que llega mientras se borra el último documento nunca queda
+  apuntando a un blob borrado.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text as sql_text
+from sqlalchemy.orm import Session
+
+try:  # opcional: mejor ratio y mucho más rápido que zlib
+    import zstandard
+except ImportError:  # pragma: no cover - depende del entorno
+    zstandard = None
+
+# =========================
+# Configuración
+# =========================
+BLOB_STORE_BACKEND: str = os.getenv("BLOB_STORE_BACKEND", "local").lower()
+# Relativa al directorio backend/ (no al cwd): la API, el worker y alembic
+# pueden arrancar desde directorios distintos y tienen que ver el mismo store.
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BLOB_STORE_PATH: str = os.path.join(_BACKEND_DIR, os.getenv("BLOB_STORE_PATH", os.path.join("storage", "blobs")))
+BLOB_ZSTD_LEVEL: int = int(os.getenv("BLOB_ZSTD_LEVEL", "10"))
+BLOB_ZLIB_LEVEL: int = int(os.getenv("BLOB_ZLIB_LEVEL", "6"))
+DOCUMENT_PREVIEW_CHARS: int = int(os.getenv("DOCUMENT_PREVIEW_CHARS", "500"))
+
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return ".zst", zstandard.ZstdCompressor(level=BLOB_ZSTD_LEVEL).compress(data)
+    return ".zz", zlib.compress(data, BLOB_ZLIB_LEVEL)
+
+
+def _decompress(ext: str, data: bytes) -> bytes:
+    if ext == ".zst":
+        if zstandard is None:
+            raise RuntimeError("Blob comprimido con zstd pero `zstandard` no está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class BlobStore(ABC):
+    """Blobs inmutables direccionados por el SHA-256 de su contenido (sin comprimir)."""
+
+    @abstractmethod
+    def put(self, data: bytes) -> str: ...
+
+    @abstractmethod
+    def get(self, digest: str) -> bytes: ...
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, digest: str) -> None: ...
+
+
+class LocalBlobStore(BlobStore):
+    """Un archivo por blob: <root>/<ab>/<sha256>.<zst|zz>."""
+
+    EXTENSIONS = (".zst", ".zz")
+
+    def __init__(self, root: str = BLOB_STORE_PATH) -> None:
+        self.root = os.path.abspath(root)
+
+    def _path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def _find(self, digest: str) -> Optional[Tuple[str, str]]:
+        for ext in self.EXTENSIONS:
+            path = self._path(digest, ext)
+            if os.path.exists(path):
+                return ext, path
+        return None
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if self._find(digest) is not None:
+            return digest  # ya está: dedupe
+        ext, blob = _compress(data)
+        path = self._path(digest, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escritura atómica: temporal en el mismo directorio + rename
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        found = self._find(digest)
+        if found is None:
+            raise KeyError(f"blob {digest} no encontrado")
+        ext, path = found
+        with open(path, "rb") as f:
+            return _decompress(ext, f.read())
+
+    def exists(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    def delete(self, digest: str) -> None:
+        found = self._find(digest)
+        if found is not None:
+            try:
+                os.unlink(found[1])
+            except OSError:
+                pass
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Store compartido del proceso, según BLOB_STORE_BACKEND."""
+    global _store
+    if _store is None:
+        if BLOB_STORE_BACKEND != "local":
+            raise RuntimeError(f"BLOB_STORE_BACKEND no soportado: {BLOB_STORE_BACKEND}")
+        _store = LocalBlobStore()
+    return _store
+
+
+# =========================
+# Cuerpo de documentos
+# =========================
+def lock_blob(db: Session, digest: str) -> None:
+    """pg_advisory_xact_lock por hash: se libera con el commit/rollback de `db`."""
+    db.execute(sql_text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(digest[:15], 16)})
+
+
+def store_document_text(text: str, db: Optional[Session] = None) -> Dict[str, Any]:
+    """
+    Guarda el texto y devuelve las columnas de `documents` que lo referencian.
+    Con `db`, toma el lock del hash en esa transacción: el INSERT del
+    documento tiene que hacerse en la misma (ver lock_blob).
+    """
+    data = text.encode("utf-8")
+    if db is not None:
+        lock_blob(db, hashlib.sha256(data).hexdigest())
+    return {
+        "content_hash": get_blob_store().put(data),
+        "content_size": len(data),
+        "content_preview": text[:DOCUMENT_PREVIEW_CHARS],
+    }
+
+
+def document_text(doc: Any) -> str:
+    """
+    Texto completo de un documento. Filas todavía sin migrar (content_hash
+    nulo) se leen de la columna `content` (diferida: sólo se carga acá).
+    """
+    if getattr(doc, "content_hash", None):
+        return get_blob_store().get(doc.content_hash).decode("utf-8")
+    return doc.content or ""
+
+
+async def document_text_async(doc: Any) -> str:
+    """
+    document_text para código async: leer y descomprimir el blob (o cargar
+    la columna diferida `content`) es I/O, así que va a un hilo y no
+    bloquea el event loop.
+    """
+    return await asyncio.to_thread(document_text, doc)
@@ -0,0 +1,154 @@
+# app/services/chunk_selection.py
+"""
+Selección de chunks representativos dentro de un presupuesto de tokens.
+
+Para generar un quiz no hace falta mandar el documento entero: se trocea, se
+puntúa cada chunk localmente con TF-IDF y se eligen con MMR (Maximal Marginal
+Relevance):
+
+    score = λ · sim(chunk, documento) − (1 − λ) · max sim(chunk, ya elegidos)
+            + bonus si el chunk cae en una sección del documento aún sin cubrir
+
+Así el contexto es representativo (parecido al documento completo), poco
+redundante y repartido a lo largo del texto. Los elegidos se devuelven en el
+orden original del documento. Sin dependencias externas.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List
+
+from .chunking import chunk_text, estimate_tokens
+
+# =========================
+# Configuración
+# =========================
+QUIZ_CONTEXT_TOKENS: int = int(os.getenv("QUIZ_CONTEXT_TOKENS", "2500"))
+QUIZ_CHUNK_TOKENS: int = int(os.getenv("QUIZ_CHUNK_TOKENS", "350"))
+MMR_LAMBDA: float = float(os.getenv("QUIZ_MMR_LAMBDA", "0.7"))
+SECTION_BONUS: float = float(os.getenv("QUIZ_SECTION_BONUS", "0.15"))
+
+# Separador entre fragmentos no contiguos
+GAP_MARKER = "\n\n[…]\n\n"
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+_STOPWORDS = frozenset(
+    """
+    que los las del con por para una uno unos unas como más pero sus este esta estos estas
+    ese esa esos esas son fue ser han hay sin sobre entre también muy cuando donde desde
+    todo todos toda todas otro otra otros otras the and for with that this from are was
+    were which have has not but its their they into been
+    """.split()
+)
+
+Vector = Dict[str, float]
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _normalize(vec: Vector) -> Vector:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {t: v / norm for t, v in vec.items()} if norm else {}
+
+
+def _cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def tfidf_vectors(chunks: List[str]) -> List[Vector]:
+    """Vectores TF-IDF (tf logarítmico, idf suavizado) normalizados L2."""
+    counts = [Counter(_terms(c)) for c in chunks]
+    df: Counter = Counter()
+    for c in counts:
+        df.update(c.keys())
+    n = len(chunks)
+    idf = {t: math.log((1 + n) / (1 + d)) + 1.0 for t, d in df.items()}
+    return [_normalize({t: (1.0 + math.log(f)) * idf[t] for t, f in c.items()}) for c in counts]
+
+
+def select_chunks(
+    chunks: List[str],
+    budget_tokens: int,
+    *,
+    lambda_: float = MMR_LAMBDA,
+    section_bonus: float = SECTION_BONUS,
+) -> List[int]:
+    """
+    Índices (en orden de documento) de los chunks elegidos para no pasar de
+    `budget_tokens`. Si todo cabe, devuelve todos.
+    """
+    sizes = [estimate_tokens(c) for c in chunks]
+    if sum(sizes) <= budget_tokens:
+        return list(range(len(chunks)))
+
+    vectors = tfidf_vectors(chunks)
+    centroid: Vector = {}
+    for vec in vectors:
+        for t, v in vec.items():
+            centroid[t] = centroid.get(t, 0.0) + v
+    centroid = _normalize(centroid)
+    relevance = [_cosine(v, centroid) for v in vectors]
+
+    # Secciones contiguas ≈ cantidad de chunks que entran en el presupuesto
+    avg = max(1, sum(sizes) // len(chunks))
+    sections = max(1, min(len(chunks), budget_tokens // avg))
+    section_of = [i * sections // len(chunks) for i in range(len(chunks))]
+
+    selected: List[int] = []
+    covered = set()
+    redundancy = [0.0] * len(chunks)  # max sim con lo ya elegido
+    remaining = budget_tokens
+    candidates = set(range(len(chunks)))
+
+    while candidates:
+        best, best_score = -1, -math.inf
+        for i in candidates:
+            if sizes[i] > remaining:
+                continue
+            score = lambda_ * relevance[i] - (1.0 - lambda_) * redundancy[i]
+            if section_of[i] not in covered:
+                score += section_bonus
+            if score > best_score:
+                best, best_score = i, score
+        if best < 0:
+            break
+        selected.append(best)
+        covered.add(section_of[best])
+        remaining -= sizes[best]
+        candidates.discard(best)
+        for i in candidates:
+            redundancy[i] = max(redundancy[i], _cosine(vectors[i], vectors[best]))
+
+    return sorted(selected)
+
+
+def build_context(
+    text: str,
+    budget_tokens: int = QUIZ_CONTEXT_TOKENS,
+    chunk_tokens: int = QUIZ_CHUNK_TOKENS,
+) -> str:
+    """
+    Texto base para el prompt: el documento completo si cabe en el
+    presupuesto; si no, los chunks elegidos, en orden, marcando los saltos.
+    """
+    text = (text or "").strip()
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+
+    chunks = chunk_text(text, max_tokens=min(chunk_tokens, budget_tokens))
+    picked = select_chunks(chunks, budget_tokens)
+    parts: List[str] = []
+    prev = None
+    for i in picked:
+        if parts:
+            parts.append("\n\n" if prev == i - 1 else GAP_MARKER)
+        parts.append(chunks[i])
+        prev = i
+    return "".join(parts)
@@ -0,0 +1,168 @@
+# app/services/chunking.py
+"""
+Chunking por presupuesto de tokens.
+
+- Conteo de tokens aproximado y local (sin descargar tokenizers): ~4 caracteres
+  por token, que es lo que rinde el BPE de OpenAI en texto en español/inglés.
+- Se corta por párrafos; si un párrafo no cabe, por oraciones; si una oración
+  no cabe, corte duro (en un espacio si hay uno cerca).
+- Solape opcional entre chunks consecutivos (en tokens).
+- Tiempo lineal: un solo recorrido con re.finditer y listas + join.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from typing import Iterator, List, Tuple
+
+# =========================
+# Configuración
+# =========================
+CHARS_PER_TOKEN: float = float(os.getenv("CHUNK_CHARS_PER_TOKEN", "4.0"))
+
+# Ventana de contexto (tokens) por modelo; lo desconocido usa el default.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1-nano": 1_047_576,
+    "gpt-3.5-turbo": 16_385,
+}
+DEFAULT_CONTEXT_TOKENS = 16_385
+
+# Tope práctico por chunk: chunks más grandes = menos requests, pero cada uno
+# más lento y con peor resumen. Se usa el menor entre esto y lo que permite el modelo.
+CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "3000"))
+# Reserva para instrucciones del prompt y para la respuesta
+PROMPT_OVERHEAD_TOKENS = 200
+OUTPUT_RESERVE_TOKENS = 1_000
+
+_PARA_SPLIT = re.compile(r"\n[ \t]*\n+")
+_SENTENCE_END = re.compile(r"(?<=[.!?…;:])\s+")
+
+# Un "unit" es un trozo de texto + el separador que lo une al anterior
+_Unit = Tuple[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cantidad aproximada de tokens de `text`."""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def tokens_to_chars(tokens: int) -> int:
+    return max(1, int(tokens * CHARS_PER_TOKEN))
+
+
+def chunk_budget_tokens(model: str | None, max_tokens: int = CHUNK_MAX_TOKENS) -> int:
+    """Tokens de texto por chunk según la ventana de contexto del modelo."""
+    context = MODEL_CONTEXT_TOKENS.get((model or "").lower(), DEFAULT_CONTEXT_TOKENS)
+    usable = context - PROMPT_OVERHEAD_TOKENS - OUTPUT_RESERVE_TOKENS
+    return max(1, min(max_tokens, usable))
+
+
+def _hard_split(text: str, max_chars: int) -> Iterator[str]:
+    """Corta `text` en trozos <= max_chars, preferentemente en un espacio."""
+    start, n = 0, len(text)
+    while start < n:
+        end = min(start + max_chars, n)
+        if end < n:
+            cut = text.rfind(" ", start + max_chars // 2, end)
+            if cut > start:
+                end = cut
+        piece = text[start:end].strip()
+        if piece:
+            yield piece
+        start = end
+
+
+def _units(text: str, max_chars: int) -> Iterator[_Unit]:
+    """Descompone el texto en unidades <= max_chars: párrafo → oración → corte duro."""
+    for para in _PARA_SPLIT.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            yield para, "\n\n"
+            continue
+
+        sep = "\n\n"
+        pos = 0
+        for m in _SENTENCE_END.finditer(para):
+            sentence = para[pos:m.start()]
+            pos = m.end()
+            yield from _sentence_units(sentence, max_chars, sep)
+            sep = " "
+        yield from _sentence_units(para[pos:], max_chars, sep)
+
+
+def _sentence_units(sentence: str, max_chars: int, sep: str) -> Iterator[_Unit]:
+    sentence = sentence.strip()
+    if not sentence:
+        return
+    if len(sentence) <= max_chars:
+        yield sentence, sep
+        return
+    for piece in _hard_split(sentence, max_chars):
+        yield piece, sep
+        sep = " "
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Divide `text` en chunks de a lo sumo ~max_tokens tokens.
+
+    overlap_tokens: cuántos tokens del final de un chunk se repiten al inicio
+    del siguiente (se solapan unidades completas, nunca más de la mitad del chunk).
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    max_chars = tokens_to_chars(max_tokens)
+    if len(text) <= max_chars:
+        return [text]
+
+    overlap_chars = min(tokens_to_chars(overlap_tokens) if overlap_tokens > 0 else 0, max_chars // 2)
+
+    out: List[str] = []
+    current: List[_Unit] = []
+    current_len = 0
+
+    def _flush() -> None:
+        parts: List[str] = []
+        for i, (piece, sep) in enumerate(current):
+            if i:
+                parts.append(sep)
+            parts.append(piece)
+        out.append("".join(parts))
+
+    for piece, sep in _units(text, max_chars):
+        add = len(piece) + (len(sep) if current else 0)
+        if current and current_len + add > max_chars:
+            _flush()
+            # Solape: arrastramos las últimas unidades que entren en overlap_chars
+            tail: List[_Unit] = []
+            tail_len = 0
+            if overlap_chars:
+                for unit in reversed(current):
+                    unit_len = len(unit[0]) + len(unit[1])
+                    if tail_len + unit_len > overlap_chars:
+                        break
+                    tail.append(unit)
+                    tail_len += unit_len
+                tail.reverse()
+            current = tail
+            current_len = sum(len(p) for p, _ in tail) + sum(len(s) for _, s in tail[1:])
+            if current and current_len + len(sep) + len(piece) > max_chars:
+                current, current_len = [], 0
+            add = len(piece) + (len(sep) if current else 0)
+        current.append((piece, sep))
+        current_len += add
+
+    if current:
+        _flush()
+    return out
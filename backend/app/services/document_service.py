@@ -1,27 +1,71 @@
 ﻿# app/services/document_service.py
+import base64
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import exists, select, tuple_
 from app.repositories.models import Document, Summary
 from app.schemas.document_schemas import DocumentIn
-from docx import Document as DocxReader
-from pypdf import PdfReader
-from io import BytesIO
+from app.services.blob_store import get_blob_store, lock_blob, store_document_text
+from app.services.file_ingest import extract_spooled, file_kind, spool_upload
 from fastapi import UploadFile
-import unicodedata
+
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", "50"))
+DOCUMENTS_PAGE_MAX = int(os.getenv("DOCUMENTS_PAGE_MAX", "200"))
+
+
+def encode_cursor(created_at: datetime, doc_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{doc_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(created_at, id) del último documento de la página anterior; ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, doc_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+
 
 class DocumentService:
-    def list(self, db: Session, owner_id: int) -> dict:
+    def list(
+        self,
+        db: Session,
+        owner_id: int,
+        *,
+        limit: int = DOCUMENTS_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> dict:
         """
-        Devuelve SOLO los documentos del usuario indicado.
+        Devuelve SOLO los documentos del usuario indicado, de a páginas.
+
+        Keyset sobre (created_at, id) descendente, apoyado en el índice
+        (user_id, created_at DESC, id DESC): cada página es un range scan de
+        `limit` filas, sin OFFSET, y sólo con las columnas que se listan.
         """
-        items = (
-            db.query(Document)
-            .filter(Document.user_id == owner_id)
-            .order_by(desc(Document.created_at))
-            .all()
+        limit = max(1, min(limit, DOCUMENTS_PAGE_MAX))
+        stmt = (
+            select(Document.id, Document.title, Document.description, Document.created_at)
+            .where(Document.user_id == owner_id)
+            .order_by(Document.created_at.desc(), Document.id.desc())
+            .limit(limit + 1)  # una de más para saber si hay página siguiente
         )
-        # El router espera {"items": [...]}
-        return {"items": items}
+        if cursor:
+            created_at, doc_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(Document.created_at, Document.id) < tuple_(created_at, doc_id))
+
+        rows = db.execute(stmt).all()
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+        # El router espera {"items": [...], "next_cursor": ...}
+        return {
+            "items": [{"id": r.id, "title": r.title, "description": r.description} for r in page],
+            "next_cursor": next_cursor,
+        }
 
     def create(self, db: Session, payload: DocumentIn, owner_id: int) -> Document:
         """
@@ -30,8 +74,9 @@ class DocumentService:
         doc = Document(
             title=payload.title,
             description=payload.description,
-            content=payload.content,
             user_id=owner_id,
+            # el cuerpo va al blob store (dedupe por hash); la fila sólo lo referencia
+            **store_document_text(payload.content, db),
         )
         db.add(doc)
         db.commit()
@@ -57,45 +102,40 @@ class DocumentService:
             Summary.user_id == owner_id
         ).delete(synchronize_session=False)
 
+        content_hash = doc.content_hash
         db.delete(doc)
         db.commit()
+
+        if content_hash:
+            self._collect_blob(db, content_hash)
         return True
+
+    def _collect_blob(self, db: Session, content_hash: str) -> None:
+        """
+        El blob es compartido (dedupe): sólo se borra si ya nadie lo usa. Con
+        el lock del hash, un alta concurrente del mismo contenido o ya hizo
+        commit (y el EXISTS la ve) o espera a que terminemos (y su put vuelve
+        a escribir el archivo).
+        """
+        lock_blob(db, content_hash)
+        try:
+            if not db.scalar(select(exists().where(Document.content_hash == content_hash))):
+                get_blob_store().delete(content_hash)
+        finally:
+            db.commit()  # libera el lock
     
     async def extract_text_from_file(self, file: UploadFile) -> dict:
-        filename = file.filename.lower()
-
-        # === TXT ===
-        if filename.endswith(".txt"):
-            data = await file.read()
-            text = data.decode("utf-8", errors="ignore")
-            base = filename.replace(".txt", "")
-        # === PDF ===
-        elif filename.endswith(".pdf"):
-            try:
-                reader = PdfReader(BytesIO(await file.read()))
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                base = filename.replace(".pdf", "")
-            except Exception as e:
-                raise ValueError("No se pudo leer el PDF")
-        # === DOCX ===
-        elif filename.endswith(".docx"):
-            try:
-                doc = DocxReader(BytesIO(await file.read()))
-                text = "\n".join([p.text for p in doc.paragraphs])
-                base = filename.replace(".docx", "")
-            except:
-                raise ValueError("No se pudo leer el archivo DOCX")
-        else:
-            raise ValueError("Formato no permitido. Usa TXT, PDF o DOCX.")
-
-        # Normaliza espacios y genera descripción corta
-        clean_text = " ".join(text.split())
-        desc = clean_text[:160] if clean_text else None
+        """
+        Extrae {title, description, content} del upload (TXT, PDF o DOCX).
+        El archivo se vuelca a un temporal en bloques (límite UPLOAD_MAX_BYTES)
+        y se extrae de a página/párrafo, sin tenerlo entero en memoria; los
+        PDFs en el pool de procesos (ExtractionBusyError si está saturado).
+        """
+        filename = (file.filename or "").lower()
+        file_kind(filename)  # formato inválido: error antes de leer nada
 
-        return {
-            "title": base[:200],
-            "description": desc,
-            "content": text
-        }
+        spool = await spool_upload(file)
+        try:
+            return await extract_spooled(spool, filename)
+        finally:
+            spool.discard()
@@ -0,0 +1,130 @@
+# app/services/extraction_cache.py
+"""
+Caché de extracción de texto direccionada por contenido.
+
+La clave es el SHA-256 de los bytes subidos (calculado mientras se vuelca el
+upload, ver file_ingest.spool_upload) + el tipo de archivo. Si alguien sube
+el mismo PDF otra vez, el texto sale de acá sin volver a parsearlo.
+
+Se guarda en SQLite local, comprimido (zlib), acotado por bytes en disco:
+al pasarse de EXTRACT_CACHE_MAX_BYTES se borran los menos usados.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+# =========================
+# Configuración
+# =========================
+EXTRACT_CACHE_ENABLED: bool = os.getenv("EXTRACT_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+# Relativa al directorio backend/ (como BLOB_STORE_PATH), no al cwd
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EXTRACT_CACHE_PATH: str = os.path.join(
+    _BACKEND_DIR, os.getenv("EXTRACT_CACHE_PATH", os.path.join(".cache", "extract_cache.sqlite3"))
+)
+EXTRACT_CACHE_MAX_BYTES: int = int(os.getenv("EXTRACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class ExtractionCache:
+    """{description, content} por (tipo, sha256), con contadores."""
+
+    def __init__(self, path: str = EXTRACT_CACHE_PATH, *, max_bytes: int = EXTRACT_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+
+        # SQLite se abre en el primer uso (ver _disk), no al construir
+        self._path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _disk(self) -> sqlite3.Connection:
+        """Conexión a SQLite, abierta la primera vez (llamar con self._lock tomado)."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS extract_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " source_size INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS ix_extract_cache_accessed ON extract_cache (accessed_at)")
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def make_key(kind: str, sha256: str) -> str:
+        return f"{kind}:{sha256}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._disk()
+            row = db.execute(
+                "SELECT value, source_size FROM extract_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            db.execute("UPDATE extract_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._stats["hits"] += 1
+            self._stats["bytes_saved"] += row[1]  # bytes que no hubo que volver a parsear
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, value: Dict[str, Any], source_size: int) -> None:
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return  # no entra ni solo
+        with self._lock:
+            self._disk().execute(
+                "INSERT OR REPLACE INTO extract_cache (key, value, size, source_size, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), source_size, time.time()),
+            )
+            self._stats["stores"] += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM extract_cache").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Fuera los menos usados hasta volver bajo el límite
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM extract_cache ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._db.executemany("DELETE FROM extract_cache WHERE key = ?", victims)
+        self._stats["evictions"] += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["items"], out["disk_bytes"] = self._disk().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extract_cache"
+            ).fetchone()
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        out["max_bytes"] = self.max_bytes
+        return out
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Caché compartida del proceso (None si está deshabilitada)."""
+    global _cache
+    if _cache is None and EXTRACT_CACHE_ENABLED:
+        _cache = ExtractionCache()
+    return _cache
@@ -0,0 +1,170 @@
+# app/services/fake_provider.py
+"""
+Proveedor de IA falso, local y determinista (para benchmarks y desarrollo offline).
+
+La misma entrada produce siempre la misma salida. La latencia, la tasa de
+errores y el tamaño de la respuesta se configuran por variables de entorno:
+
+    LLM_PROVIDER=fake
+    FAKE_LLM_LATENCY_MS=800          # media
+    FAKE_LLM_LATENCY_DIST=lognormal  # const | uniform | lognormal
+    FAKE_LLM_LATENCY_JITTER=0.5      # dispersión relativa (uniform/lognormal)
+    FAKE_LLM_ERROR_RATE=0.0          # 0..1 → la llamada devuelve None
+    FAKE_LLM_WORDS_PER_SENTENCE=14
+    FAKE_LLM_SEED=0
+
+Las funciones fake_* también las usa el servidor HTTP falso (bench/fake_openai_server.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .llm_provider import LlmProvider
+
+FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_DIST: str = os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal")
+FAKE_LLM_LATENCY_JITTER: float = float(os.getenv("FAKE_LLM_LATENCY_JITTER", "0.5"))
+FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))
+FAKE_LLM_WORDS_PER_SENTENCE: int = int(os.getenv("FAKE_LLM_WORDS_PER_SENTENCE", "14"))
+FAKE_LLM_SEED: str = os.getenv("FAKE_LLM_SEED", "0")
+
+_WORD = re.compile(r"\w{3,}")
+
+
+def fake_rng(*parts: Any) -> random.Random:
+    """RNG sembrado con el contenido de la llamada → salida determinista."""
+    h = hashlib.sha256(repr((FAKE_LLM_SEED,) + parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(h[:8], "big"))
+
+
+def sample_latency_s(
+    rng: random.Random,
+    mean_ms: float = FAKE_LLM_LATENCY_MS,
+    dist: str = FAKE_LLM_LATENCY_DIST,
+    jitter: float = FAKE_LLM_LATENCY_JITTER,
+) -> float:
+    if mean_ms <= 0:
+        return 0.0
+    if dist == "const":
+        ms = mean_ms
+    elif dist == "uniform":
+        ms = rng.uniform(mean_ms * (1 - jitter), mean_ms * (1 + jitter))
+    else:
+        # lognormal con media = mean_ms (cola larga, como una API real)
+        sigma = max(jitter, 1e-6)
+        ms = rng.lognormvariate(math.log(mean_ms) - sigma * sigma / 2, sigma)
+    return max(0.0, ms) / 1000.0
+
+
+def _vocab(text: str) -> List[str]:
+    words = _WORD.findall(text or "")[:5000]
+    return words or ["estudio", "documento", "concepto", "resumen", "ejemplo"]
+
+
+def fake_summary(text: str, sentences: int, rng: random.Random, words_per_sentence: int = FAKE_LLM_WORDS_PER_SENTENCE) -> str:
+    vocab = _vocab(text)
+    out = []
+    for _ in range(max(1, sentences)):
+        n = max(3, int(rng.gauss(words_per_sentence, words_per_sentence / 4)))
+        words = [rng.choice(vocab) for _ in range(n)]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def fake_quiz(text: str, size: int, rng: random.Random) -> Dict[str, Any]:
+    vocab = _vocab(text)
+    questions = []
+    for i in range(max(1, size)):
+        topic = " ".join(rng.choice(vocab) for _ in range(4))
+        options = [" ".join(rng.choice(vocab) for _ in range(3)) for _ in range(4)]
+        questions.append(
+            {
+                "question": f"Pregunta {i + 1}: ¿qué afirma el texto sobre {topic}?",
+                "options": options,
+                "answer_index": rng.randrange(4),
+                "explanation": fake_summary(text, 1, rng),
+            }
+        )
+    return {"title": "Quiz de prueba", "questions": questions}
+
+
+class FakeLlmProvider(LlmProvider):
+    name = "fake"
+
+    def __init__(
+        self,
+        *,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        latency_dist: str = FAKE_LLM_LATENCY_DIST,
+        jitter: float = FAKE_LLM_LATENCY_JITTER,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    def cache_params(self, op: str) -> Dict[str, Any]:
+        return {"model": "fake", "seed": FAKE_LLM_SEED}
+
+    async def _wait(self, rng: random.Random) -> bool:
+        """Simula la latencia; devuelve False si esta llamada debe fallar."""
+        await asyncio.sleep(sample_latency_s(rng, self.latency_ms, self.latency_dist, self.jitter))
+        return rng.random() >= self.error_rate
+
+    async def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
+        rng = fake_rng("summarize", text, target_sentences)
+        if not await self._wait(rng):
+            return None
+        return fake_summary(text, target_sentences, rng)
+
+    async def stream_summarize_text(
+        self, text: str, *, target_sentences: int, timeout_s: float = 12.0
+    ) -> AsyncIterator[str]:
+        rng = fake_rng("summarize", text, target_sentences)
+        if not await self._wait(rng):
+            raise RuntimeError("fake provider error")
+        words = fake_summary(text, target_sentences, rng).split(" ")
+        for i, w in enumerate(words):
+            await asyncio.sleep(0.005)
+            yield w if i == 0 else " " + w
+
+    async def generate_quiz(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        rng = fake_rng("quiz", title, text, size, *(avoid or ()))
+        if not await self._wait(rng):
+            return None
+        return fake_quiz(text, size, rng)
+
+    async def stream_quiz_questions(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        rng = fake_rng("quiz", title, text, size, *(avoid or ()))
+        # La latencia se reparte entre preguntas, como un stream real
+        delay = sample_latency_s(rng, self.latency_ms, self.latency_dist, self.jitter)
+        fail = rng.random() < self.error_rate
+        questions = fake_quiz(text, size, rng)["questions"]
+        for i, q in enumerate(questions):
+            await asyncio.sleep(delay / len(questions))
+            if fail and i == len(questions) // 2:
+                raise RuntimeError("fake provider error")
+            yield q
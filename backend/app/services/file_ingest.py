@@ -0,0 +1,214 @@
+# app/services/file_ingest.py
+"""
+Ingesta de archivos subidos sin leer el archivo entero a memoria.
+
+Lo acotado es el upload (los bytes del archivo), no el texto extraído: el
+cuerpo del documento se guarda entero (blob_store lo hashea y comprime de
+una vez, y DocumentIn lo lleva como str), así que el texto completo termina
+en memoria, y al juntar los trozos hay un pico de ~2x su tamaño. Un PDF
+grande con poco texto ya no cuesta su tamaño en RAM; un texto enorme sí.
+
+- spool_upload: copia el upload a un archivo temporal en bloques de
+  UPLOAD_CHUNK_BYTES, cortando apenas supera UPLOAD_MAX_BYTES (nunca se lee
+  el archivo entero a memoria) y calculando su SHA-256 al vuelo. Es un
+  archivo con nombre: los procesos del pool de PDFs lo abren por ruta.
+- iter_*_text: extractores que devuelven el texto de a trozos (por página,
+  por bloque o por párrafo) leyendo del archivo temporal.
+- extract_document: junta los trozos una sola vez ("".join sobre la lista
+  de trozos) y arma título/descripción sin hacer una copia normalizada del
+  texto completo.
+- extract_spooled: versión async; primero mira la caché de extracción (por
+  SHA-256); si no está, los PDFs van al pool de procesos (pdf_pool) y
+  TXT/DOCX a un hilo. Nada de esto corre en el event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import hashlib
+import os
+import tempfile
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional
+
+from docx import Document as DocxReader
+from fastapi import UploadFile
+from pypdf import PdfReader
+
+from .extraction_cache import get_extraction_cache
+from .pdf_pool import extract_pdf_pages
+
+# =========================
+# Configuración
+# =========================
+UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+DESCRIPTION_CHARS = 160
+
+
+class FileTooLargeError(ValueError):
+    """El upload supera UPLOAD_MAX_BYTES."""
+
+
+class SpooledUpload:
+    """Upload volcado a un temporal, con su SHA-256 y tamaño."""
+
+    __slots__ = ("file", "sha256", "size")
+
+    def __init__(self, file: IO[bytes], sha256: str, size: int) -> None:
+        self.file = file
+        self.sha256 = sha256
+        self.size = size
+
+    @property
+    def name(self) -> str:
+        return self.file.name
+
+    def discard(self) -> None:
+        """Cierra y borra el temporal."""
+        self.file.close()
+        try:
+            os.unlink(self.file.name)
+        except OSError:
+            pass
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """
+    Copia el upload a un temporal en bloques (hasheando al vuelo) y lo deja
+    posicionado al inicio. Lanza FileTooLargeError en cuanto se pasa del límite.
+    """
+    # delete=False: en Windows un NamedTemporaryFile abierto no se puede reabrir por nombre
+    fp = tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise FileTooLargeError(f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB")
+            digest.update(chunk)
+            fp.write(chunk)
+        fp.flush()
+        fp.seek(0)
+    except BaseException:
+        SpooledUpload(fp, "", size).discard()
+        raise
+    return SpooledUpload(fp, digest.hexdigest(), size)
+
+
+# =========================
+# Extractores (de a trozos)
+# =========================
+def iter_txt_text(fp: IO[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        chunk = fp.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_pdf_text(fp: IO[bytes]) -> Iterator[str]:
+    # PdfReader lee el archivo a demanda; cada página se extrae y se suelta
+    for page in PdfReader(fp).pages:
+        yield page.extract_text() or ""
+
+
+def iter_docx_text(fp: IO[bytes]) -> Iterator[str]:
+    for i, p in enumerate(DocxReader(fp).paragraphs):
+        yield ("\n" if i else "") + p.text
+
+
+# extensión -> (extractor, mensaje si el archivo está roto)
+EXTRACTORS: Dict[str, tuple[Callable[[IO[bytes]], Iterator[str]], Optional[str]]] = {
+    ".txt": (iter_txt_text, None),
+    ".pdf": (iter_pdf_text, "No se pudo leer el PDF"),
+    ".docx": (iter_docx_text, "No se pudo leer el archivo DOCX"),
+}
+
+
+def file_kind(filename: str) -> str:
+    """Extensión soportada del archivo; ValueError si no lo es."""
+    for ext in EXTRACTORS:
+        if filename.endswith(ext):
+            return ext
+    raise ValueError("Formato no permitido. Usa TXT, PDF o DOCX.")
+
+
+def _description(parts: List[str]) -> Optional[str]:
+    """
+    Primeros 160 caracteres del texto con espacios normalizados (igual que
+    " ".join(text.split())[:160]) sin normalizar el texto completo.
+    """
+    head = ""
+    for part in parts:
+        raw = head + part
+        head = " ".join(raw.split())
+        if head and raw[-1:].isspace():
+            head += " "  # la palabra siguiente no se pega a la anterior
+        if len(head) > DESCRIPTION_CHARS:
+            break
+    else:
+        head = head.rstrip()
+    return head[:DESCRIPTION_CHARS] or None
+
+
+def _title(filename: str, kind: str) -> str:
+    return filename.replace(kind, "")[:200]
+
+
+def build_result(filename: str, kind: str, parts: List[str]) -> Dict[str, Any]:
+    return {
+        "title": _title(filename, kind),
+        "description": _description(parts),
+        "content": "".join(parts),
+    }
+
+
+def extract_document(fp: IO[bytes], filename: str) -> Dict[str, Any]:
+    """{title, description, content} a partir del archivo ya volcado en `fp`."""
+    filename = filename.lower()
+    kind = file_kind(filename)
+    extractor, error = EXTRACTORS[kind]
+    try:
+        parts = list(extractor(fp))
+    except Exception:
+        if error is None:
+            raise
+        raise ValueError(error)
+    return build_result(filename, kind, parts)
+
+
+async def extract_spooled(spool: SpooledUpload, filename: str) -> Dict[str, Any]:
+    """
+    Como extract_document, fuera del event loop (PDFs en el pool de procesos)
+    y pasando primero por la caché de extracción.
+    """
+    filename = filename.lower()
+    kind = file_kind(filename)
+    cache = get_extraction_cache()
+    key = cache.make_key(kind, spool.sha256) if cache is not None else ""
+    if cache is not None:
+        hit = await asyncio.to_thread(cache.get, key)
+        if hit is not None:
+            # el título sale del nombre de archivo, que puede ser otro
+            return {"title": _title(filename, kind), **hit}
+
+    if kind == ".pdf":
+        out = build_result(filename, kind, await extract_pdf_pages(spool.name))
+    else:
+        out = await asyncio.to_thread(extract_document, spool.file, filename)
+
+    if cache is not None:
+        value = {"description": out["description"], "content": out["content"]}
+        await asyncio.to_thread(cache.set, key, value, spool.size)
+    return out
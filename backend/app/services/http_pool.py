@@ -0,0 +1,144 @@
+# app/services/http_pool.py
+"""
+Pool HTTP compartido por todos los clientes de IA del proceso.
+
+Un único httpx.AsyncClient (keep-alive, HTTP/2 si está instalado `h2`) y un
+único AsyncOpenAI montado encima: cada llamada reutiliza conexiones ya
+abiertas en vez de pagar TCP+TLS de nuevo. Se cierra en el shutdown de la
+app (lifespan) y del worker.
+
+    LLM_HTTP_MAX_CONNECTIONS=100
+    LLM_HTTP_MAX_KEEPALIVE=20
+    LLM_HTTP_KEEPALIVE_EXPIRY_S=60
+    LLM_HTTP_CONNECT_TIMEOUT_S=5
+    LLM_HTTP_TIMEOUT_S=120
+    LLM_HTTP2=1                  # sólo si `h2` está instalado
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+from typing import Any, Dict, Optional, Set
+
+import httpx
+from openai import AsyncOpenAI
+
+LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY_S: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_S", "60"))
+LLM_HTTP_CONNECT_TIMEOUT_S: float = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT_S", "5"))
+LLM_HTTP_TIMEOUT_S: float = float(os.getenv("LLM_HTTP_TIMEOUT_S", "120"))
+LLM_HTTP2: bool = (
+    os.getenv("LLM_HTTP2", "1") not in ("0", "false", "False", "")
+    and importlib.util.find_spec("h2") is not None
+)
+# Los reintentos los hace OpenAiAdapter._call (con el limitador); el SDK no reintenta
+OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+_client: Optional[httpx.AsyncClient] = None
+_openai: Optional[AsyncOpenAI] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_closing: Set["asyncio.Future[None]"] = set()  # cierres de clientes viejos en curso
+_stats = {"clients_created": 0, "requests": 0, "responses": 0}
+
+
+async def _on_request(request: httpx.Request) -> None:
+    _stats["requests"] += 1
+
+
+async def _on_response(response: httpx.Response) -> None:
+    _stats["responses"] += 1
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:
+        pass  # sus conexiones pueden ser de un loop que ya cerró
+
+
+def _discard(client: httpx.AsyncClient, old_loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Programa el cierre de un cliente reemplazado (sin bloquear al que lo reemplaza)."""
+    if client.is_closed:
+        return
+    if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+        # su loop sigue vivo (en otro hilo): que lo cierre él
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), old_loop)
+        return
+    task = asyncio.ensure_future(_aclose_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Cliente HTTP compartido. Las conexiones pertenecen al event loop que las
+    abrió: si cambia el loop (p. ej. varios asyncio.run), se crea uno nuevo
+    y se cierra el anterior.
+    """
+    global _client, _openai, _loop
+    try:
+        loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _client is None or _client.is_closed or (loop is not None and _loop is not None and loop is not _loop):
+        if _client is not None:
+            _discard(_client, _loop)
+        _client = httpx.AsyncClient(
+            http2=LLM_HTTP2,
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=httpx.Timeout(LLM_HTTP_TIMEOUT_S, connect=LLM_HTTP_CONNECT_TIMEOUT_S),
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+        _openai = None
+        _loop = loop
+        _stats["clients_created"] += 1
+    return _client
+
+
+def get_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """AsyncOpenAI compartido, montado sobre el pool HTTP del proceso."""
+    global _openai
+    http_client = get_http_client()
+    if _openai is None:
+        _openai = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+    return _openai
+
+
+async def close_http_pool() -> None:
+    """Cierra el pool (shutdown de la app / del worker)."""
+    global _client, _openai, _loop
+    client, _client, _openai, _loop = _client, None, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "http2": LLM_HTTP2,
+        "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+        "max_keepalive": LLM_HTTP_MAX_KEEPALIVE,
+        "open": _client is not None and not _client.is_closed,
+        **_stats,
+    }
+    # httpx/httpcore no exponen métricas de conexiones: se leen atributos
+    # privados que pueden cambiar entre versiones. Si no están (o cambiaron),
+    # esos campos simplemente no se informan.
+    try:
+        connections = list(_client._transport._pool.connections)  # type: ignore[union-attr]
+        idle = sum(1 for c in connections if c.is_idle())
+    except Exception:
+        return out
+    out["connections"] = len(connections)
+    out["idle_connections"] = idle
+    out["active_connections"] = len(connections) - idle
+    return out
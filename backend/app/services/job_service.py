@@ -0,0 +1,233 @@
+# app/services/job_service.py
+"""
+Cola de trabajos de IA sobre Postgres (tabla studyforge.jobs).
+
+- Encolar: idempotente (si ya hay un job igual pending/running, se reutiliza);
+  un índice único parcial lo garantiza aun con requests concurrentes.
+- Consumir: `SELECT ... FOR UPDATE SKIP LOCKED`, así varios workers (en uno o
+  varios nodos) nunca toman el mismo job.
+- Reintentos con backoff exponencial + jitter; al agotar intentos → failed.
+- Lease: un job "running" cuyo worker murió vuelve a pending tras JOB_LEASE_S
+  (o a failed si ya agotó sus intentos). Mientras corre, el worker renueva
+  `locked_at` cada JOB_HEARTBEAT_S para que un job largo no se ejecute dos veces.
+  mark_done/mark_failed sólo escriben si el job sigue siendo de ese worker: uno
+  al que le vencieron el lease no pisa el estado del nuevo dueño.
+"""
+from __future__ import annotations
+
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.repositories.models import Document, Job
+from app.services.quiz_service import QuizService
+from app.services.summary_service import generate_auto_summary
+
+# =========================
+# Configuración
+# =========================
+JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_BASE_S: float = float(os.getenv("JOB_BACKOFF_BASE_S", "5"))
+JOB_BACKOFF_MAX_S: float = float(os.getenv("JOB_BACKOFF_MAX_S", "300"))
+JOB_LEASE_S: float = float(os.getenv("JOB_LEASE_S", "600"))
+JOB_HEARTBEAT_S: float = float(os.getenv("JOB_HEARTBEAT_S", str(JOB_LEASE_S / 3)))
+
+JOB_KINDS = ("summary", "quiz")
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class PermanentJobError(Exception):
+    """Error que no tiene sentido reintentar (p. ej. el documento ya no existe)."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobService:
+    # ---------- API (lado productor) ----------
+    def enqueue(
+        self,
+        db: Session,
+        user_id: int,
+        kind: str,
+        document_id: int,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Job:
+        """
+        Encola un trabajo. Si el mismo usuario ya tiene uno igual en curso
+        (mismo kind/documento/params), devuelve ese en vez de duplicarlo.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        params = params or {}
+
+        # Si otra request inserta el mismo job entre el SELECT y el INSERT,
+        # el índice único parcial hace que el INSERT no haga nada y se relee.
+        # (Reintento por si ese job termina justo en el medio.)
+        for _ in range(3):
+            existing = self._active(db, user_id, kind, document_id, params)
+            if existing:
+                return existing
+
+            job_id = db.execute(
+                insert(Job)
+                .values(
+                    kind=kind,
+                    status="pending",
+                    user_id=user_id,
+                    document_id=document_id,
+                    params=params,
+                    max_attempts=JOB_MAX_ATTEMPTS,
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[Job.user_id, Job.kind, Job.document_id, Job.params],
+                    # literal, igual que el predicado del índice (con parámetros
+                    # Postgres no puede inferir el índice parcial)
+                    index_where=text("status IN ('pending', 'running')"),
+                )
+                .returning(Job.id)
+            ).scalar()
+            db.commit()
+            if job_id is not None:
+                return db.get(Job, job_id)
+        raise RuntimeError("Could not enqueue job")
+
+    def _active(self, db: Session, user_id: int, kind: str, document_id: int, params: Dict[str, Any]) -> Optional[Job]:
+        return (
+            db.query(Job)
+            .filter(
+                Job.user_id == user_id,
+                Job.kind == kind,
+                Job.document_id == document_id,
+                Job.status.in_(ACTIVE_STATUSES),
+                Job.params == params,
+            )
+            .order_by(Job.id.desc())
+            .first()
+        )
+
+    def get(self, db: Session, user_id: int, job_id: int) -> Optional[Job]:
+        return (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.user_id == user_id)
+            .first()
+        )
+
+    # ---------- API (lado worker) ----------
+    def claim(self, db: Session, worker_id: str) -> Optional[Job]:
+        """Toma el próximo job pendiente (o None). Seguro entre workers concurrentes."""
+        stmt = (
+            select(Job)
+            .where(Job.status == "pending", Job.run_after <= _now(), Job.attempts < Job.max_attempts)
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = db.execute(stmt).scalars().first()
+        if job is None:
+            db.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker_id[:100]
+        job.locked_at = _now()
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def heartbeat(self, db: Session, job_id: int, worker_id: str) -> bool:
+        """Renueva el lease de un job en curso. False si ya no es de este worker."""
+        res = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running", Job.locked_by == worker_id[:100])
+            .values(locked_at=_now())
+        )
+        db.commit()
+        return bool(res.rowcount)
+
+    def _finish(self, db: Session, job_id: int, worker_id: str, **values: Any) -> bool:
+        """UPDATE condicionado a que `worker_id` siga siendo el dueño del job."""
+        res = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running", Job.locked_by == worker_id[:100])
+            .values(locked_by=None, locked_at=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return bool(res.rowcount)
+
+    def mark_done(self, db: Session, job: Job, result: Dict[str, Any], *, worker_id: str) -> bool:
+        """False si el job ya no es de este worker (lease vencido y re-tomado)."""
+        return self._finish(db, job.id, worker_id, status="done", result=result, error=None)
+
+    def mark_failed(self, db: Session, job: Job, error: str, *, worker_id: str, retry: bool = True) -> Optional[str]:
+        """
+        Reprograma con backoff si quedan intentos; si no, lo deja en failed.
+        Devuelve el nuevo status, o None si el job ya no es de este worker.
+        """
+        values: Dict[str, Any] = {"error": error[:2000]}
+        if retry and job.attempts < job.max_attempts:
+            delay = min(JOB_BACKOFF_MAX_S, JOB_BACKOFF_BASE_S * (2 ** (job.attempts - 1)))
+            delay *= random.uniform(0.8, 1.2)
+            values.update(status="pending", run_after=_now() + timedelta(seconds=delay))
+        else:
+            values["status"] = "failed"
+        return values["status"] if self._finish(db, job.id, worker_id, **values) else None
+
+    def requeue_stale(self, db: Session, lease_s: float = JOB_LEASE_S) -> int:
+        """
+        Jobs 'running' de workers que murieron (lease vencido): vuelven a
+        pending si les quedan intentos; si no, a failed (un job que tumba al
+        worker cada vez no se re-ejecuta para siempre).
+        """
+        stale = (Job.status == "running", Job.locked_at < _now() - timedelta(seconds=lease_s))
+        failed = db.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(
+                status="failed",
+                error="Lease expired: worker died while running the job",
+                locked_by=None,
+                locked_at=None,
+            )
+        )
+        requeued = db.execute(
+            update(Job)
+            .where(*stale, Job.attempts < Job.max_attempts)
+            .values(status="pending", locked_by=None, locked_at=None, run_after=_now())
+        )
+        db.commit()
+        return (failed.rowcount or 0) + (requeued.rowcount or 0)
+
+    # ---------- Ejecución ----------
+    async def run(self, db: Session, job: Job) -> Dict[str, Any]:
+        """Ejecuta el pipeline de IA del job y devuelve el `result` a guardar."""
+        doc = (
+            db.query(Document)
+            .filter(Document.id == job.document_id, Document.user_id == job.user_id)
+            .first()
+        )
+        if not doc:
+            raise PermanentJobError("Document not found")
+
+        params = job.params or {}
+        if job.kind == "summary":
+            out = await generate_auto_summary(
+                db, job.user_id, doc, max_sentences=int(params.get("max_sentences", 5))
+            )
+            return {"summary_id": out.id}
+
+        if job.kind == "quiz":
+            qz = await QuizService().create_auto(
+                db, job.user_id, job.document_id, int(params.get("size", 6))
+            )
+            return {"quiz_id": qz.id}
+
+        raise PermanentJobError(f"Unknown job kind: {job.kind}")
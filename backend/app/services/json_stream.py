@@ -0,0 +1,133 @@
+# app/services/json_stream.py
+"""
+Parser JSON incremental para respuestas de quiz en streaming.
+
+Se le van pasando trozos de texto (deltas del modelo) y devuelve cada objeto
+del array "questions" apenas se cierra su llave, sin esperar al resto. Si el
+stream se corta, lo ya devuelto es válido (el prefijo se conserva).
+
+Tolera lo que suele rodear al JSON: ```json ... ```, texto antes de la primera
+llave y claves con espacios/comillas de más (' "questions" ').
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+def _norm_key(key: str) -> str:
+    return key.strip().strip('"').strip("'").strip()
+
+
+class QuizStreamParser:
+    """
+    Máquina de estados sobre caracteres: pila de contenedores, strings con
+    escapes y la clave actual de cada objeto. Sólo acumula texto mientras hay
+    una pregunta abierta.
+    """
+
+    def __init__(self, array_key: str = "questions") -> None:
+        self.array_key = array_key
+        self.title: Optional[str] = None
+        self.done = False  # se cerró el objeto raíz
+
+        # Pila de frames: {"t": "o"|"a", "name": clave bajo la que cuelga,
+        #                  "key": clave actual (objetos), "expect": "key"|"value"}
+        self._stack: List[Dict[str, Any]] = []
+        self._in_str = False
+        self._esc = False
+        self._str: List[str] = []
+        self._item: List[str] = []  # pregunta en curso (texto crudo)
+        self._item_depth = 0  # profundidad de la pila al abrir la pregunta
+
+    def _in_questions_array(self) -> bool:
+        top = self._stack[-1] if self._stack else None
+        return bool(
+            top and top["t"] == "a" and len(self._stack) == 2
+            and isinstance(top["name"], str) and self.array_key in top["name"]
+        )
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Procesa `chunk` y devuelve las preguntas completadas en él."""
+        out: List[Dict[str, Any]] = []
+        for c in chunk:
+            if self.done:
+                break
+            if self._item_depth:
+                self._item.append(c)
+
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    self._on_string("".join(self._str))
+                    continue
+                self._str.append(c)
+                continue
+
+            if not self._stack:
+                # Fuera del JSON (```json, texto suelto): esperamos la primera llave
+                if c == "{":
+                    self._stack.append({"t": "o", "name": None, "key": None, "expect": "key"})
+                continue
+
+            top = self._stack[-1]
+            if c == '"':
+                self._in_str = True
+                self._str = []
+            elif c in "{[":
+                name = top["key"] if top["t"] == "o" else top["name"]
+                if c == "{" and not self._item_depth and self._in_questions_array():
+                    self._item = ["{"]
+                    self._item_depth = len(self._stack) + 1
+                if c == "{":
+                    self._stack.append({"t": "o", "name": name, "key": None, "expect": "key"})
+                else:
+                    self._stack.append({"t": "a", "name": name, "key": None, "expect": "value"})
+            elif c in "}]":
+                self._stack.pop()
+                if self._item_depth and len(self._stack) == self._item_depth - 1:
+                    item = self._close_item()
+                    if item is not None:
+                        out.append(item)
+                if not self._stack:
+                    self.done = True
+            elif c == ":" and top["t"] == "o":
+                top["expect"] = "value"
+            elif c == "," and top["t"] == "o":
+                top["expect"] = "key"
+        return out
+
+    def _on_string(self, raw: str) -> None:
+        top = self._stack[-1] if self._stack else None
+        if top is None or top["t"] != "o":
+            return
+        if top["expect"] == "key":
+            top["key"] = _norm_key(self._decode(raw))
+        elif len(self._stack) == 1 and top["key"] == "title":
+            self.title = self._decode(raw)
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+
+    def _close_item(self) -> Optional[Dict[str, Any]]:
+        raw = "".join(self._item)
+        self._item = []
+        self._item_depth = 0
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def parse_questions_prefix(text: str) -> List[Dict[str, Any]]:
+    """Preguntas completas de un JSON quizás truncado (todo de una vez)."""
+    return QuizStreamParser().feed(text or "")
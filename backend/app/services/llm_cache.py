@@ -0,0 +1,280 @@
+# app/services/llm_cache.py
+"""
+Caché de respuestas de IA direccionada por contenido.
+
+La clave es un SHA-256 de (proveedor, operación, modelo/parámetros de muestreo,
+entrada). Dos niveles:
+- memoria: LRU acotado por cantidad de entradas (OrderedDict)
+- disco:   SQLite local, acotado por cantidad de filas
+
+Ambos niveles respetan un TTL. Sólo se cachean respuestas válidas (nunca None).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .llm_provider import LlmProvider
+
+# =========================
+# Configuración
+# =========================
+LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+# Relativa al directorio backend/ (como BLOB_STORE_PATH), no al cwd; "" = sólo memoria
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+LLM_CACHE_PATH: str = os.path.join(_BACKEND_DIR, _LLM_CACHE_PATH) if _LLM_CACHE_PATH else ""
+LLM_CACHE_TTL_S: float = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ITEMS: int = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512"))
+LLM_CACHE_DISK_ITEMS: int = int(os.getenv("LLM_CACHE_DISK_ITEMS", "20000"))
+
+
+def make_key(provider: str, op: str, params: Dict[str, Any], inputs: Dict[str, Any]) -> str:
+    """SHA-256 estable de todo lo que determina la respuesta del modelo."""
+    raw = json.dumps(
+        {"provider": provider, "op": op, "params": params, "inputs": inputs},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """Caché en dos niveles (memoria LRU + SQLite) con TTL y contadores."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        *,
+        ttl_s: float = LLM_CACHE_TTL_S,
+        max_memory_items: int = LLM_CACHE_MEMORY_ITEMS,
+        max_disk_items: int = LLM_CACHE_DISK_ITEMS,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.max_memory_items = max(0, max_memory_items)
+        self.max_disk_items = max(0, max_disk_items)
+
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        # SQLite se abre en el primer uso (ver _disk): construir el servicio
+        # al importar un router no crea archivos
+        self._path = path if self.max_disk_items > 0 else ""
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """Conexión a SQLite, abierta la primera vez (llamar con self._lock tomado)."""
+        if self._db is None and self._path:
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+            self._db = db
+        return self._db
+
+    # ---------- Lectura ----------
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                expires_at, value = hit
+                if expires_at > now:
+                    self._mem.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._mem[key]
+                self._stats["expired"] += 1
+
+            if self._disk() is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, expires_at, value)
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    # ---------- Escritura ----------
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_s
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._stats["stores"] += 1
+            if self._disk() is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        if self.max_memory_items == 0:
+            return
+        self._mem[key] = (expires_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_memory_items:
+            self._mem.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        assert self._db is not None
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_disk_items
+        if excess > 0:
+            # Fuera los menos usados recientemente
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+            self._stats["evictions"] += excess
+
+    # ---------- Observabilidad ----------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["memory_items"] = len(self._mem)
+            if self._disk() is not None:
+                (out["disk_items"],) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        hits = out["memory_hits"] + out["disk_hits"]
+        lookups = hits + out["misses"]
+        out["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return out
+
+
+class CachedLlmProvider(LlmProvider):
+    """
+    Envoltorio transparente sobre cualquier LlmProvider: misma interfaz,
+    pero consulta la caché antes de llamar al proveedor real.
+    """
+
+    def __init__(self, inner: LlmProvider, cache: LlmResponseCache) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    def cache_params(self, op: str) -> Dict[str, Any]:
+        return self.inner.cache_params(op)
+
+    def _key(self, op: str, **inputs: Any) -> str:
+        return make_key(self.inner.name, op, self.inner.cache_params(op), inputs)
+
+    # SQLite es bloqueante: lo sacamos del event loop
+    async def _get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self.cache.set, key, value)
+
+    async def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
+        key = self._key("summarize", text=text, target_sentences=target_sentences)
+        hit = await self._get(key)
+        if hit is not None:
+            return hit
+
+        out = await self.inner.summarize_text(text, target_sentences=target_sentences, timeout_s=timeout_s)
+        if out:
+            await self._set(key, out)
+        return out
+
+    async def stream_summarize_text(
+        self, text: str, *, target_sentences: int, timeout_s: float = 12.0
+    ) -> AsyncIterator[str]:
+        key = self._key("summarize", text=text, target_sentences=target_sentences)
+        hit = await self._get(key)
+        if hit is not None:
+            yield hit
+            return
+
+        parts = []
+        async for delta in self.inner.stream_summarize_text(
+            text, target_sentences=target_sentences, timeout_s=timeout_s
+        ):
+            parts.append(delta)
+            yield delta
+        # Sólo se cachea si el stream terminó bien (si falla, el proveedor lanza)
+        out = "".join(parts).strip()
+        if out:
+            await self._set(key, out)
+
+    async def generate_quiz(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        extra = {"avoid": list(avoid)} if avoid else {}
+        key = self._key("quiz", title=title, text=text, size=size, **extra)
+        hit = await self._get(key)
+        if hit is not None:
+            return json.loads(hit)
+
+        out = await self.inner.generate_quiz(title, text, size=size, timeout_s=timeout_s, avoid=avoid)
+        if out:
+            await self._set(key, json.dumps(out, ensure_ascii=False))
+        return out
+
+    async def stream_quiz_questions(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Misma clave que generate_quiz: un quiz cacheado sirve a las dos
+        extra = {"avoid": list(avoid)} if avoid else {}
+        key = self._key("quiz", title=title, text=text, size=size, **extra)
+        hit = await self._get(key)
+        if hit is not None:
+            for q in json.loads(hit).get("questions") or []:
+                yield q
+            return
+
+        questions = []
+        async for q in self.inner.stream_quiz_questions(
+            title, text, size=size, timeout_s=timeout_s, avoid=avoid
+        ):
+            questions.append(q)
+            yield q
+        # Sólo se cachea si el stream terminó bien (si falla, el proveedor lanza)
+        if questions:
+            await self._set(key, json.dumps({"questions": questions}, ensure_ascii=False))
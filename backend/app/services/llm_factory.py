@@ -0,0 +1,43 @@
+# app/services/llm_factory.py
+"""
+Punto único para obtener el proveedor de IA del proceso.
+
+Se comparte una sola instancia (con su caché) entre resúmenes y quizzes.
+LLM_PROVIDER (o SUMMARIZER_PROVIDER) elige la implementación: openai | fake.
+"""
+import os
+from typing import Optional
+
+from .fake_provider import FakeLlmProvider
+from .llm_cache import LLM_CACHE_ENABLED, CachedLlmProvider, LlmResponseCache
+from .llm_provider import LlmProvider
+from .openai_adapter import OpenAiAdapter
+
+PROVIDERS = ("openai", "fake")
+
+_provider: Optional[LlmProvider] = None
+_cache: Optional[LlmResponseCache] = None
+
+
+def provider_kind() -> str:
+    return (os.getenv("LLM_PROVIDER") or os.getenv("SUMMARIZER_PROVIDER") or "openai").lower()
+
+
+def get_llm_cache() -> Optional[LlmResponseCache]:
+    """Caché compartida del proceso (None si está deshabilitada)."""
+    global _cache
+    if _cache is None and LLM_CACHE_ENABLED:
+        _cache = LlmResponseCache()
+    return _cache
+
+
+def get_llm_provider() -> LlmProvider:
+    """Devuelve el proveedor compartido, envuelto con caché si está habilitada."""
+    global _provider
+    if _provider is None:
+        prov: LlmProvider = FakeLlmProvider() if provider_kind() == "fake" else OpenAiAdapter()
+        cache = get_llm_cache()
+        if cache is not None:
+            prov = CachedLlmProvider(prov, cache)
+        _provider = prov
+    return _provider
@@ -1,15 +1,70 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 
 class LlmProvider:
+    """
+    Contrato asíncrono de los proveedores de IA.
+
+    Las llamadas son I/O puro (red), por eso son `async`: mientras esperamos al
+    proveedor el event loop sigue atendiendo otras requests.
+    """
     name: str = "none"
 
-    def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
+    def cache_params(self, op: str) -> Dict[str, Any]:
+        """
+        Modelo y parámetros de muestreo que influyen en la salida de `op`
+        ("summarize" | "quiz"). Se usan para armar la clave de caché.
+        """
+        return {}
+
+    async def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
         """Resumen en target_sentences; None si falla/timeout."""
         raise NotImplementedError
 
-    def generate_quiz(self, title: str, text: str, *, size: int = 6, timeout_s: float = 20.0) -> Optional[Dict[str, Any]]:
+    async def stream_summarize_text(
+        self, text: str, *, target_sentences: int, timeout_s: float = 12.0
+    ) -> AsyncIterator[str]:
+        """
+        Versión streaming de summarize_text: va entregando trozos de texto.
+        Por defecto (proveedores sin streaming) entrega el resumen completo de una vez.
+        A diferencia de summarize_text, si falla lanza RuntimeError (aunque ya
+        haya entregado parte del texto).
+        """
+        out = await self.summarize_text(text, target_sentences=target_sentences, timeout_s=timeout_s)
+        if not out:
+            raise RuntimeError("AI summarization failed")
+        yield out
+
+    async def generate_quiz(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         Devuelve {"questions":[{"question": str, "options":[...], "answer_index": int, "explanation": str}, ...]}
-        o None si falla.
+        o None si falla. `avoid`: enunciados ya existentes que no hay que repetir.
         """
         raise NotImplementedError
+
+    async def stream_quiz_questions(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versión streaming de generate_quiz: entrega cada pregunta (dict crudo)
+        apenas está completa. Por defecto genera el quiz entero y lo entrega de
+        una vez. Si falla lanza RuntimeError (lo ya entregado es válido).
+        """
+        payload = await self.generate_quiz(title, text, size=size, timeout_s=timeout_s, avoid=avoid)
+        if not payload:
+            raise RuntimeError("Quiz generation failed (no payload)")
+        for q in payload.get("questions") or []:
+            yield q
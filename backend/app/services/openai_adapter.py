@@ -1,11 +1,55 @@
-import os, json, re
-from typing import Optional, Dict, Any
-from openai import OpenAI
+import os, json, re, asyncio, random
+from email.utils import parsedate_to_datetime
+from time import time
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List, TypeVar
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 from .llm_provider import LlmProvider
+from .chunking import estimate_tokens
+from .http_pool import get_openai_client
+from .json_stream import QuizStreamParser, parse_questions_prefix
+from .quiz_parsing import QUIZ_MAX_SIZE
+from .rate_limiter import get_rate_limiter
+
+T = TypeVar("T")
+
+# Súbelo si cambian los prompts: invalida las respuestas cacheadas
+PROMPT_VERSION = "1"
+
+SUMMARY_TEMPERATURE = 0.2
+QUIZ_TEMPERATURE = 0.4
+
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "6"))
+LLM_RETRY_AFTER_DEFAULT_S = float(os.getenv("LLM_RETRY_AFTER_DEFAULT_S", "1.0"))
+LLM_RETRY_AFTER_MAX_S = float(os.getenv("LLM_RETRY_AFTER_MAX_S", "60"))
+
+# Tokens de salida estimados (para el bucket de TPM)
+SUMMARY_TOKENS_PER_SENTENCE = 40
+QUIZ_TOKENS_PER_QUESTION = 120
+# Máximo de enunciados "a evitar" que se incluyen en el prompt
+QUIZ_AVOID_MAX = 40
 
 def _strip_code_fences(s: str) -> str:
     return re.sub(r"^```(?:json)?\s*|\s*```$", "", s.strip(), flags=re.DOTALL)
 
+def _retry_after_s(exc: Exception, attempt: int) -> float:
+    """Espera pedida por el servidor (retry-after-ms / Retry-After) o backoff exponencial con jitter."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    wait: Optional[float] = None
+    try:
+        if headers.get("retry-after-ms"):
+            wait = float(headers["retry-after-ms"]) / 1000.0
+        elif headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                wait = float(value)
+            except ValueError:
+                wait = parsedate_to_datetime(value).timestamp() - time()
+    except (TypeError, ValueError):
+        wait = None
+    if wait is None or wait < 0:
+        wait = LLM_RETRY_AFTER_DEFAULT_S * (2 ** attempt) * random.uniform(0.5, 1.0)
+    return min(wait, LLM_RETRY_AFTER_MAX_S)
+
 class OpenAiAdapter(LlmProvider):
     name = "openai"
 
@@ -13,55 +57,116 @@ class OpenAiAdapter(LlmProvider):
         self.api_key = os.getenv("OPENAI_API_KEY", "")
         self.summary_model = os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini")
         self.quiz_model = os.getenv("OPENAI_QUIZ_MODEL", self.summary_model)
-        # Puedes subir o bajar el timeout global del cliente si quieres
-        self.client = OpenAI()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # Cliente compartido por todo el proceso (pool de conexiones keep-alive)
+        return get_openai_client(self.api_key)
+
+    def cache_params(self, op: str) -> Dict[str, Any]:
+        if op == "quiz":
+            return {"model": self.quiz_model, "temperature": QUIZ_TEMPERATURE, "prompt_version": PROMPT_VERSION}
+        return {"model": self.summary_model, "temperature": SUMMARY_TEMPERATURE, "prompt_version": PROMPT_VERSION}
+
+    async def _call(self, model: str, est_tokens: int, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta fn() dentro del limitador del modelo. Un 429 reduce la
+        concurrencia, pausa el modelo según Retry-After y se reintenta; los
+        5xx y errores de conexión se reintentan con backoff. Agotados los
+        reintentos, relanza la última excepción.
+        """
+        limiter = get_rate_limiter(model)
+        for attempt in range(LLM_RETRIES + 1):
+            try:
+                async with limiter.slot(est_tokens):
+                    result = await fn()
+            except RateLimitError as e:
+                if attempt >= LLM_RETRIES:
+                    raise
+                limiter.on_throttle(_retry_after_s(e, attempt))
+                continue
+            except APITimeoutError:
+                raise
+            except (InternalServerError, APIConnectionError) as e:
+                if attempt >= LLM_RETRIES:
+                    raise
+                await asyncio.sleep(_retry_after_s(e, attempt))
+                continue
+            limiter.on_success()
+            return result
+        raise RuntimeError("unreachable")
 
     # === RESÚMENES ===
-    def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
-        if not self.api_key:
-            return None
-        prompt = (
+    @staticmethod
+    def _summary_prompt(text: str, target_sentences: int) -> str:
+        return (
             "Resume el siguiente texto en ~{n} frases, tono claro y natural, sin títulos ni bullets.\n\n"
             "=== TEXTO ===\n{t}\n"
         ).format(n=max(1, target_sentences), t=text)
+
+    async def summarize_text(self, text: str, *, target_sentences: int, timeout_s: float = 12.0) -> Optional[str]:
+        if not self.api_key:
+            return None
+        prompt = self._summary_prompt(text, target_sentences)
+        est = estimate_tokens(prompt) + SUMMARY_TOKENS_PER_SENTENCE * max(1, target_sentences)
         try:
-            resp = self.client.responses.create(
-                model=self.summary_model,
-                input=prompt,
-                temperature=0.2,
-                # max_output_tokens opcional: el SDK lo gestiona; puedes fijarlo si hace falta
-                timeout=timeout_s,
+            resp = await self._call(
+                self.summary_model,
+                est,
+                lambda: self.client.responses.create(
+                    model=self.summary_model,
+                    input=prompt,
+                    temperature=SUMMARY_TEMPERATURE,
+                    # max_output_tokens opcional: el SDK lo gestiona; puedes fijarlo si hace falta
+                    timeout=timeout_s,
+                ),
             )
             out = (resp.output_text or "").strip()
             return out or None
         except Exception:
             return None
 
-    # === QUIZZES ===
-    def generate_quiz(
-        self,
-        title: str,
-        text: str,
-        *,
-        size: int = 6,
-        timeout_s: float = 20.0,
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Pide a la IA un quiz en JSON y devuelve un dict YA parseado.
-        No lanza KeyError: si algo sale mal → None.
-        """
+    async def stream_summarize_text(
+        self, text: str, *, target_sentences: int, timeout_s: float = 12.0
+    ) -> AsyncIterator[str]:
+        """Igual que summarize_text pero va entregando los deltas de texto."""
         if not self.api_key:
-            return None
-
-        # Creamos cliente en cada llamada para no depender de atributos previos
-        client = OpenAI(api_key=self.api_key)
-
-        # Normalizamos tamaño
+            raise RuntimeError("OPENAI_API_KEY not configured")
+        prompt = self._summary_prompt(text, target_sentences)
+        est = estimate_tokens(prompt) + SUMMARY_TOKENS_PER_SENTENCE * max(1, target_sentences)
+        completed = False
         try:
-            size = int(size)
-        except Exception:
-            size = 6
-        size = max(3, min(size, 10))
+            # El limitador cubre la apertura del stream (ahí llegan los 429)
+            stream = await self._call(
+                self.summary_model,
+                est,
+                lambda: self.client.responses.create(
+                    model=self.summary_model,
+                    input=prompt,
+                    temperature=SUMMARY_TEMPERATURE,
+                    timeout=timeout_s,
+                    stream=True,
+                ),
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta" and event.delta:
+                    yield event.delta
+                elif event.type == "response.completed":
+                    completed = True
+        except Exception as e:
+            raise RuntimeError(f"AI summarization stream failed: {e}") from e
+        if not completed:
+            raise RuntimeError("AI summarization stream ended early")
+
+    # === QUIZZES ===
+    @staticmethod
+    def _quiz_messages(text: str, size: int, avoid: Optional[List[str]]) -> List[Dict[str, str]]:
+        """Mensajes (system + user) del prompt de quiz."""
+        # Preguntas que ya existen (banco): que no las repita
+        avoid_block = ""
+        if avoid:
+            listed = "\n".join(f"  - {q}" for q in avoid[-QUIZ_AVOID_MAX:])
+            avoid_block = f"- NO repitas ni reformules estas preguntas ya existentes:\n{listed}\n"
 
         system_msg = (
             "Eres un generador de cuestionarios de opción múltiple. "
@@ -78,7 +183,7 @@ REQUISITOS:
 - Incluye una breve 'explanation' por pregunta.
 - NO incluyas texto fuera del JSON.
 - NO añadas comentarios antes o después del JSON.
-- ESQUEMA EXACTO:
+{avoid_block}- ESQUEMA EXACTO:
 
 {{
   "title": "título breve del quiz",
@@ -99,23 +204,61 @@ REQUISITOS:
 
 TEXTO BASE:
 \"\"\"
-{(text or "")[:6000]}
+{text or ""}
 \"\"\"
 """
 
+        return [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg},
+        ]
+
+    @staticmethod
+    def _quiz_size(size: Any) -> int:
+        # Normalizamos tamaño
+        try:
+            size = int(size)
+        except Exception:
+            size = 6
+        # Lotes chicos (fan-out por secciones) o quizzes de hasta QUIZ_MAX_SIZE
+        return max(1, min(size, QUIZ_MAX_SIZE))
+
+    async def generate_quiz(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pide a la IA un quiz en JSON y devuelve un dict YA parseado.
+        No lanza KeyError: si algo sale mal → None.
+        """
+        if not self.api_key:
+            return None
+
+        size = self._quiz_size(size)
+        messages = self._quiz_messages(text, size, avoid)
+        est = sum(estimate_tokens(m["content"]) for m in messages) + QUIZ_TOKENS_PER_QUESTION * size
         try:
-            resp = client.chat.completions.create(
-                model=self.quiz_model,
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": user_msg},
-                ],
-                temperature=0.4,
+            resp = await self._call(
+                self.quiz_model,
+                est,
+                lambda: self.client.chat.completions.create(
+                    model=self.quiz_model,
+                    messages=messages,
+                    temperature=QUIZ_TEMPERATURE,
+                ),
             )
             raw = resp.choices[0].message.content or ""
-            raw = _strip_code_fences(raw)
-
-            data = json.loads(raw)
+            try:
+                data = json.loads(_strip_code_fences(raw))
+            except ValueError:
+                # JSON truncado/roto: nos quedamos con las preguntas completas
+                questions = parse_questions_prefix(raw)
+                return {"questions": questions} if questions else None
             if not isinstance(data, dict):
                 return None
 
@@ -133,3 +276,50 @@ TEXTO BASE:
         except Exception:
             # Cualquier problema → None (para que el servicio suba 503 limpio)
             return None
+
+    async def stream_quiz_questions(
+        self,
+        title: str,
+        text: str,
+        *,
+        size: int = 6,
+        timeout_s: float = 20.0,
+        avoid: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Igual que generate_quiz pero en streaming: entrega cada pregunta apenas
+        el modelo cierra su objeto JSON. Si el stream falla lanza RuntimeError
+        (lo ya entregado es válido).
+        """
+        if not self.api_key:
+            raise RuntimeError("OPENAI_API_KEY not configured")
+        size = self._quiz_size(size)
+        messages = self._quiz_messages(text, size, avoid)
+        est = sum(estimate_tokens(m["content"]) for m in messages) + QUIZ_TOKENS_PER_QUESTION * size
+
+        parser = QuizStreamParser()
+        finished = False
+        try:
+            stream = await self._call(
+                self.quiz_model,
+                est,
+                lambda: self.client.chat.completions.create(
+                    model=self.quiz_model,
+                    messages=messages,
+                    temperature=QUIZ_TEMPERATURE,
+                    stream=True,
+                ),
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta and choice.delta.content:
+                    for question in parser.feed(choice.delta.content):
+                        yield question
+                if choice.finish_reason:
+                    finished = choice.finish_reason == "stop"
+        except Exception as e:
+            raise RuntimeError(f"AI quiz stream failed: {e}") from e
+        if not finished:
+            raise RuntimeError("AI quiz stream ended early")
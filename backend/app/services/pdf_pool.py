@@ -0,0 +1,189 @@
+# app/services/pdf_pool.py
+"""
+Extracción de texto de PDFs en un pool de procesos.
+
+pypdf es CPU puro: en el event loop congela al resto de requests del worker
+y en hilos no escala por el GIL. Acá cada PDF se parte en rangos de
+PDF_PAGES_PER_TASK páginas que se reparten entre procesos; el texto se
+reensambla en orden.
+
+- PDF_POOL_WORKERS: procesos del pool (0 = hilos, sin pool; útil en dev)
+- PDF_EXTRACT_TIMEOUT_S: tiempo máximo por archivo
+- PDF_POOL_MAX_FILES: archivos en proceso a la vez; con el pool lleno se
+  rechaza enseguida (ExtractionBusyError → 503) en vez de encolar sin límite.
+  Un archivo que se pasó del timeout sigue ocupando su lugar hasta que
+  terminan los rangos que ya estaban corriendo.
+
+Los procesos se crean con forkserver (spawn donde no existe): hacer fork de
+un worker de uvicorn con hilos y un event loop andando no es seguro.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from pypdf import PdfReader
+
+# =========================
+# Configuración
+# =========================
+PDF_POOL_WORKERS: int = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+PDF_EXTRACT_TIMEOUT_S: float = float(os.getenv("PDF_EXTRACT_TIMEOUT_S", "120"))
+PDF_POOL_MAX_FILES: int = int(os.getenv("PDF_POOL_MAX_FILES", str(max(2, PDF_POOL_WORKERS * 2))))
+
+log = logging.getLogger("studyforge.pdf")
+
+
+class ExtractionBusyError(RuntimeError):
+    """El pool está saturado o el archivo tardó demasiado."""
+
+
+# ---------- Funciones que corren en los procesos del pool ----------
+def _count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[str]:
+    pages = PdfReader(path).pages
+    return [pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+# ---------- Pool (uno por proceso, creado a demanda) ----------
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock()  # se libera desde callbacks de otros hilos
+_stats = {"files": 0, "pages": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool() -> Executor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if PDF_POOL_WORKERS <= 0:
+                _pool = ThreadPoolExecutor(max_workers=max(1, PDF_POOL_MAX_FILES), thread_name_prefix="pdf")
+            else:
+                _pool = ProcessPoolExecutor(max_workers=PDF_POOL_WORKERS, mp_context=_mp_context())
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_pool() -> None:
+    """Cierra el pool (llamar al apagar la app)."""
+    _reset_pool()
+
+
+def pdf_pool_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "workers": PDF_POOL_WORKERS,
+        "in_flight": _in_flight,
+        "max_files": PDF_POOL_MAX_FILES,
+    }
+
+
+def _acquire() -> bool:
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= PDF_POOL_MAX_FILES:
+            return False
+        _in_flight += 1
+        return True
+
+
+def _release() -> None:
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def _release_when_done(futures: List[Future]) -> None:
+    """Libera el lugar del archivo cuando no le queda trabajo corriendo en el pool."""
+    left = [f for f in futures if not f.done()]
+    if not left:
+        _release()
+        return
+    lock = threading.Lock()
+    count = [len(left)]
+
+    def _done(_f: Future) -> None:
+        with lock:
+            count[0] -= 1
+            last = count[0] == 0
+        if last:
+            _release()
+
+    for f in left:
+        f.add_done_callback(_done)
+
+
+def _run(pool: Executor, futures: List[Future], fn, *args) -> asyncio.Future:
+    # Guardamos el Future del pool: el de asyncio se da por cancelado
+    # aunque el rango siga corriendo en el proceso
+    f = pool.submit(fn, *args)
+    futures.append(f)
+    return asyncio.wrap_future(f)
+
+
+async def extract_pdf_pages(path: str) -> List[str]:
+    """
+    Texto de cada página del PDF en `path`, en orden.
+    ValueError si el PDF no se puede leer; ExtractionBusyError si el pool
+    está lleno o se supera PDF_EXTRACT_TIMEOUT_S.
+    """
+    if not _acquire():
+        _stats["rejected"] += 1
+        raise ExtractionBusyError("Demasiados archivos en proceso, intentá de nuevo en unos segundos")
+    futures: List[Future] = []
+    try:
+        pool = _get_pool()
+
+        async def _all() -> List[str]:
+            total = await _run(pool, futures, _count_pages, path)
+            step = max(1, PDF_PAGES_PER_TASK)
+            chunks = [
+                _run(pool, futures, _extract_range, path, start, min(start + step, total))
+                for start in range(0, total, step)
+            ]
+            return [text for chunk in await asyncio.gather(*chunks) for text in chunk]
+
+        pages = await asyncio.wait_for(_all(), timeout=PDF_EXTRACT_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        # Los rangos pendientes se cancelan; los que ya corren terminan solos
+        # (y hasta entonces el archivo sigue contando en _in_flight)
+        _stats["timeouts"] += 1
+        raise ExtractionBusyError("El PDF tardó demasiado en procesarse")
+    except BrokenProcessPool:
+        log.exception("pool de PDFs roto; se recrea")
+        _stats["errors"] += 1
+        _reset_pool()
+        raise ExtractionBusyError("No se pudo procesar el PDF, intentá de nuevo")
+    except Exception:
+        _stats["errors"] += 1
+        raise ValueError("No se pudo leer el PDF")
+    finally:
+        for f in futures:
+            f.cancel()  # sólo afecta a los que todavía no arrancaron
+        _release_when_done(futures)
+    _stats["files"] += 1
+    _stats["pages"] += len(pages)
+    return pages
@@ -0,0 +1,180 @@
+# app/services/question_bank.py
+"""
+Banco de preguntas por documento.
+
+Las preguntas que genera la IA se guardan en `question_bank`, etiquetadas con
+la sección (chunk) del documento de la que salen. Un quiz nuevo se arma
+muestreando del banco (una query): primero preguntas que el usuario todavía
+no vio, repartidas entre secciones. Sólo cuando no alcanzan se llama a la IA
+para rellenar el banco, priorizando las secciones con menos preguntas (y,
+a igual cantidad, las que elige select_chunks por relevancia y cobertura) y
+pidiéndole que no repita las existentes.
+
+Es opt-in (QUIZ_BANK_ENABLED=1): por defecto create_auto genera cada quiz
+con la IA (contexto por cobertura o fan-out por secciones).
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.repositories.models import BankQuestion, Document, Quiz, QuizQuestion
+from .blob_store import document_text_async
+from .chunk_selection import select_chunks
+from .chunking import chunk_text
+from .llm_factory import get_llm_provider
+from .llm_provider import LlmProvider
+from .quiz_parsing import extract_questions, norm_keys, normalize_question, question_hash
+from .singleflight import flight_key, flights
+
+# =========================
+# Configuración
+# =========================
+QUIZ_BANK_ENABLED: bool = os.getenv("QUIZ_BANK_ENABLED", "0") not in ("0", "false", "False", "")
+QUIZ_BANK_CHUNK_TOKENS: int = int(os.getenv("QUIZ_BANK_CHUNK_TOKENS", "800"))
+QUIZ_BANK_QUESTIONS_PER_CHUNK: int = int(os.getenv("QUIZ_BANK_QUESTIONS_PER_CHUNK", "4"))
+QUIZ_BANK_REFILL_MIN: int = int(os.getenv("QUIZ_BANK_REFILL_MIN", "8"))  # mínimo por recarga
+QUIZ_BANK_CONCURRENCY: int = int(os.getenv("QUIZ_BANK_CONCURRENCY", "4"))
+QUIZ_BANK_AVOID_PER_CHUNK: int = int(os.getenv("QUIZ_BANK_AVOID_PER_CHUNK", "20"))
+
+
+# chunk_index de preguntas generadas sobre el documento completo (no una sección)
+WHOLE_DOCUMENT = -1
+
+
+def bank_row(document_id: int, chunk_index: int, q: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila de question_bank a partir de una pregunta normalizada."""
+    return {
+        "document_id": document_id,
+        "chunk_index": chunk_index,
+        "question": q["question"],
+        "options_json": q["options"],
+        "answer_index": q["answer_index"],
+        "explanation": q["explanation"],
+        "text_hash": question_hash(q["question"]),
+    }
+
+
+class QuestionBankService:
+    def __init__(self, prov: Optional[LlmProvider] = None) -> None:
+        self.prov = prov or get_llm_provider()
+
+    # ---------- Muestreo ----------
+    def sample(self, db: Session, user_id: int, document_id: int, size: int) -> List[Tuple[BankQuestion, bool]]:
+        """
+        Hasta `size` preguntas del banco como (pregunta, ya_vista). Primero las
+        que el usuario no vio en quizzes anteriores de este documento; dentro
+        de eso, una por sección antes de repetir sección; el resto al azar.
+        """
+        seen_ids = (
+            select(QuizQuestion.bank_question_id)
+            .join(Quiz, Quiz.id == QuizQuestion.quiz_id)
+            .where(
+                Quiz.user_id == user_id,
+                Quiz.document_id == document_id,
+                QuizQuestion.bank_question_id.is_not(None),
+            )
+        )
+        seen = case((BankQuestion.id.in_(seen_ids), 1), else_=0)
+        ranked = (
+            select(
+                BankQuestion.id.label("id"),
+                seen.label("seen"),
+                func.row_number()
+                .over(partition_by=(seen, BankQuestion.chunk_index), order_by=func.random())
+                .label("rn"),
+            )
+            .where(BankQuestion.document_id == document_id)
+            .subquery()
+        )
+        rows = db.execute(
+            select(BankQuestion, ranked.c.seen)
+            .join(ranked, ranked.c.id == BankQuestion.id)
+            .order_by(ranked.c.seen, ranked.c.rn, func.random())
+            .limit(size)
+        ).all()
+        return [(q, bool(s)) for q, s in rows]
+
+    # ---------- Recarga con IA ----------
+    async def refill(self, db: Session, doc: Document, needed: int) -> int:
+        """
+        Genera al menos `needed` preguntas nuevas (en paralelo, por sección) y
+        las agrega al banco. Devuelve cuántas se insertaron; las secciones que
+        fallan se ignoran.
+        """
+        text = await document_text_async(doc)
+        chunks = await asyncio.to_thread(chunk_text, text, QUIZ_BANK_CHUNK_TOKENS) or [text]
+        needed = max(needed, QUIZ_BANK_REFILL_MIN)
+
+        existing = await asyncio.to_thread(self._existing_by_chunk, db, doc.id)
+
+        # Secciones con menos preguntas primero; a igual cantidad, las que
+        # select_chunks elige como representativas del documento (un
+        # documento nuevo no se queda sólo con sus primeras secciones)
+        calls = min(len(chunks), max(1, math.ceil(needed / QUIZ_BANK_QUESTIONS_PER_CHUNK)))
+        preferred = set(await asyncio.to_thread(select_chunks, chunks, calls * QUIZ_BANK_CHUNK_TOKENS))
+        targets = sorted(
+            range(len(chunks)), key=lambda i: (len(existing.get(i, ())), i not in preferred, i)
+        )[:calls]
+        per_chunk = math.ceil(needed / len(targets))
+
+        sem = asyncio.Semaphore(max(1, QUIZ_BANK_CONCURRENCY))
+        title = doc.title or "Quiz automático"
+
+        async def one(i: int) -> Optional[Dict[str, Any]]:
+            avoid = existing.get(i, [])[-QUIZ_BANK_AVOID_PER_CHUNK:]
+            key = flight_key("quiz-bank", chunks[i], size=per_chunk, avoid=avoid)
+            async with sem:
+                return await flights.do(
+                    key,
+                    lambda: self.prov.generate_quiz(
+                        title=title, text=chunks[i], size=per_chunk, timeout_s=20.0, avoid=avoid
+                    ),
+                )
+
+        payloads = await asyncio.gather(*(one(i) for i in targets), return_exceptions=True)
+
+        rows: Dict[str, Dict[str, Any]] = {}
+        for i, payload in zip(targets, payloads):
+            if not isinstance(payload, dict):
+                continue  # None o excepción: sección perdida
+            for q in map(normalize_question, extract_questions(norm_keys(payload))):
+                if q is None:
+                    continue
+                row = bank_row(doc.id, i, q)
+                rows.setdefault(row["text_hash"], row)
+        return len(await asyncio.to_thread(self.add, db, list(rows.values())))
+
+    def _existing_by_chunk(self, db: Session, document_id: int) -> Dict[int, List[str]]:
+        existing: Dict[int, List[str]] = {}
+        for chunk_index, question in db.execute(
+            select(BankQuestion.chunk_index, BankQuestion.question)
+            .where(BankQuestion.document_id == document_id)
+            .order_by(BankQuestion.id)
+        ):
+            existing.setdefault(chunk_index, []).append(question)
+        return existing
+
+    def add(self, db: Session, rows: List[Dict[str, Any]], *, commit: bool = True) -> Dict[str, int]:
+        """
+        Inserta en el banco ignorando duplicados (mismo documento + enunciado).
+        Devuelve {text_hash: id} de las filas insertadas.
+        """
+        if not rows:
+            return {}
+        result = db.execute(
+            insert(BankQuestion)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="uq_question_bank_document_text")
+            .returning(BankQuestion.text_hash, BankQuestion.id)
+        )
+        inserted = {h: i for h, i in result.all()}
+        if commit:
+            db.commit()
+        return inserted
@@ -0,0 +1,115 @@
+# app/services/quiz_parsing.py
+"""
+Normalización de las preguntas que devuelve la IA (JSON tolerante a claves
+raras), deduplicación y mezcla. Lo usan QuizService y el banco de preguntas.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+# Tamaño máximo de un quiz (API, servicio y adaptadores de IA). Vive acá
+# porque quiz_parsing no importa nada de la app: todos lo pueden importar.
+QUIZ_MAX_SIZE = int(os.getenv("QUIZ_MAX_SIZE", "30"))
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def norm_keys(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Normaliza claves por si vienen con espacios o comillas raras."""
+    out: Dict[str, Any] = {}
+    for k, v in d.items():
+        if isinstance(k, str):
+            nk = k.strip().strip('"').strip("'")
+        else:
+            nk = k
+        out[nk] = v
+    return out
+
+
+def extract_questions(payload: Dict[str, Any]) -> List[Any]:
+    """Lista de preguntas del JSON de la IA, tolerando claves raras."""
+    # Caso normal
+    if isinstance(payload.get("questions"), list):
+        return payload["questions"]
+
+    # Salvataje: buscar cualquier clave que contenga "questions"
+    for k, v in payload.items():
+        if isinstance(k, str) and "questions" in k and isinstance(v, list):
+            return v
+    return []
+
+
+def normalize_question(q: Any) -> Optional[Dict[str, Any]]:
+    """Pregunta lista para persistir, o None si no es usable."""
+    if not isinstance(q, dict):
+        return None
+
+    qn = norm_keys(q)
+
+    question_text = qn.get("question") or qn.get("texto") or ""
+    options = qn.get("options") or qn.get("opciones") or []
+
+    if not isinstance(question_text, str) or not question_text.strip():
+        return None
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+
+    # Asegurar exactamente 4 opciones (rellenar/vaciar)
+    options = [str(o) for o in options]
+    while len(options) < 4:
+        options.append("")
+    options = options[:4]
+
+    ai_raw = qn.get("answer_index")
+    try:
+        answer_index = int(ai_raw)
+    except Exception:
+        answer_index = 0
+
+    if answer_index < 0 or answer_index > 3:
+        answer_index = 0
+
+    explanation = qn.get("explanation") or ""
+    if not isinstance(explanation, str):
+        explanation = ""
+
+    return {
+        "question": question_text[:2000],
+        "options": options,
+        "answer_index": answer_index,
+        "explanation": explanation[:4000] or None,
+    }
+
+
+def question_fingerprint(question: str) -> str:
+    return _NON_WORD.sub(" ", question.lower()).strip()
+
+
+def merge_questions(groups: List[List[Dict[str, Any]]], size: int) -> List[Dict[str, Any]]:
+    """
+    Intercala las preguntas de cada sección (round-robin, para que el recorte
+    no deje secciones fuera), descarta duplicadas y recorta a `size`.
+    """
+    out: List[Dict[str, Any]] = []
+    seen = set()
+    depth = max((len(g) for g in groups), default=0)
+    for i in range(depth):
+        for g in groups:
+            if i >= len(g):
+                continue
+            fp = question_fingerprint(g[i]["question"])
+            if fp in seen:
+                continue
+            seen.add(fp)
+            out.append(g[i])
+            if len(out) == size:
+                return out
+    return out
+
+
+def question_hash(question: str) -> str:
+    """SHA-256 del enunciado normalizado (para deduplicar en el banco)."""
+    return hashlib.sha256(question_fingerprint(question).encode("utf-8")).hexdigest()
@@ -1,35 +1,60 @@
 # app/services/quiz_service.py
 
-from typing import Dict, Any, List, Optional, Tuple
-import json
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import math
+import os
 
 from sqlalchemy.orm import Session
 
-from app.repositories.models import Quiz, QuizQuestion, Document
-from .openai_adapter import OpenAiAdapter
+from app.repositories.models import Quiz, Document
+from app.repositories.quiz_repo import QuizRepo
+from .answer_keys import AnswerKey, answer_keys
+from .blob_store import document_text_async
+from .chunk_selection import QUIZ_CHUNK_TOKENS, QUIZ_CONTEXT_TOKENS, build_context
+from .chunking import chunk_text, estimate_tokens
+from .llm_factory import get_llm_provider
+from .result_buffer import result_buffer
+from .question_bank import QUIZ_BANK_ENABLED, WHOLE_DOCUMENT, QuestionBankService, bank_row
+from .quiz_parsing import QUIZ_MAX_SIZE, extract_questions, merge_questions, norm_keys, normalize_question, question_fingerprint
+from .singleflight import flight_key, flights
+
+
+# Fan-out: a partir de este tamaño, una llamada chica por sección del documento
+QUIZ_FANOUT_MIN_SIZE = int(os.getenv("QUIZ_FANOUT_MIN_SIZE", "7"))
+QUIZ_QUESTIONS_PER_SECTION = int(os.getenv("QUIZ_QUESTIONS_PER_SECTION", "3"))
+QUIZ_FANOUT_EXTRA = int(os.getenv("QUIZ_FANOUT_EXTRA", "1"))  # margen por duplicados/inválidas
+QUIZ_FANOUT_CONCURRENCY = int(os.getenv("QUIZ_FANOUT_CONCURRENCY", "4"))
+
+
+def _split_sections(text: str, n: int) -> List[str]:
+    """Divide el documento en n secciones contiguas de tamaño parecido."""
+    # chunks más chicos en documentos cortos, para poder tener n secciones
+    chunk_tokens = min(QUIZ_CHUNK_TOKENS, max(50, estimate_tokens(text) // max(1, n)))
+    chunks = chunk_text(text, max_tokens=chunk_tokens)
+    if len(chunks) <= 1 or n <= 1:
+        return chunks or [text]
+    n = min(n, len(chunks))
+    sizes = [len(c) for c in chunks]
+    total = sum(sizes)
+    sections: List[List[str]] = [[]]
+    acc = 0
+    for c, sz in zip(chunks, sizes):
+        # corta cuando se pasa de la fracción i/n del documento
+        if sections[-1] and len(sections) < n and acc >= total * len(sections) / n:
+            sections.append([])
+        sections[-1].append(c)
+        acc += sz
+    return ["\n\n".join(s) for s in sections]
 
 
 class QuizService:
     def __init__(self) -> None:
-        self.prov = OpenAiAdapter()
+        self.prov = get_llm_provider()
+        self.bank = QuestionBankService(self.prov)
+        self.repo = QuizRepo()
 
-    # ---------- Crear quiz automático con IA ----------
-    def create_auto(
-        self,
-        db: Session,
-        user_id: int,
-        document_id: int,
-        size: int = 6,
-    ) -> Quiz:
-        """
-        Genera un quiz vía IA a partir de un documento del usuario y lo persiste.
-
-        - Llama a self.prov.generate_quiz(title, text, size)
-        - Tolera pequeñas variaciones en las claves del JSON (ej. ' "questions" ')
-        - Crea registros en quizzes y quiz_questions
-        """
-
-        # 1) Verificar que el documento existe y pertenece al usuario
+    def _get_document(self, db: Session, user_id: int, document_id: int) -> Document:
         doc: Optional[Document] = (
             db.query(Document)
             .filter(
@@ -40,113 +65,261 @@ class QuizService:
         )
         if not doc:
             raise ValueError("Document not found")
-
-        # 2) Llamar a la IA
-        payload = self.prov.generate_quiz(
-            title=doc.title or "Quiz automático",
-            text=doc.content,
-            size=size,
-            timeout_s=20.0,
+        return doc
+
+    async def _ask(self, title: str, context: str, size: int) -> Optional[Dict[str, Any]]:
+        # requests idénticas en curso comparten la misma llamada
+        key = flight_key("quiz", context, size=size)
+        return await flights.do(
+            key,
+            lambda: self.prov.generate_quiz(
+                title=title,
+                text=context,
+                size=size,
+                timeout_s=20.0,
+            ),
         )
+
+    async def _generate_single(self, title: str, text: str, size: int) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Todas las preguntas en una sola llamada."""
+        # Contexto acotado: chunks representativos de TODO el documento
+        # (TF-IDF es CPU: fuera del event loop)
+        context = await asyncio.to_thread(build_context, text)
+        payload = await self._ask(title, context, size)
         if not payload:
             # El adaptador ya intentó parsear/validar y falló
             raise RuntimeError("Quiz generation failed (no payload)")
 
-        # 3) Normalizar claves por si vienen con espacios o comillas raras
-        def _norm_keys(d: Dict[str, Any]) -> Dict[str, Any]:
-            out: Dict[str, Any] = {}
-            for k, v in d.items():
-                if isinstance(k, str):
-                    nk = k.strip().strip('"').strip("'")
-                else:
-                    nk = k
-                out[nk] = v
-            return out
-
-        payload = _norm_keys(payload)
-
-        # 4) Recuperar lista de preguntas, tolerando claves raras
-        questions: Optional[List[Dict[str, Any]]] = None
-
-        # Caso normal
-        if isinstance(payload.get("questions"), list):
-            questions = payload["questions"]
-
-        # Salvataje: buscar cualquier clave que contenga "questions"
-        if questions is None:
-            for k, v in payload.items():
-                if isinstance(k, str) and "questions" in k and isinstance(v, list):
-                    questions = v
-                    break
+        payload = norm_keys(payload)
+        questions = [q for q in map(normalize_question, extract_questions(payload)) if q]
+        return payload.get("title"), merge_questions([questions], size)
 
-        if not questions:
-            raise RuntimeError("Quiz generation returned no questions")
-
-        # 5) Crear el Quiz principal
-        title = payload.get("title") or f"Quiz sobre {doc.title}"
-        quiz = Quiz(
-            user_id=user_id,
-            document_id=document_id,
-            title=str(title)[:200],
-            size=min(max(len(questions), 1), 50),  # por si vienen más/menos
-        )
-        db.add(quiz)
-        db.flush()  # para tener quiz.id
+    async def _generate_fanout(self, title: str, text: str, size: int) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Fan-out: pocas preguntas por sección, en paralelo. Una sección que
+        falla o devuelve JSON inválido no tira el quiz: se usa lo que llegó.
+        """
+        n = max(1, math.ceil(size / QUIZ_QUESTIONS_PER_SECTION))
+        sections = await asyncio.to_thread(_split_sections, text, n)
+        per_section = math.ceil(size / len(sections)) + QUIZ_FANOUT_EXTRA
+        budget = max(QUIZ_CHUNK_TOKENS, QUIZ_CONTEXT_TOKENS // len(sections))
+        contexts = await asyncio.gather(*(asyncio.to_thread(build_context, s, budget) for s in sections))
+
+        sem = asyncio.Semaphore(max(1, QUIZ_FANOUT_CONCURRENCY))
+
+        async def one(context: str) -> Optional[Dict[str, Any]]:
+            async with sem:
+                return await self._ask(title, context, per_section)
+
+        payloads = await asyncio.gather(*(one(c) for c in contexts), return_exceptions=True)
+
+        quiz_title: Optional[str] = None
+        groups: List[List[Dict[str, Any]]] = []
+        for p in payloads:
+            if not isinstance(p, dict):
+                continue  # None o excepción: sección perdida
+            p = norm_keys(p)
+            quiz_title = quiz_title or p.get("title")
+            groups.append([q for q in map(normalize_question, extract_questions(p)) if q])
+
+        if not groups:
+            raise RuntimeError("Quiz generation failed (no payload)")
+        return quiz_title, merge_questions(groups, size)
 
-        # 6) Crear preguntas
-        created_any = False
-        for q in questions[:size]:
-            if not isinstance(q, dict):
-                continue
+    async def _from_bank(
+        self, db: Session, user_id: int, doc: Document, size: int
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Arma el quiz muestreando del banco. Si quedan menos de `size` preguntas
+        sin ver, recarga el banco con IA; si la IA falla, se usan también
+        preguntas ya vistas.
+        """
+        picks = await asyncio.to_thread(self.bank.sample, db, user_id, doc.id, size)
+        unseen = sum(1 for _, seen in picks if not seen)
+        if unseen < size:
+            await self.bank.refill(db, doc, size - unseen)
+            picks = await asyncio.to_thread(self.bank.sample, db, user_id, doc.id, size)
+
+        questions = [
+            {
+                "question": q.question,
+                "options": q.options_json,
+                "answer_index": q.answer_index,
+                "explanation": q.explanation,
+                "bank_question_id": q.id,
+            }
+            for q, _ in picks
+        ]
+        return None, questions
 
-            qn = _norm_keys(q)
+    # ---------- Crear quiz automático con IA ----------
+    async def create_auto(
+        self,
+        db: Session,
+        user_id: int,
+        document_id: int,
+        size: int = 6,
+    ) -> Quiz:
+        """
+        Genera un quiz vía IA a partir de un documento del usuario y lo persiste.
 
-            question_text = qn.get("question") or qn.get("texto") or ""
-            options = qn.get("options") or qn.get("opciones") or []
+        - Con el banco habilitado, muestrea preguntas ya generadas del documento
+          y sólo llama a la IA para recargarlo cuando no alcanzan
+        - Si no, llama (await) a self.prov.generate_quiz(title, text, size); con
+          size >= QUIZ_FANOUT_MIN_SIZE, una llamada por sección en paralelo
+        - Tolera pequeñas variaciones en las claves del JSON (ej. ' "questions" ')
+        - Crea registros en quizzes y quiz_questions
+        - El trabajo con la DB (sync) corre en hilos; en el event loop sólo
+          quedan las esperas a la IA
+        """
 
-            if not isinstance(question_text, str):
-                continue
-            if not isinstance(options, list) or len(options) < 2:
-                continue
+        # 1) Verificar que el documento existe y pertenece al usuario
+        doc = await asyncio.to_thread(self._get_document, db, user_id, document_id)
+
+        # 2) Preguntas: del banco del documento (IA sólo si no alcanza),
+        #    o generadas en el momento (una sola llamada o fan-out por secciones)
+        title = doc.title or "Quiz automático"
+        if QUIZ_BANK_ENABLED:
+            quiz_title, questions = await self._from_bank(db, user_id, doc, size)
+        elif size >= QUIZ_FANOUT_MIN_SIZE:
+            quiz_title, questions = await self._generate_fanout(title, await document_text_async(doc), size)
+        else:
+            quiz_title, questions = await self._generate_single(title, await document_text_async(doc), size)
 
-            # Asegurar exactamente 4 opciones (rellenar/vaciar)
-            options = [str(o) for o in options]
-            while len(options) < 4:
-                options.append("")
-            options = options[:4]
+        if not questions:
+            raise RuntimeError("Quiz generation produced no valid questions")
 
-            ai_raw = qn.get("answer_index")
-            try:
-                answer_index = int(ai_raw)
-            except Exception:
-                answer_index = 0
-
-            if answer_index < 0 or answer_index > 3:
-                answer_index = 0
-
-            explanation = qn.get("explanation") or ""
-            if not isinstance(explanation, str):
-                explanation = ""
-
-            qq = QuizQuestion(
-                quiz_id=quiz.id,
-                question=question_text[:2000],
-                options_json=json.dumps(options, ensure_ascii=False),
-                answer_index=answer_index,
-                explanation=explanation[:4000] or None,
-            )
-            db.add(qq)
-            created_any = True
+        # 3) Quiz + preguntas en una sola sentencia (un round-trip)
+        title = str(quiz_title or f"Quiz sobre {doc.title}")[:200]
+        return await asyncio.to_thread(self._save_quiz, db, user_id, document_id, title, questions[:50])
 
-        if not created_any:
-            # Nada usable, revertimos
-            db.rollback()
-            raise RuntimeError("Quiz generation produced no valid questions")
+    def _save_quiz(
+        self, db: Session, user_id: int, document_id: int, title: str, questions: List[Dict[str, Any]]
+    ) -> Quiz:
+        quiz = self.repo.create_with_questions(
+            db, user_id=user_id, document_id=document_id, title=title, questions=questions
+        )
+        db.commit()
+        return quiz
 
+    def _create_empty_quiz(self, db: Session, user_id: int, document_id: int, title: str, size: int) -> Quiz:
+        quiz = Quiz(user_id=user_id, document_id=document_id, title=title[:200], size=size)
+        db.add(quiz)
         db.commit()
         db.refresh(quiz)
         return quiz
 
+    def _delete_quiz(self, db: Session, quiz: Quiz) -> None:
+        db.delete(quiz)
+        db.commit()
+
+    def _set_size(self, db: Session, quiz: Quiz, size: int) -> None:
+        if quiz.size != size:
+            quiz.size = size
+            db.commit()
+
+    # ---------- Crear quiz automático en streaming ----------
+    async def stream_auto(
+        self,
+        db: Session,
+        user_id: int,
+        document_id: int,
+        size: int = 6,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Variante progresiva de create_auto: va persistiendo y entregando
+        (evento, datos) a medida que hay preguntas.
+
+        - ("quiz", {...}) apenas se crea el quiz
+        - ("question", {...}) por cada pregunta guardada: primero las del
+          banco no vistas (instantáneas), luego las que genera la IA en stream
+        - ("done", {...}) al final; si el stream de la IA se corta, el quiz
+          conserva las preguntas ya guardadas (partial=True)
+        - ("error", {...}) si no se pudo guardar ninguna (el quiz se borra)
+
+        Cada paso con la DB corre en un hilo (asyncio.to_thread).
+        """
+        doc = await asyncio.to_thread(self._get_document, db, user_id, document_id)
+
+        quiz = await asyncio.to_thread(
+            self._create_empty_quiz, db, user_id, document_id, f"Quiz sobre {doc.title}", size
+        )
+        quiz_id = quiz.id
+        yield "quiz", {
+            "id": quiz.id,
+            "document_id": quiz.document_id,
+            "title": quiz.title,
+            "size": quiz.size,
+            "created_at": quiz.created_at,
+        }
+
+        emitted: List[str] = []
+        fingerprints = set()
+
+        def _persist(q: Dict[str, Any], bank_question_id: Optional[int]) -> Dict[str, Any]:
+            (question_id,) = self.repo.insert_questions(db, quiz_id, [{**q, "bank_question_id": bank_question_id}])
+            db.commit()  # visible ya para GET /quizzes/{id}
+            answer_keys.invalidate(quiz_id)  # cambió la clave de respuestas
+            emitted.append(q["question"])
+            fingerprints.add(question_fingerprint(q["question"]))
+            return {"id": question_id, **{k: q[k] for k in ("question", "options", "answer_index", "explanation")}}
+
+        def _persist_generated(q: Dict[str, Any]) -> Dict[str, Any]:
+            bank_id = None
+            if QUIZ_BANK_ENABLED:
+                row = bank_row(doc.id, WHOLE_DOCUMENT, q)
+                bank_id = self.bank.add(db, [row], commit=False).get(row["text_hash"])
+            return _persist(q, bank_id)
+
+        # 1) Del banco: las que el usuario todavía no vio
+        if QUIZ_BANK_ENABLED:
+            for bq, seen in await asyncio.to_thread(self.bank.sample, db, user_id, doc.id, size):
+                if seen:
+                    continue
+                q = {
+                    "question": bq.question,
+                    "options": bq.options_json,
+                    "answer_index": bq.answer_index,
+                    "explanation": bq.explanation,
+                }
+                yield "question", await asyncio.to_thread(_persist, q, bq.id)
+
+        # 2) El resto, en streaming desde la IA
+        error: Optional[str] = None
+        remaining = size - len(emitted)
+        if remaining > 0:
+            context = await asyncio.to_thread(build_context, await document_text_async(doc))
+            stream = self.prov.stream_quiz_questions(
+                title=doc.title or "Quiz automático",
+                text=context,
+                size=remaining,
+                timeout_s=20.0,
+                avoid=list(emitted) or None,
+            )
+            try:
+                async for raw in stream:
+                    q = normalize_question(raw)
+                    if q is None or question_fingerprint(q["question"]) in fingerprints:
+                        continue
+                    yield "question", await asyncio.to_thread(_persist_generated, q)
+                    if len(emitted) >= size:
+                        break
+            except Exception as e:
+                error = str(e)
+            finally:
+                await stream.aclose()
+
+        if not emitted:
+            await asyncio.to_thread(self._delete_quiz, db, quiz)
+            yield "error", {"detail": f"AI provider error: {error or 'no valid questions'}"}
+            return
+
+        await asyncio.to_thread(self._set_size, db, quiz, len(emitted))
+        done: Dict[str, Any] = {"quiz_id": quiz_id, "size": len(emitted)}
+        if error:
+            done.update(partial=True, detail=f"AI provider error: {error}")
+        yield "done", done
+
     # ---------- Listar quizzes por documento ----------
     def list_by_document(
         self,
@@ -175,6 +348,42 @@ class QuizService:
             .first()
         )
 
+    # ---------- Obtener quiz listo para la respuesta (una query) ----------
+    def get_json(self, db: Session, user_id: int, quiz_id: int) -> Optional[str]:
+        return self.repo.get_json(db, user_id, quiz_id)
+
+    # ---------- Borrar quiz ----------
+    def delete(self, db: Session, user_id: int, quiz_id: int) -> bool:
+        qz = self.get(db, user_id, quiz_id)
+        if not qz:
+            return False
+        db.delete(qz)
+        db.commit()
+        answer_keys.invalidate(quiz_id)
+        return True
+
+    # ---------- Clave de respuestas (caché en memoria) ----------
+    def _answer_key(self, db: Session, user_id: int, quiz_id: int) -> Optional[AnswerKey]:
+        key = answer_keys.get(quiz_id)
+        if key is None:
+            row = self.repo.answer_key(db, quiz_id)
+            if row is None:
+                return None
+            key = answer_keys.put(quiz_id, *row)
+        return key if key.owner_id == user_id else None
+
+    # ---------- Registrar intento (write-behind, no espera el INSERT) ----------
+    def _record_attempt(
+        self, user_id: int, quiz_id: int, key: AnswerKey, answers: List[Any], flags: List[bool]
+    ) -> None:
+        result_buffer.record(
+            quiz_id, user_id, sum(flags), len(key), answers, question_ids=key.question_ids, correct=flags
+        )
+
+    # ---------- Estadísticas (contadores precalculados) ----------
+    def get_stats(self, db: Session, user_id: int, quiz_id: int) -> Optional[Dict[str, Any]]:
+        return self.repo.get_stats(db, user_id, quiz_id)
+
     # ---------- Calcular score ----------
     def compute_score(
         self,
@@ -183,23 +392,13 @@ class QuizService:
         quiz_id: int,
         answers: List[int],
     ):
-        qz = self.get(db, user_id, quiz_id)
-        if not qz:
+        key = self._answer_key(db, user_id, quiz_id)
+        if key is None:
             raise ValueError("Quiz not found")
 
-        qs = list(qz.questions)
-        total = len(qs)
-
-        score = 0
-        correct_flags: List[bool] = []
-        for i, q in enumerate(qs):
-            given = answers[i] if i < len(answers) else None
-            ok = (given == q.answer_index)
-            correct_flags.append(ok)
-            if ok:
-                score += 1
-
-        return score, total, correct_flags
+        correct_flags = key.grade(answers)
+        self._record_attempt(user_id, quiz_id, key, answers, correct_flags)
+        return sum(correct_flags), len(key), correct_flags
     
     def check_answers_detailed(
         self,
@@ -213,29 +412,26 @@ class QuizService:
         - score y total
         - lista de resultados por pregunta con explicación incluida.
         """
-        qz = self.get(db, user_id, quiz_id)
-        if not qz:
+        key = self._answer_key(db, user_id, quiz_id)
+        if key is None:
             raise RuntimeError("Quiz not found or not owned by user")
 
-        qs = list(qz.questions)
-        total = len(qs)
-        score = 0
-        results: List[Dict[str, Any]] = []
-
-        for i, q in enumerate(qs):
-            given = answers[i] if i < len(answers) else None
-            ok = (given == q.answer_index)
-            if ok:
-                score += 1
-
-            results.append(
-                {
-                    "question_id": q.id,
-                    "given": given,
-                    "correct_index": q.answer_index,
-                    "is_correct": ok,
-                    "explanation": q.explanation,
-                }
+        if key.explanations is None:
+            by_id = self.repo.explanations(db, quiz_id)
+            key.explanations = tuple(by_id.get(qid) for qid in key.question_ids)
+
+        flags = key.grade(answers)
+        self._record_attempt(user_id, quiz_id, key, answers, flags)
+        results: List[Dict[str, Any]] = [
+            {
+                "question_id": qid,
+                "given": answers[i] if i < len(answers) else None,
+                "correct_index": correct,
+                "is_correct": ok,
+                "explanation": explanation,
+            }
+            for i, (qid, correct, ok, explanation) in enumerate(
+                zip(key.question_ids, key.correct, flags, key.explanations)
             )
-
-        return score, total, results
+        ]
+        return sum(flags), len(key), results
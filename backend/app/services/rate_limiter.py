@@ -0,0 +1,175 @@
+# app/services/rate_limiter.py
+"""
+Limitador compartido de llamadas al proveedor de IA, uno por modelo.
+
+- Token buckets de requests/min (RPM) y tokens estimados/min (TPM).
+- Concurrencia adaptativa AIMD: sube de a poco (+1 por "ventana" de éxitos)
+  mientras todo va bien y se reduce a la mitad ante un 429.
+- Retry-After: un 429 pausa a todo el modelo hasta la hora indicada. Las
+  esperas (pausa, RPM, TPM) se hacen sin ocupar un lugar de concurrencia.
+- Los limitadores son globales del proceso pero la Condition es del event
+  loop: si cambia el loop (varios asyncio.run, reinicio del worker) se crea
+  una nueva, igual que el cliente de http_pool.
+
+Así, bajo cuota, las requests esperan su turno en vez de fallar con 503.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+# =========================
+# Configuración (valores por modelo)
+# =========================
+LLM_RPM: float = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM: float = float(os.getenv("LLM_TPM", "200000"))
+LLM_MIN_CONCURRENCY: int = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_BACKOFF_FACTOR: float = float(os.getenv("LLM_BACKOFF_FACTOR", "0.5"))
+
+
+class TokenBucket:
+    """Bucket de `rate_per_min` unidades/min con ráfaga de hasta `capacity`."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Reserva `amount` unidades y devuelve cuántos segundos hay que esperar
+        para poder usarlas. El saldo puede quedar negativo: las reservas
+        siguientes se encolan detrás (orden FIFO, sin estampidas).
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """Semáforo cuyo límite se ajusta con AIMD."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, backoff: float = LLM_BACKOFF_FACTOR) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.backoff = backoff
+        self.in_flight = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or loop is not self._loop:
+            # Los lugares tomados en un loop anterior ya no existen
+            self._cond, self._loop, self.in_flight = asyncio.Condition(), loop, 0
+        return self._cond
+
+    async def acquire(self) -> None:
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def on_success(self) -> None:
+        # Additive increase: +1 cada `limit` éxitos
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        # Multiplicative decrease
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class ModelRateLimiter:
+    def __init__(
+        self,
+        model: str,
+        *,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        min_concurrency: int = LLM_MIN_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+    ) -> None:
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, min_concurrency, max_concurrency)
+        self._paused_until = 0.0
+        self._stats = {"calls": 0, "throttled": 0, "waited_s": 0.0}
+
+    @asynccontextmanager
+    async def slot(self, est_tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Espera turno (RPM + TPM + Retry-After, y después concurrencia) y
+        ocupa un lugar. Se duerme sin lugar tomado: una pausa no frena a
+        quien ya podría salir ni deja lugares ociosos.
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None and est_tokens > 0:
+            wait = max(wait, self.tokens.reserve(est_tokens))
+        while True:
+            wait = max(wait, self._paused_until - time.monotonic())
+            if wait > 0:
+                self._stats["waited_s"] += wait
+                await asyncio.sleep(wait)
+            await self.concurrency.acquire()
+            # un 429 pudo pausar el modelo mientras esperábamos lugar
+            wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            await self.concurrency.release()
+        try:
+            self._stats["calls"] += 1
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+
+    def on_throttle(self, retry_after_s: float) -> None:
+        """Un 429: menos concurrencia y pausa del modelo durante retry_after_s."""
+        self._stats["throttled"] += 1
+        self.concurrency.on_throttle()
+        self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, retry_after_s))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            **{k: (round(v, 2) if isinstance(v, float) else v) for k, v in self._stats.items()},
+        }
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """Limitador compartido (por proceso) del modelo `model`."""
+    lim = _limiters.get(model)
+    if lim is None:
+        lim = _limiters[model] = ModelRateLimiter(model)
+    return lim
+
+
+def rate_limiter_stats() -> Dict[str, Any]:
+    return {model: lim.stats() for model, lim in _limiters.items()}
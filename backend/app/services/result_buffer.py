@@ -0,0 +1,177 @@
+# app/services/result_buffer.py
+"""
+Write-behind de intentos de quiz (quiz_results).
+
+Corregir un quiz no espera ningún INSERT: el intento se encola en memoria y
+un hilo de fondo lo escribe en lote (una sentencia por lote) cuando se junta
+RESULTS_BATCH_SIZE o pasa RESULTS_FLUSH_INTERVAL_S, lo que ocurra primero.
+En la misma transacción se incrementan los contadores de quiz_stats y
+quiz_question_stats, así las estadísticas nunca recorren quiz_results.
+Al apagar la app se vacía lo pendiente (lifespan en main.py).
+
+Si un lote falla se reintenta en el próximo flush. El buffer está acotado
+(RESULTS_BUFFER_MAX): si la base no responde por mucho tiempo se descartan
+los intentos más viejos antes que bloquear la corrección. De un intento
+descartado se pierde la fila de quiz_results, pero no sus contadores: se
+agregan en memoria (una entrada por quiz/pregunta) y se suman en el próximo
+lote que se escriba ("dropped" en stats() cuenta estos intentos).
+
+Lo que está en memoria al caerse el proceso (sin pasar por close) se pierde:
+intentos y contadores. Es el precio de no esperar el INSERT al corregir.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.repositories.quiz_repo import QuizRepo, StatDeltas, merge_stat_deltas, stat_deltas
+
+# =========================
+# Configuración
+# =========================
+RESULTS_BATCH_SIZE: int = int(os.getenv("RESULTS_BATCH_SIZE", "200"))
+RESULTS_FLUSH_INTERVAL_S: float = float(os.getenv("RESULTS_FLUSH_INTERVAL_S", "2.0"))
+RESULTS_BUFFER_MAX: int = int(os.getenv("RESULTS_BUFFER_MAX", "20000"))
+
+log = logging.getLogger("studyforge.results")
+
+
+def _default_session() -> Session:
+    # import diferido: app.db exige DATABASE_URL al importarse
+    from app.db import SessionLocal
+
+    return SessionLocal()
+
+
+def _answer(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class ResultWriteBehind:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = _default_session,
+        *,
+        batch_size: int = RESULTS_BATCH_SIZE,
+        flush_interval_s: float = RESULTS_FLUSH_INTERVAL_S,
+        max_pending: int = RESULTS_BUFFER_MAX,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.repo = QuizRepo()
+
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=max(1, max_pending))
+        # contadores de intentos descartados, pendientes de sumar a quiz_stats
+        self._dropped: StatDeltas = ({}, {})
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # un flush a la vez (hilo de fondo o close)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+    # ---------- Encolar (camino caliente) ----------
+    def record(
+        self,
+        quiz_id: int,
+        user_id: int,
+        score: int,
+        total: int,
+        answers: Sequence[Any],
+        *,
+        question_ids: Sequence[int] = (),
+        correct: Sequence[bool] = (),
+    ) -> None:
+        row = {
+            "quiz_id": quiz_id,
+            "user_id": user_id,
+            "score": score,
+            "total": total,
+            "answers": [_answer(a) for a in list(answers)[:total]],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            # sólo para quiz_question_stats (no se guardan en quiz_results)
+            "question_ids": list(question_ids),
+            "correct": list(correct),
+        }
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                # deque con maxlen descarta el más viejo: nos quedamos con sus contadores
+                stat_deltas([self._pending[0]], self._dropped)
+                self._stats["dropped"] += 1
+            self._pending.append(row)
+            self._stats["enqueued"] += 1
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="quiz-results-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    # ---------- Escritura en lote ----------
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval_s)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> int:
+        """Escribe todo lo pendiente, en lotes de batch_size. Devuelve cuántos se escribieron."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch: List[Dict[str, Any]] = [
+                        self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))
+                    ]
+                    dropped, self._dropped = self._dropped, ({}, {})
+                if not batch and not any(dropped):
+                    return written
+                try:
+                    db = self.session_factory()
+                    try:
+                        self.repo.insert_results(db, batch)
+                        self.repo.increment_stats(db, batch, extra=dropped)
+                        db.commit()
+                    finally:
+                        db.close()
+                except Exception:
+                    log.exception("no se pudo escribir un lote de %s intentos; se reintenta luego", len(batch))
+                    with self._cond:
+                        self._stats["errors"] += 1
+                        merge_stat_deltas(self._dropped, dropped)
+                        # vuelven al frente, respetando el límite del buffer
+                        room = self._pending.maxlen - len(self._pending)
+                        lost = batch[: max(0, len(batch) - room)]
+                        stat_deltas(lost, self._dropped)
+                        self._stats["dropped"] += len(lost)
+                        self._pending.extendleft(reversed(batch[len(lost):]))
+                    return written
+                written += len(batch)
+                with self._cond:
+                    self._stats["written"] += len(batch)
+                    self._stats["batches"] += 1
+
+    def close(self) -> None:
+        """Detiene el hilo de fondo y vacía lo pendiente (llamar al apagar)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=max(1.0, self.flush_interval_s * 2))
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+result_buffer = ResultWriteBehind()
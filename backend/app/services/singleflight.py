@@ -0,0 +1,56 @@
+# app/services/singleflight.py
+"""
+Single-flight: deduplica cómputos idénticos en curso.
+
+Si llegan N requests con la misma clave mientras la primera todavía está
+calculando, las N esperan a ese único cómputo y reciben el mismo resultado
+(o la misma excepción). Terminado el cómputo, la clave se libera: esto NO es
+una caché (para eso está llm_cache), sólo evita trabajo duplicado simultáneo.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+def flight_key(op: str, content: str, **params: Any) -> str:
+    """Clave = operación + hash del contenido del documento + parámetros."""
+    content_hash = hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+    raw = json.dumps({"op": op, "content": content_hash, "params": params}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+        # shield: si un cliente se desconecta, el cómputo sigue para los demás
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evita el warning "exception was never retrieved" si nadie quedó esperando
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+# Instancia compartida del proceso (resúmenes y quizzes)
+flights = SingleFlight()
@@ -1,17 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import List, Tuple, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple, Optional
 
 from sqlalchemy.orm import Session
 
 from app.repositories.models import Summary, Document
 from app.schemas.summary_schemas import SummaryIn, SummaryOut, SummaryListOut
+from .blob_store import document_text_async
+from .chunking import CHUNK_MAX_TOKENS, chunk_budget_tokens, chunk_text, tokens_to_chars
+from .llm_factory import PROVIDERS, get_llm_provider
 from .llm_provider import LlmProvider
-from .openai_adapter import OpenAiAdapter
+from .singleflight import flight_key, flights
 
-# Máximo de caracteres por chunk antes de mandarlo a la IA
-MAX_CHUNK_CHARS = 2400
+# Tokens por chunk: el menor entre este tope y lo que admite el modelo
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", str(CHUNK_MAX_TOKENS)))
+# Tokens que se repiten entre chunks consecutivos (contexto de borde)
+SUMMARY_CHUNK_OVERLAP_TOKENS = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", "60"))
+
+# Cuántos chunks se resumen en paralelo (fase "map") como máximo
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+
+# Reducción jerárquica (árbol): cuántos resúmenes parciales entran en una
+# llamada de "reduce" y cuántos caracteres puede tener ese prompt como máximo
+# (0 = el mismo presupuesto que un chunk).
+SUMMARY_REDUCE_FANIN = max(2, int(os.getenv("SUMMARY_REDUCE_FANIN", "8")))
+SUMMARY_REDUCE_MAX_CHARS = int(os.getenv("SUMMARY_REDUCE_MAX_CHARS", "0"))
+# Frases objetivo de los resúmenes intermedios, por nivel ("6,4" → nivel 1: 6,
+# nivel 2 y siguientes: 4). El último valor se repite.
+SUMMARY_REDUCE_LEVEL_SENTENCES = [
+    max(1, int(x)) for x in os.getenv("SUMMARY_REDUCE_LEVEL_SENTENCES", "4").split(",") if x.strip()
+] or [4]
+# Tope de niveles intermedios (protección ante configuraciones absurdas);
+# si se alcanza, los parciales se recortan para que el reduce final quepa
+SUMMARY_REDUCE_MAX_LEVELS = 8
+
+log = logging.getLogger("studyforge.summary")
 
 
 class SummaryService:
@@ -69,90 +95,294 @@ class SummaryService:
 
 
 def _choose_provider() -> LlmProvider:
-    prov = os.getenv("SUMMARIZER_PROVIDER", "").lower()
-    # Por ahora solo soportamos OpenAI; si hace falta otro, se agrega acá.
-    if prov == "openai":
-        return OpenAiAdapter()
+    prov = (os.getenv("LLM_PROVIDER") or os.getenv("SUMMARIZER_PROVIDER", "")).lower()
+    # openai (real) o fake (local y determinista, para benchmarks)
+    if prov in PROVIDERS:
+        return get_llm_provider()
     raise RuntimeError("IA provider not configured (set SUMMARIZER_PROVIDER=openai)")
 
 
-def _chunk(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
-    text = (text or "").strip()
-    if not text:
-        return []
+async def _summarize_chunks(
+    prov: LlmProvider,
+    chunks: List[str],
+    per_chunk: int,
+    concurrency: int = SUMMARY_MAP_CONCURRENCY,
+    on_done: Optional[Callable[[int], None]] = None,
+) -> List[str]:
+    """Fase "map": resume cada chunk en paralelo (con tope de concurrencia).
 
-    if len(text) <= max_chars:
-        return [text]
+    Mantiene el orden original de los chunks. Si un chunk falla, cancela los
+    hermanos y lanza RuntimeError (fail fast). `on_done(i)` se llama cada vez
+    que termina el chunk i (para reportar progreso).
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
 
-    out: List[str] = []
-    current: List[str] = []
-    current_len = 0
+    async def _one(i: int, ch: str) -> str:
+        async with sem:
+            out = await prov.summarize_text(ch, target_sentences=per_chunk, timeout_s=14.0)
+        if not out:
+            raise RuntimeError("AI summarization failed (chunk)")
+        if on_done is not None:
+            on_done(i)
+        return out
+
+    tasks = [asyncio.create_task(_one(i, ch)) for i, ch in enumerate(chunks)]
+    try:
+        # gather devuelve en el mismo orden que los chunks
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
 
-    # Rompemos por párrafos primero
-    for para in text.split("\n\n"):
-        p = para.strip()
-        if not p:
-            continue
-        if current_len + len(p) + 2 <= max_chars:
-            current.append(p)
-            current_len += len(p) + 2
-        else:
-            if current:
-                out.append("\n\n".join(current))
-            current = [p]
-            current_len = len(p)
 
+def _batch_partials(partials: List[str], fan_in: int, max_chars: int) -> List[List[str]]:
+    """Agrupa parciales consecutivos en lotes de <= fan_in elementos y <= max_chars."""
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_len = 0
+    for p in partials:
+        add = len(p) + 2
+        if current and (len(current) >= fan_in or current_len + add > max_chars):
+            batches.append(current)
+            current, current_len = [], 0
+        current.append(p)
+        current_len += add
     if current:
-        out.append("\n\n".join(current))
+        batches.append(current)
+    return batches
+
 
+def _fit_partials(partials: List[str], max_chars: int) -> List[str]:
+    """Recorta cada parcial a una parte igual de max_chars (corte en palabra)."""
+    share = max(1, max_chars // max(1, len(partials)) - 2)
+    out: List[str] = []
+    for p in partials:
+        if len(p) > share:
+            cut = p[:share]
+            p = (cut.rsplit(" ", 1)[0] if " " in cut else cut).rstrip()
+        out.append(p)
     return out
 
 
-def summarize_strict(
+async def _reduce_until_fits(
+    prov: LlmProvider,
+    partials: List[str],
+    *,
+    fan_in: int = SUMMARY_REDUCE_FANIN,
+    max_chars: int = tokens_to_chars(SUMMARY_CHUNK_TOKENS),
+    level_sentences: Optional[List[int]] = None,
+    concurrency: int = SUMMARY_MAP_CONCURRENCY,
+    on_level: Optional[Callable[[int, int], None]] = None,
+) -> List[str]:
+    """Niveles intermedios del reduce jerárquico.
+
+    Mientras los parciales no quepan en una sola llamada, se agrupan en lotes
+    (fan_in / max_chars), cada lote se resume en paralelo y se repite con los
+    resultados. La cantidad de niveles crece como log_fan_in(parciales).
+    `on_level(nivel, lotes)` se llama al empezar cada nivel. Si tras
+    SUMMARY_REDUCE_MAX_LEVELS niveles todavía no caben (el modelo no acorta),
+    se recortan con _fit_partials: el reduce final nunca pasa de max_chars.
+    """
+    fan_in = max(2, fan_in)
+    level_sentences = level_sentences or SUMMARY_REDUCE_LEVEL_SENTENCES
+
+    level = 0
+    while level < SUMMARY_REDUCE_MAX_LEVELS:
+        combined_len = sum(len(p) + 2 for p in partials)
+        if len(partials) <= fan_in and combined_len <= max_chars:
+            break
+
+        sentences = level_sentences[min(level, len(level_sentences) - 1)]
+        batches = _batch_partials(partials, fan_in, max_chars)
+        level += 1
+        if on_level is not None:
+            on_level(level, len(batches))
+        partials = await _summarize_chunks(
+            prov,
+            ["\n\n".join(b) for b in batches],
+            per_chunk=sentences,
+            concurrency=concurrency,
+        )
+
+    combined_len = sum(len(p) + 2 for p in partials)
+    if combined_len > max_chars:
+        log.warning(
+            "reduce: %s parciales (%s chars) no caben en %s tras %s niveles; se recortan",
+            len(partials), combined_len, max_chars, level,
+        )
+        partials = _fit_partials(partials, max_chars)
+    return partials
+
+
+async def _tree_reduce(
+    prov: LlmProvider,
+    partials: List[str],
+    target_total: int,
+    **kwargs,
+) -> str:
+    """Fase "reduce" jerárquica + resumen final (ver _reduce_until_fits)."""
+    partials = await _reduce_until_fits(prov, partials, **kwargs)
+
+    # Resumen final de resúmenes (también con IA)
+    final = await prov.summarize_text(
+        "\n\n".join(partials),
+        target_sentences=target_total,
+        timeout_s=16.0,
+    )
+    if not final:
+        raise RuntimeError("AI summarization failed (final)")
+    return final
+
+
+def _plan(prov: LlmProvider, text: str, max_sentences: int) -> Tuple[List[str], int, int, int]:
+    """Chunking + objetivos de frases. Devuelve (chunks, per_chunk, target_total, budget)."""
+    raw = (text or "").strip()
+    if not raw:
+        raise ValueError("Empty text to summarize")
+
+    # Presupuesto por chunk según la ventana de contexto del modelo
+    budget = chunk_budget_tokens(prov.cache_params("summarize").get("model"), SUMMARY_CHUNK_TOKENS)
+    chunks = chunk_text(raw, budget, overlap_tokens=SUMMARY_CHUNK_OVERLAP_TOKENS)
+    if not chunks:
+        raise ValueError("Empty text after preprocessing")
+
+    # Escalamos la longitud objetivo en base a la cantidad de chunks.
+    # max_sentences viene del frontend (parámetro del usuario).
+    target_total = max(1, max_sentences)
+    per_chunk = max(2, target_total // max(1, len(chunks)))
+    return chunks, per_chunk, target_total, budget
+
+
+async def summarize_strict(
     title: str,
     text: str,
     max_sentences: int = 5,
 ) -> Tuple[str, str, int]:
     """Hace chunking y resume SOLO con IA.
 
+    Requests idénticas concurrentes (mismo texto y max_sentences) comparten un
+    único pipeline (single-flight); cada una guarda luego su propia fila.
+
     Devuelve:
         content: str  -> texto resumido final
         provider: str -> nombre del proveedor (ej: "openai")
         chunks_used: int -> cuántos chunks se mandaron a la IA
     """
+    key = flight_key("summary", text, max_sentences=max_sentences)
+    return await flights.do(key, lambda: _summarize_strict(title, text, max_sentences))
+
+
+async def _summarize_strict(title: str, text: str, max_sentences: int) -> Tuple[str, str, int]:
     prov = _choose_provider()
-    raw = (text or "").strip()
-    if not raw:
-        raise ValueError("Empty text to summarize")
+    chunks, per_chunk, target_total, budget = _plan(prov, text, max_sentences)
 
-    chunks = _chunk(raw, MAX_CHUNK_CHARS)
-    if not chunks:
-        raise ValueError("Empty text after preprocessing")
+    # 1) Resumir cada chunk con IA (en paralelo, orden preservado)
+    partials = await _summarize_chunks(prov, chunks, per_chunk)
+    used = len(partials)
 
-    # Escalamos la longitud objetivo en base a la cantidad de chunks.
-    # max_sentences viene del frontend (parámetro del usuario).
-    target_total = max(1, max_sentences)
-    per_chunk = max(2, target_total // max(1, len(chunks)))
+    # 2) Reduce jerárquico hasta que quepa en una sola llamada final
+    final = await _tree_reduce(
+        prov,
+        partials,
+        target_total,
+        max_chars=SUMMARY_REDUCE_MAX_CHARS or tokens_to_chars(budget),
+    )
 
-    used = 0
-    partials: List[str] = []
+    return final, prov.name, used
 
-    # 1) Resumir cada chunk con IA
-    for ch in chunks:
-        out = prov.summarize_text(ch, target_sentences=per_chunk, timeout_s=14.0)
-        if not out:
-            raise RuntimeError("AI summarization failed (chunk)")
-        used += 1
-        partials.append(out)
 
-    # 2) Resumen final de resúmenes (también con IA)
-    combined = "\n\n".join(partials)
-    final = prov.summarize_text(
-        combined,
+async def summarize_stream(
+    title: str,
+    text: str,
+    max_sentences: int = 5,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Igual que summarize_strict, pero va emitiendo eventos (nombre, datos).
+
+    - ("start",  {"chunks": n})
+    - ("chunk",  {"done": k, "total": n})   por cada chunk resumido (fase map)
+    - ("reduce", {"level": l, "batches": b}) por cada nivel intermedio
+    - ("delta",  {"text": "..."})           tokens del resumen final
+    - ("final",  {"content", "provider", "chunks_used"})
+    """
+    prov = _choose_provider()
+    chunks, per_chunk, target_total, budget = _plan(prov, text, max_sentences)
+    total = len(chunks)
+    yield "start", {"chunks": total}
+
+    # 1) Map con progreso: los callbacks dejan eventos en una cola
+    events: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+    done_count = 0
+
+    def _chunk_done(_i: int) -> None:
+        nonlocal done_count
+        done_count += 1
+        events.put_nowait(("chunk", {"done": done_count, "total": total}))
+
+    def _level(level: int, batches: int) -> None:
+        events.put_nowait(("reduce", {"level": level, "batches": batches}))
+
+    async def _map_and_reduce() -> List[str]:
+        partials = await _summarize_chunks(prov, chunks, per_chunk, on_done=_chunk_done)
+        return await _reduce_until_fits(
+            prov,
+            partials,
+            max_chars=SUMMARY_REDUCE_MAX_CHARS or tokens_to_chars(budget),
+            on_level=_level,
+        )
+
+    work = asyncio.create_task(_map_and_reduce())
+    getter: Optional[asyncio.Task] = None
+    try:
+        while True:
+            getter = asyncio.create_task(events.get())
+            finished, _ = await asyncio.wait({getter, work}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in finished:
+                yield getter.result()
+                continue
+            getter.cancel()
+            # Vaciar lo que quedó encolado antes de que terminara el trabajo
+            while not events.empty():
+                yield events.get_nowait()
+            break
+        partials = work.result()  # relanza si falló algún chunk
+    finally:
+        # Si el cliente se desconecta, no seguimos gastando en la IA
+        work.cancel()
+        if getter is not None:
+            getter.cancel()
+
+    # 2) Resumen final en streaming
+    parts: List[str] = []
+    async for delta in prov.stream_summarize_text(
+        "\n\n".join(partials),
         target_sentences=target_total,
         timeout_s=16.0,
-    )
+    ):
+        parts.append(delta)
+        yield "delta", {"text": delta}
+
+    final = "".join(parts).strip()
     if not final:
         raise RuntimeError("AI summarization failed (final)")
+    yield "final", {"content": final, "provider": prov.name, "chunks_used": total}
 
-    return final, prov.name, used
+
+async def generate_auto_summary(
+    db: Session,
+    user_id: int,
+    doc: Document,
+    max_sentences: int = 5,
+) -> SummaryOut:
+    """Resume `doc` con IA (summarize_strict) y guarda el resultado en summaries."""
+    content, _provider, _chunks_used = await summarize_strict(
+        doc.title or "",
+        await document_text_async(doc),
+        max_sentences=max_sentences,
+    )
+    payload = SummaryIn(
+        title=doc.title,
+        content=content,
+        document_id=doc.id,
+    )
+    return await asyncio.to_thread(SummaryService().create, db=db, user_id=user_id, payload=payload)
@@ -0,0 +1,157 @@
+# app/worker.py
+"""
+Worker de la cola de trabajos de IA.
+
+Uso:
+    python -m app.worker                 # 4 jobs en paralelo
+    python -m app.worker --concurrency 8
+
+Se pueden levantar tantos workers (en tantos nodos) como se quiera: el claim
+usa FOR UPDATE SKIP LOCKED, así que nunca dos toman el mismo job.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from app.db import SessionLocal
+from app.services.http_pool import close_http_pool
+from app.services.job_service import JOB_HEARTBEAT_S, JobService, PermanentJobError
+
+JOB_POLL_INTERVAL_S: float = float(os.getenv("JOB_POLL_INTERVAL_S", "1.0"))
+JOB_REAPER_INTERVAL_S: float = float(os.getenv("JOB_REAPER_INTERVAL_S", "60"))
+
+log = logging.getLogger("studyforge.worker")
+jobs = JobService()
+
+
+def _heartbeat_once(job_id: int, worker_id: str) -> bool:
+    # sesión propia: la del job la está usando el pipeline
+    db = SessionLocal()
+    try:
+        return jobs.heartbeat(db, job_id, worker_id)
+    finally:
+        db.close()
+
+
+async def _heartbeat(job_id: int, worker_id: str) -> None:
+    """Renueva el lease mientras el job corre (se cancela al terminar)."""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_S)
+        try:
+            if not await asyncio.to_thread(_heartbeat_once, job_id, worker_id):
+                log.warning("job %s: se perdió el lease", job_id)
+                return
+        except Exception:
+            log.exception("job %s: error renovando el lease", job_id)
+
+
+async def _process_one(worker_id: str) -> bool:
+    """Toma y ejecuta un job. Devuelve False si no había nada que hacer."""
+    db = SessionLocal()
+    try:
+        job = await asyncio.to_thread(jobs.claim, db, worker_id)
+        if job is None:
+            return False
+
+        job_id = job.id  # tras un rollback los atributos quedan expirados
+        log.info("job %s (%s) intento %s/%s", job_id, job.kind, job.attempts, job.max_attempts)
+        heartbeat = asyncio.create_task(_heartbeat(job_id, worker_id))
+        try:
+            result = await jobs.run(db, job)
+        except PermanentJobError as e:
+            await asyncio.to_thread(db.rollback)
+            status = await asyncio.to_thread(jobs.mark_failed, db, job, str(e), worker_id=worker_id, retry=False)
+            log.warning("job %s falló sin reintento (status=%s): %s", job_id, status, e)
+        except Exception as e:
+            await asyncio.to_thread(db.rollback)
+            status = await asyncio.to_thread(jobs.mark_failed, db, job, f"{type(e).__name__}: {e}", worker_id=worker_id)
+            log.warning("job %s falló (status=%s): %s", job_id, status, e)
+        else:
+            if await asyncio.to_thread(jobs.mark_done, db, job, result, worker_id=worker_id):
+                log.info("job %s listo: %s", job_id, result)
+            else:
+                log.warning("job %s: terminó pero ya no era de este worker (lease vencido)", job_id)
+        finally:
+            heartbeat.cancel()
+        return True
+    finally:
+        db.close()
+
+
+async def _loop(worker_id: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            worked = await _process_one(worker_id)
+        except Exception:
+            log.exception("error inesperado en el worker")
+            worked = False
+        if not worked:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=JOB_POLL_INTERVAL_S)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _requeue_stale() -> int:
+    db = SessionLocal()
+    try:
+        return jobs.requeue_stale(db)
+    finally:
+        db.close()
+
+
+async def _reaper(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            n = await asyncio.to_thread(_requeue_stale)
+            if n:
+                log.warning("%s jobs con lease vencido vuelven a pending", n)
+        except Exception:
+            log.exception("error re-encolando jobs vencidos")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=JOB_REAPER_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_worker(concurrency: int = 4) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            # Apagado limpio: deja de tomar jobs y termina los que están en curso
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    log.info("worker %s arrancando con concurrency=%s", base_id, concurrency)
+    try:
+        await asyncio.gather(
+            _reaper(stop),
+            *(_loop(f"{base_id}/{i}", stop) for i in range(max(1, concurrency))),
+        )
+    finally:
+        await close_http_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="StudyForge AI job worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("JOB_WORKER_CONCURRENCY", "4")),
+        help="Jobs en paralelo por proceso",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
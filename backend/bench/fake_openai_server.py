@@ -0,0 +1,255 @@
+# bench/fake_openai_server.py
+"""
+Servidor HTTP mínimo que imita la API de OpenAI (sin red ni costo).
+
+Implementa lo que usa OpenAiAdapter:
+- POST /v1/responses          (normal y stream=True, eventos SSE)
+- POST /v1/chat/completions   (normal y stream=True)
+
+Uso:
+    python -m bench.fake_openai_server --port 8900 --latency-ms 800 --error-rate 0.02
+
+y en el backend:
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1  OPENAI_API_KEY=fake  SUMMARIZER_PROVIDER=openai
+
+Las respuestas son deterministas (mismo prompt → misma salida). Los errores
+inyectados devuelven 429 (con Retry-After) o 500, como la API real.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+from app.services.fake_provider import fake_quiz, fake_rng, fake_summary, sample_latency_s
+
+_SENTENCES = re.compile(r"~(\d+)\s+frases")
+_QUESTIONS = re.compile(r"Número de preguntas:\s*(\d+)")
+# Texto base dentro del prompt (resumen: tras "=== TEXTO ===", quiz: entre comillas triples)
+_BODY = re.compile(r'=== TEXTO ===\n(.*)|"""\n(.*?)\n"""', re.DOTALL)
+
+
+class _Config:
+    latency_ms = 800.0
+    latency_dist = "lognormal"
+    jitter = 0.5
+    error_rate = 0.0
+    retry_after_s = 1
+    stream_chunk_words = 3
+
+
+class _Stats:
+    lock = threading.Lock()
+    requests = 0
+    errors = 0
+
+
+def _completion_text(prompt: str, rng) -> str:
+    """Respuesta según el tipo de prompt: quiz (JSON) o resumen (texto)."""
+    b = _BODY.search(prompt)
+    source = (b.group(1) or b.group(2)) if b else prompt
+    m = _QUESTIONS.search(prompt)
+    if m:
+        return json.dumps(fake_quiz(source, int(m.group(1)), rng), ensure_ascii=False)
+    m = _SENTENCES.search(prompt)
+    return fake_summary(source, int(m.group(1)) if m else 3, rng)
+
+
+def _usage(prompt: str, text: str) -> Dict[str, int]:
+    inp, out = max(1, len(prompt) // 4), max(1, len(text) // 4)
+    return {"input_tokens": inp, "output_tokens": out, "total_tokens": inp + out}
+
+
+def _response_obj(rid: str, model: str, text: str, prompt: str, status: str = "completed") -> Dict[str, Any]:
+    return {
+        "id": rid,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": status,
+        "output": [
+            {
+                "id": f"msg_{rid}",
+                "type": "message",
+                "role": "assistant",
+                "status": status,
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": _usage(prompt, text),
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # silencioso
+        pass
+
+    # ---------- helpers ----------
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _sse(self, data: Any, event: str = None) -> None:
+        msg = ""
+        if event:
+            msg += f"event: {event}\n"
+        msg += f"data: {data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)}\n\n"
+        self.wfile.write(msg.encode("utf-8"))
+        self.wfile.flush()
+
+    def _pieces(self, text: str):
+        words = text.split(" ")
+        step = max(1, _Config.stream_chunk_words)
+        for i in range(0, len(words), step):
+            piece = " ".join(words[i:i + step])
+            yield piece if i == 0 else " " + piece
+
+    # ---------- rutas ----------
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/v1/health"):
+            with _Stats.lock:
+                body = {"status": "ok", "requests": _Stats.requests, "errors": _Stats.errors}
+            return self._send_json(200, body)
+        self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "invalid JSON"}})
+
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/responses"):
+            prompt = body.get("input") if isinstance(body.get("input"), str) else json.dumps(body.get("input"))
+        elif path.endswith("/chat/completions"):
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        else:
+            return self._send_json(404, {"error": {"message": f"unknown route {self.path}"}})
+
+        rng = fake_rng(path, body.get("model"), prompt)
+        with _Stats.lock:
+            _Stats.requests += 1
+        time.sleep(sample_latency_s(rng, _Config.latency_ms, _Config.latency_dist, _Config.jitter))
+
+        # Errores inyectados (aleatorios de verdad: reintentar puede salir bien)
+        if _Config.error_rate > 0 and random.random() < _Config.error_rate:
+            with _Stats.lock:
+                _Stats.errors += 1
+            if random.random() < 0.5:
+                return self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"Retry-After": str(_Config.retry_after_s)},
+                )
+            return self._send_json(500, {"error": {"message": "fake server error", "type": "server_error"}})
+
+        model = body.get("model") or "fake"
+        text = _completion_text(prompt, rng)
+        if path.endswith("/responses"):
+            self._responses(body, model, prompt, text)
+        else:
+            self._chat(body, model, prompt, text)
+
+    def _responses(self, body, model, prompt, text):
+        rid = f"resp_{uuid.uuid4().hex[:24]}"
+        if not body.get("stream"):
+            return self._send_json(200, _response_obj(rid, model, text, prompt))
+
+        self._start_sse()
+        seq = 0
+        self._sse({"type": "response.created", "sequence_number": seq,
+                   "response": _response_obj(rid, model, "", prompt, status="in_progress")},
+                  "response.created")
+        for piece in self._pieces(text):
+            seq += 1
+            self._sse({"type": "response.output_text.delta", "sequence_number": seq, "item_id": f"msg_{rid}",
+                       "output_index": 0, "content_index": 0, "delta": piece, "logprobs": []},
+                      "response.output_text.delta")
+        seq += 1
+        self._sse({"type": "response.completed", "sequence_number": seq,
+                   "response": _response_obj(rid, model, text, prompt)},
+                  "response.completed")
+
+    def _chat(self, body, model, prompt, text):
+        cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if not body.get("stream"):
+            usage = _usage(prompt, text)
+            return self._send_json(200, {
+                "id": cid,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": usage["input_tokens"], "completion_tokens": usage["output_tokens"],
+                          "total_tokens": usage["total_tokens"]},
+            })
+
+        self._start_sse()
+
+        def chunk(delta, finish=None):
+            return {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+        self._sse(chunk({"role": "assistant", "content": ""}))
+        for piece in self._pieces(text):
+            self._sse(chunk({"content": piece}))
+        self._sse(chunk({}, "stop"))
+        self._sse("[DONE]")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor OpenAI falso para benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=_Config.latency_ms)
+    parser.add_argument("--latency-dist", choices=["const", "uniform", "lognormal"], default=_Config.latency_dist)
+    parser.add_argument("--jitter", type=float, default=_Config.jitter)
+    parser.add_argument("--error-rate", type=float, default=_Config.error_rate)
+    parser.add_argument("--retry-after", type=int, default=_Config.retry_after_s)
+    args = parser.parse_args()
+
+    _Config.latency_ms = args.latency_ms
+    _Config.latency_dist = args.latency_dist
+    _Config.jitter = args.jitter
+    _Config.error_rate = args.error_rate
+    _Config.retry_after_s = args.retry_after
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    print(f"fake OpenAI escuchando en http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# bench/loadtest.py
+"""
+Benchmark end-to-end de la API (resúmenes, quizzes y CRUD) a concurrencia fija.
+
+Pensado para correr contra un backend apuntado a un proveedor falso, sin
+gastar en OpenAI:
+
+    # terminal 1: OpenAI falso
+    python -m bench.fake_openai_server --port 8900 --latency-ms 800
+
+    # terminal 2: API (o LLM_PROVIDER=fake para no pasar por HTTP)
+    LLM_CACHE_ENABLED=0 QUIZ_BANK_ENABLED=0 OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake \\
+        SUMMARIZER_PROVIDER=openai uvicorn app.main:app --workers 1
+
+    # terminal 3: carga
+    python -m bench.loadtest --scenario mixed --concurrency 50 --requests 500
+
+Crea (o reutiliza) un usuario de benchmark y un documento sintético, y
+reporta por operación: cantidad, errores, p50/p95/p99 (ms) y requests/s.
+
+La API bajo prueba tiene que correr con LLM_CACHE_ENABLED=0: el documento
+es siempre el mismo y, con la caché de respuestas prendida, summary_auto y
+quiz_auto miden aciertos de caché en vez del pipeline de IA. Antes de
+arrancar se consulta GET /health/llm-cache y se aborta si está habilitada
+(--allow-llm-cache para medir la caché a propósito).
+
+Lo mismo con el banco de preguntas (QUIZ_BANK_ENABLED=0, el default): con
+el banco prendido quiz_auto muestrea preguntas ya guardadas en vez de
+llamar a la IA. Se verifica en GET /health/quiz-bank (--allow-quiz-bank
+para medir el banco a propósito).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+SCENARIOS = {
+    "summaries": ["summary_auto"],
+    "quizzes": ["quiz_auto"],
+    "crud": ["documents_list", "auth_me", "summaries_list", "quizzes_list"],
+    # mezcla "realista": mucho CRUD, algo de IA
+    "mixed": ["documents_list"] * 4 + ["auth_me"] * 2 + ["summaries_list"] * 2
+    + ["quizzes_list"] + ["summary_auto"] + ["quiz_auto"],
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def synthetic_document(kb: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ("célula energía proceso sistema teoría modelo ejemplo historia método análisis "
+             "función estructura variable resultado capítulo concepto").split()
+    paras: List[str] = []
+    size = 0
+    while size < kb * 1024:
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                     for _ in range(rng.randint(3, 8))]
+        p = " ".join(sentences)
+        paras.append(p)
+        size += len(p) + 2
+    return "\n\n".join(paras)
+
+
+async def _setup(client: httpx.AsyncClient, email: str, password: str, doc_kb: int) -> Tuple[str, int]:
+    r = await client.post("/auth/signup", json={"email": email, "password": password})
+    if r.status_code not in (201, 409):
+        r.raise_for_status()
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    r.raise_for_status()
+    token = r.json()["access_token"]
+
+    r = await client.post(
+        "/documents",
+        json={"title": f"bench {doc_kb}KB", "description": "documento sintético", "content": synthetic_document(doc_kb)},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    r.raise_for_status()
+    return token, r.json()["id"]
+
+
+def _request(op: str, doc_id: int, rng: random.Random) -> Tuple[str, str, Dict]:
+    if op == "summary_auto":
+        # max_sentences variable para no medir sólo aciertos de caché
+        return "POST", "/summaries/auto", {"document_id": doc_id, "max_sentences": rng.randint(3, 12)}
+    if op == "quiz_auto":
+        return "POST", "/quizzes/auto", {"document_id": doc_id, "size": rng.randint(3, 10)}
+    if op == "documents_list":
+        return "GET", "/documents", {}
+    if op == "auth_me":
+        return "GET", "/auth/me", {}
+    if op == "summaries_list":
+        return "GET", "/summaries", {"document_id": doc_id}
+    if op == "quizzes_list":
+        return "GET", "/quizzes", {"document_id": doc_id}
+    raise ValueError(op)
+
+
+async def _check_llm_cache(client: httpx.AsyncClient, scenario: str) -> None:
+    """Aborta si la API tiene la caché de respuestas de IA prendida."""
+    if not any(op in ("summary_auto", "quiz_auto") for op in SCENARIOS[scenario]):
+        return
+    r = await client.get("/health/llm-cache")
+    r.raise_for_status()
+    if r.json().get("enabled"):
+        raise SystemExit(
+            "La API tiene LLM_CACHE_ENABLED=1: se medirían aciertos de caché. "
+            "Reiniciala con LLM_CACHE_ENABLED=0 o pasá --allow-llm-cache."
+        )
+
+
+async def _check_quiz_bank(client: httpx.AsyncClient, scenario: str) -> None:
+    """Aborta si la API arma los quizzes desde el banco de preguntas."""
+    if "quiz_auto" not in SCENARIOS[scenario]:
+        return
+    r = await client.get("/health/quiz-bank")
+    r.raise_for_status()
+    if r.json().get("enabled"):
+        raise SystemExit(
+            "La API tiene QUIZ_BANK_ENABLED=1: quiz_auto mediría muestreos del banco. "
+            "Reiniciala con QUIZ_BANK_ENABLED=0 o pasá --allow-quiz-bank."
+        )
+
+
+async def run(args) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        if not args.allow_llm_cache:
+            await _check_llm_cache(client, args.scenario)
+        if not args.allow_quiz_bank:
+            await _check_quiz_bank(client, args.scenario)
+        token, doc_id = await _setup(client, args.email, args.password, args.doc_kb)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        ops = SCENARIOS[args.scenario]
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        remaining = args.requests
+        deadline = time.perf_counter() + args.duration if args.duration else None
+
+        def _take() -> bool:
+            nonlocal remaining
+            if deadline is not None:
+                return time.perf_counter() < deadline
+            if remaining <= 0:
+                return False
+            remaining -= 1
+            return True
+
+        async def worker(wid: int) -> None:
+            rng = random.Random(args.seed + wid)
+            while _take():
+                op = rng.choice(ops)
+                method, path, params = _request(op, doc_id, rng)
+                t0 = time.perf_counter()
+                try:
+                    r = await client.request(method, path, params=params, headers=headers)
+                    code = r.status_code
+                except httpx.HTTPError:
+                    code = 0
+                latencies[op].append((time.perf_counter() - t0) * 1000.0)
+                statuses[op][code] += 1
+                if not (200 <= code < 300):
+                    errors[op] += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        wall = time.perf_counter() - t0
+
+    report = {"scenario": args.scenario, "concurrency": args.concurrency, "wall_s": round(wall, 3), "ops": {}}
+    all_lat: List[float] = []
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        all_lat.extend(values)
+        report["ops"][op] = {
+            "count": len(values),
+            "errors": errors[op],
+            "statuses": dict(statuses[op]),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "rps": round(len(values) / wall, 2) if wall else 0.0,
+        }
+    all_lat.sort()
+    report["total"] = {
+        "count": len(all_lat),
+        "errors": sum(errors.values()),
+        "p50_ms": round(percentile(all_lat, 50), 1),
+        "p95_ms": round(percentile(all_lat, 95), 1),
+        "p99_ms": round(percentile(all_lat, 99), 1),
+        "rps": round(len(all_lat) / wall, 2) if wall else 0.0,
+    }
+    return report
+
+
+def _print_table(report: Dict) -> None:
+    print(f"scenario={report['scenario']} concurrency={report['concurrency']} wall={report['wall_s']}s")
+    header = f"{'op':<16}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["ops"].items()) + [("TOTAL", report["total"])]
+    for op, r in rows:
+        print(f"{op:<16}{r['count']:>8}{r['errors']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API de StudyForge")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Total de requests (si no hay --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="Segundos de carga (reemplaza --requests)")
+    parser.add_argument("--doc-kb", type=int, default=60, help="Tamaño del documento sintético")
+    parser.add_argument("--email", default="bench@studyforge.local")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte en JSON")
+    parser.add_argument(
+        "--allow-llm-cache", action="store_true",
+        help="No abortar si la API tiene la caché de IA prendida (mide aciertos de caché)",
+    )
+    parser.add_argument(
+        "--allow-quiz-bank", action="store_true",
+        help="No abortar si la API tiene el banco de preguntas prendido (mide muestreos del banco)",
+    )
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# tests/test_answer_keys.py
+import pytest
+
+from app.services import quiz_service
+from app.services.answer_keys import AnswerKeyCache
+
+
+class _Repo:
+    def __init__(self):
+        self.key_calls = 0
+        self.explanation_calls = 0
+
+    def answer_key(self, db, quiz_id):
+        self.key_calls += 1
+        return (1, [10, 11, 12], [2, 0, 3]) if quiz_id == 5 else None
+
+    def explanations(self, db, quiz_id):
+        self.explanation_calls += 1
+        return {10: "a", 11: "b", 12: "c"}
+
+
+class _Buffer:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, quiz_id, user_id, score, total, answers, *, question_ids=(), correct=()):
+        self.recorded.append((quiz_id, user_id, score, total, list(question_ids), list(correct)))
+
+
+@pytest.fixture
+def svc(monkeypatch):
+    monkeypatch.setattr(quiz_service, "answer_keys", AnswerKeyCache(max_items=2))
+    monkeypatch.setattr(quiz_service, "result_buffer", _Buffer())
+    s = quiz_service.QuizService.__new__(quiz_service.QuizService)
+    s.repo = _Repo()
+    return s
+
+
+def test_grading_hits_the_cache_and_keeps_semantics(svc):
+    assert svc.compute_score(None, 1, 5, [2, 1, 3, 0]) == (2, 3, [True, False, True])
+    assert svc.compute_score(None, 1, 5, [2, None]) == (1, 3, [True, False, False])
+    assert svc.repo.key_calls == 1
+
+    score, total, results = svc.check_answers_detailed(None, 1, 5, ["x", 0])
+    assert (score, total) == (1, 3)
+    assert [r["explanation"] for r in results] == ["a", "b", "c"]
+    assert results[0]["given"] == "x" and results[2]["given"] is None
+    svc.check_answers_detailed(None, 1, 5, [])
+    assert svc.repo.explanation_calls == 1
+    # cada corrección queda encolada como intento (con aciertos por pregunta)
+    assert len(quiz_service.result_buffer.recorded) == 4
+    assert quiz_service.result_buffer.recorded[0] == (5, 1, 2, 3, [10, 11, 12], [True, False, True])
+
+    # otro usuario o quiz inexistente: mismos errores que antes
+    with pytest.raises(ValueError):
+        svc.compute_score(None, 2, 5, [])
+    with pytest.raises(RuntimeError):
+        svc.check_answers_detailed(None, 1, 6, [])
+
+
+def test_lru_eviction_and_invalidation():
+    cache = AnswerKeyCache(max_items=2)
+    for quiz_id in (1, 2, 3):
+        cache.put(quiz_id, 1, [quiz_id], [0])
+    assert cache.get(1) is None and cache.get(3) is not None
+    cache.invalidate(3)
+    assert cache.get(3) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["invalidations"] == 1
+
+
+def test_zero_ttl_disables_caching():
+    cache = AnswerKeyCache(ttl_s=0)
+    cache.put(1, 1, [10], [0])
+    assert cache.get(1) is None and cache.stats()["items"] == 0
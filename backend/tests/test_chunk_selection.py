@@ -0,0 +1,41 @@
+# tests/test_chunk_selection.py
+from app.services.chunk_selection import GAP_MARKER, build_context, select_chunks
+from app.services.chunking import estimate_tokens
+
+TOPICS = [
+    "La fotosíntesis convierte luz solar en energía química dentro del cloroplasto.",
+    "La mitosis divide el núcleo celular en dos núcleos hijos idénticos.",
+    "El ciclo de Krebs oxida acetil coenzima para liberar energía en la mitocondria.",
+    "Los ribosomas traducen el ARN mensajero y sintetizan proteínas.",
+]
+
+
+def _document(paras_per_topic: int = 6) -> str:
+    paras = []
+    for topic in TOPICS:
+        paras.extend([" ".join([topic] * 4)] * paras_per_topic)
+    return "\n\n".join(paras)
+
+
+def test_short_text_is_returned_whole():
+    text = "Un documento breve.\n\nCon dos párrafos."
+    assert build_context(text, budget_tokens=1000) == text
+
+
+def test_selection_respects_budget_and_keeps_document_order():
+    chunks = _document().split("\n\n")
+    budget = 4 * estimate_tokens(chunks[0])
+    picked = select_chunks(chunks, budget)
+    assert picked == sorted(picked)
+    assert sum(estimate_tokens(chunks[i]) for i in picked) <= budget
+    # sin redundancia: un chunk de cada tema, repartidos por todo el documento
+    assert sorted({chunks[i] for i in picked}) == sorted(" ".join([t] * 4) for t in TOPICS)
+
+
+def test_context_covers_the_whole_document():
+    text = _document()
+    context = build_context(text, budget_tokens=300, chunk_tokens=80)
+    assert estimate_tokens(context) <= 300 + 10
+    assert GAP_MARKER.strip() in context
+    for topic in TOPICS:
+        assert topic in context
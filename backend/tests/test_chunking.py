@@ -0,0 +1,42 @@
+# tests/test_chunking.py
+import time
+
+from app.services.chunking import chunk_budget_tokens, chunk_text, tokens_to_chars
+
+
+def test_text_without_blank_lines_is_split_by_sentences():
+    # Como sale de un PDF: sin líneas en blanco
+    text = " ".join(f"Oración número {i} del documento." for i in range(400))
+    chunks = chunk_text(text, max_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= tokens_to_chars(100) for c in chunks)
+    assert all(c.endswith(".") for c in chunks)  # nunca corta a mitad de oración
+    assert " ".join(chunks) == text
+
+
+def test_long_sentence_is_hard_split():
+    text = "palabra " * 5000
+    chunks = chunk_text(text, max_tokens=50)
+    assert all(len(c) <= tokens_to_chars(50) for c in chunks)
+    assert sum(c.count("palabra") for c in chunks) == 5000
+
+
+def test_overlap_repeats_tail_of_previous_chunk():
+    paras = [f"Párrafo {i}. " + "x" * 80 for i in range(30)]
+    chunks = chunk_text("\n\n".join(paras), max_tokens=100, overlap_tokens=30)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.split("\n\n")[0] in prev
+
+
+def test_budget_follows_model_context():
+    assert chunk_budget_tokens("gpt-4o-mini", 3000) == 3000
+    assert chunk_budget_tokens("desconocido", 10**9) < 16_385
+
+
+def test_linear_time_on_large_input():
+    text = ("Una frase corta. " * 20 + "\n") * 20000  # ~7 MB, sin párrafos
+    t0 = time.perf_counter()
+    chunks = chunk_text(text, max_tokens=3000)
+    assert time.perf_counter() - t0 < 5
+    assert len(chunks) > 100
@@ -22,15 +22,15 @@ def test_documents_list_with_auth_and_mock_service(monkeypatch):
     app.dependency_overrides[get_current_user] = override_get_current_user
 
     # 2) mockear servicio (evita DB real)
-    def fake_list(self, db, owner_id: int):
-        assert owner_id == 1
-        return {"items": [{"id": 10, "title": "demo", "description": None}]}
+    def fake_list(self, db, owner_id: int, *, limit: int, cursor=None):
+        assert owner_id == 1 and limit == 50 and cursor is None
+        return {"items": [{"id": 10, "title": "demo", "description": None}], "next_cursor": None}
 
     monkeypatch.setattr(DocumentService, "list", fake_list)
 
     client = TestClient(app)
     r = client.get("/documents", headers={"Authorization": "Bearer fake"})
     assert r.status_code == 200
-    assert r.json() == {"items": [{"id": 10, "title": "demo", "description": None}]}
+    assert r.json() == {"items": [{"id": 10, "title": "demo", "description": None}], "next_cursor": None}
 
     app.dependency_overrides.clear()
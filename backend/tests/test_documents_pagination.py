@@ -0,0 +1,46 @@
+# tests/test_documents_pagination.py
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.document_service import DocumentService, decode_cursor
+
+
+class _Db:
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = []
+
+    def execute(self, stmt):
+        self.sql.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+def _rows(n):
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        SimpleNamespace(id=100 - i, title=f"doc {i}", description=None, created_at=t0 - timedelta(minutes=i))
+        for i in range(n)
+    ]
+
+
+def test_keyset_page_projects_columns_and_returns_next_cursor():
+    db = _Db(_rows(3))  # limit=2 → pidió 3, hay página siguiente
+    out = DocumentService().list(db, owner_id=1, limit=2)
+
+    assert [d["id"] for d in out["items"]] == [100, 99]
+    assert decode_cursor(out["next_cursor"]) == (_rows(2)[1].created_at, 99)
+    sql = db.sql[0]
+    assert "documents.content" not in sql and "LIMIT" in sql and "OFFSET" not in sql
+
+    db = _Db(_rows(1))
+    out = DocumentService().list(db, owner_id=1, limit=2, cursor=out["next_cursor"])
+    assert out["next_cursor"] is None
+    assert "(studyforge.documents.created_at, studyforge.documents.id) < (" in db.sql[0]
+
+
+def test_invalid_cursor_is_a_value_error():
+    with pytest.raises(ValueError):
+        DocumentService().list(_Db([]), owner_id=1, cursor="no-es-un-cursor")
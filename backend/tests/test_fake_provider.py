@@ -0,0 +1,22 @@
+# tests/test_fake_provider.py
+import asyncio
+
+from app.services.fake_provider import FakeLlmProvider
+
+
+def test_fake_provider_is_deterministic():
+    prov = FakeLlmProvider(latency_ms=0)
+    a = asyncio.run(prov.summarize_text("la mitocondria produce energía", target_sentences=3))
+    b = asyncio.run(prov.summarize_text("la mitocondria produce energía", target_sentences=3))
+    assert a == b
+    assert a.count(".") == 3
+
+    quiz = asyncio.run(prov.generate_quiz("t", "la mitocondria produce energía", size=4))
+    assert len(quiz["questions"]) == 4
+    assert all(0 <= q["answer_index"] <= 3 and len(q["options"]) == 4 for q in quiz["questions"])
+
+
+def test_fake_provider_error_rate():
+    prov = FakeLlmProvider(latency_ms=0, error_rate=1.0)
+    assert asyncio.run(prov.summarize_text("texto", target_sentences=2)) is None
+    assert asyncio.run(prov.generate_quiz("t", "texto", size=3)) is None
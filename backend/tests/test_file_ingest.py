@@ -0,0 +1,144 @@
+# tests/test_file_ingest.py
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.services import file_ingest, pdf_pool
+from app.services.document_service import DocumentService
+from app.services.extraction_cache import ExtractionCache
+from app.services.file_ingest import FileTooLargeError, spool_upload
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    c = ExtractionCache(str(tmp_path / "extract.sqlite3"))
+    monkeypatch.setattr(file_ingest, "get_extraction_cache", lambda: c)
+    return c
+
+
+def make_pdf(pages):
+    """PDF mínimo con una línea de texto por página."""
+    w = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    for t in pages:
+        page = w.add_blank_page(200, 200)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 10 100 Td ({t}) Tj ET".encode())
+        page[NameObject("/Contents")] = w._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    out = io.BytesIO()
+    w.write(out)
+    return out.getvalue()
+
+
+class _Upload:
+    """UploadFile mínimo que registra el tamaño de cada read()."""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._buf = io.BytesIO(data)
+        self.reads = []
+
+    async def read(self, size=-1):
+        self.reads.append(size)
+        return self._buf.read(size)
+
+
+def test_pdf_is_extracted_page_by_page_from_the_spool(monkeypatch):
+    monkeypatch.setattr(file_ingest, "UPLOAD_CHUNK_BYTES", 256)
+    up = _Upload("Apuntes.PDF", make_pdf(["Hola mundo", "Segunda pagina"]))
+
+    out = asyncio.run(DocumentService().extract_text_from_file(up))
+
+    assert out == {"title": "apuntes", "description": "Hola mundoSegunda pagina", "content": "Hola mundoSegunda pagina"}
+    assert len(up.reads) > 2 and all(r == 256 for r in up.reads)  # nunca read() entero
+
+
+def test_txt_multibyte_across_chunks_and_size_limit(monkeypatch):
+    monkeypatch.setattr(file_ingest, "UPLOAD_CHUNK_BYTES", 3)
+    text = "ñandú " * 50
+    out = asyncio.run(DocumentService().extract_text_from_file(_Upload("a.txt", text.encode())))
+    assert out["content"] == text and out["description"] == " ".join(text.split())[:160]
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(spool_upload(_Upload("a.txt", b"x" * 100), max_bytes=10))
+    with pytest.raises(ValueError, match="Formato no permitido"):
+        asyncio.run(DocumentService().extract_text_from_file(_Upload("a.exe", b"")))
+    with pytest.raises(ValueError, match="PDF"):
+        asyncio.run(DocumentService().extract_text_from_file(_Upload("a.pdf", b"no es un pdf")))
+
+
+def test_pdf_page_ranges_run_in_the_process_pool_in_order(monkeypatch):
+    monkeypatch.setattr(pdf_pool, "PDF_POOL_WORKERS", 2)
+    monkeypatch.setattr(pdf_pool, "PDF_PAGES_PER_TASK", 2)
+    pages = [f"Pagina {i}" for i in range(7)]
+    up = _Upload("libro.pdf", make_pdf(pages))
+    try:
+        out = asyncio.run(DocumentService().extract_text_from_file(up))
+    finally:
+        pdf_pool.shutdown_pdf_pool()
+    assert out["content"] == "".join(pages)
+
+
+def test_full_pool_rejects_instead_of_queueing(monkeypatch):
+    monkeypatch.setattr(pdf_pool, "PDF_POOL_MAX_FILES", 0)
+    with pytest.raises(pdf_pool.ExtractionBusyError):
+        asyncio.run(DocumentService().extract_text_from_file(_Upload("a.pdf", make_pdf(["x"]))))
+
+
+def test_timed_out_file_keeps_its_slot_until_the_work_finishes(monkeypatch):
+    release = threading.Event()
+
+    def slow_count(path):
+        release.wait(5)
+        return 0
+
+    pdf_pool.shutdown_pdf_pool()
+    monkeypatch.setattr(pdf_pool, "PDF_POOL_WORKERS", 0)
+    monkeypatch.setattr(pdf_pool, "PDF_EXTRACT_TIMEOUT_S", 0.05)
+    monkeypatch.setattr(pdf_pool, "_count_pages", slow_count)
+    try:
+        with pytest.raises(pdf_pool.ExtractionBusyError, match="tardó"):
+            asyncio.run(pdf_pool.extract_pdf_pages("x.pdf"))
+        assert pdf_pool.pdf_pool_stats()["in_flight"] == 1  # el hilo sigue ocupado
+        release.set()
+        deadline = time.monotonic() + 2
+        while pdf_pool.pdf_pool_stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pdf_pool.pdf_pool_stats()["in_flight"] == 0
+    finally:
+        release.set()
+        pdf_pool.shutdown_pdf_pool()
+
+
+def test_repeated_upload_is_served_from_the_cache(monkeypatch, cache):
+    data = make_pdf(["Mismo apunte"])
+    first = asyncio.run(DocumentService().extract_text_from_file(_Upload("a.pdf", data)))
+
+    async def boom(path):
+        raise AssertionError("no debería volver a parsear")
+
+    monkeypatch.setattr(file_ingest, "extract_pdf_pages", boom)
+    again = asyncio.run(DocumentService().extract_text_from_file(_Upload("Otro Nombre.pdf", data)))
+
+    assert again == {**first, "title": "otro nombre"}
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["bytes_saved"] == len(data) and stats["hit_rate"] == 0.5
+
+
+def test_cache_evicts_least_recently_used_by_bytes(tmp_path):
+    c = ExtractionCache(str(tmp_path / "c.sqlite3"), max_bytes=200)
+    noise = lambda seed: "".join(chr(33 + (i * seed) % 90) for i in range(120))  # poco compresible
+    c.set("a", {"content": noise(7)}, 1)
+    c.set("b", {"content": noise(11)}, 1)
+    assert c.get("a") is None and c.get("b") is not None
+    assert c.stats()["disk_bytes"] <= 200 and c.stats()["evictions"] == 1
@@ -0,0 +1,27 @@
+# tests/test_http_pool.py
+import asyncio
+
+from app.services import http_pool
+
+
+def test_client_is_reused_within_a_loop_and_replaced_across_loops():
+    async def grab():
+        client = http_pool.get_http_client()
+        assert http_pool.get_http_client() is client
+        assert http_pool.get_openai_client("sk-test") is http_pool.get_openai_client()
+        return client
+
+    try:
+        first = asyncio.run(grab())
+
+        async def next_loop():
+            second = await grab()
+            await asyncio.sleep(0)  # deja correr el cierre programado
+            return second
+
+        second = asyncio.run(next_loop())
+        assert second is not first and first.is_closed and not second.is_closed
+        assert http_pool.http_pool_stats()["open"] is True
+    finally:
+        asyncio.run(http_pool.close_http_pool())
+    assert second.is_closed and http_pool.http_pool_stats()["open"] is False
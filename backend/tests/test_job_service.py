@@ -0,0 +1,185 @@
+# tests/test_job_service.py
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app import worker
+from app.repositories.models import Job
+from app.services import job_service
+from app.services.job_service import JobService, PermanentJobError
+
+
+class _Query:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *conds):
+        return self
+
+    def order_by(self, *cols):
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return 99 if self.rowcount else None  # id del INSERT ... RETURNING
+
+
+class _Db:
+    """Session mínima: registra lo que se agrega y las sentencias ejecutadas."""
+
+    def __init__(self, existing=(), rowcounts=()):
+        self.existing = list(existing)
+        self.rowcounts = list(rowcounts)
+        self.added = []
+        self.statements = []
+        self.params = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def query(self, model):
+        return _Query(self.existing)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def refresh(self, obj):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self, model, pk):
+        return _job(id=pk, status="pending")
+
+    def execute(self, stmt):
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        self.statements.append(str(compiled))
+        self.params.append(compiled.params)
+        return _Result(self.rowcounts.pop(0) if self.rowcounts else 0)
+
+
+def _job(**kw):
+    base = dict(id=1, kind="summary", status="running", user_id=1, document_id=2, params={}, attempts=1, max_attempts=3)
+    return Job(**{**base, **kw})
+
+
+def test_enqueue_reuses_an_active_job_with_same_params():
+    running = _job()
+    db = _Db(existing=[running])
+    assert JobService().enqueue(db, 1, "summary", 2) is running
+    assert db.added == [] and db.commits == 0
+
+    db = _Db(rowcounts=[1])
+    job = JobService().enqueue(db, 1, "quiz", 2, {"size": 8})
+    assert job.id == 99 and db.params[0]["params"] == {"size": 8}
+    # carrera con otra request: el índice único parcial absorbe el duplicado
+    sql = db.statements[0]
+    assert "ON CONFLICT (user_id, kind, document_id, params) WHERE status IN ('pending', 'running')" in sql
+    assert "DO NOTHING RETURNING studyforge.jobs.id" in sql
+
+
+def test_mark_failed_backs_off_exponentially_then_fails(monkeypatch):
+    monkeypatch.setattr(job_service.random, "uniform", lambda a, b: 1.0)
+    monkeypatch.setattr(job_service, "JOB_BACKOFF_BASE_S", 5)
+    svc, db = JobService(), _Db(rowcounts=[1, 1, 1, 0])
+    delays = []
+    job = _job(locked_by="w", locked_at=datetime.now(timezone.utc))
+    for attempts in (1, 2):
+        job.attempts = attempts
+        before = datetime.now(timezone.utc)
+        assert svc.mark_failed(db, job, "boom", worker_id="w") == "pending"
+        params = db.params[-1]
+        assert params["locked_by"] is None
+        delays.append(round((params["run_after"] - before).total_seconds()))
+    assert delays == [5, 10]
+
+    job.attempts = 3
+    assert svc.mark_failed(db, job, "boom", worker_id="w") == "failed"
+    assert db.params[-1]["status"] == "failed" and db.params[-1]["error"] == "boom"
+    # sólo escribe si el job sigue siendo de este worker
+    assert "studyforge.jobs.locked_by = %(locked_by_1)s" in db.statements[-1]
+    assert db.params[-1]["locked_by_1"] == "w" and db.params[-1]["status_1"] == "running"
+    # lease vencido y re-tomado por otro: no pisa nada
+    assert svc.mark_failed(db, job, "boom", worker_id="w") is None
+
+
+def test_mark_done_does_not_overwrite_a_new_owner():
+    svc, db = JobService(), _Db(rowcounts=[1, 0])
+    assert svc.mark_done(db, _job(), {"summary_id": 3}, worker_id="w") is True
+    assert db.params[0]["status"] == "done" and db.params[0]["result"] == {"summary_id": 3}
+    assert svc.mark_done(db, _job(), {"summary_id": 3}, worker_id="w") is False
+
+
+def test_requeue_stale_fails_exhausted_jobs_and_claim_skips_them():
+    db = _Db(rowcounts=[1, 2])
+    assert JobService().requeue_stale(db, lease_s=60) == 3
+    failed, requeued = db.statements
+    assert "status=%(status)s" in failed and "jobs.attempts >= studyforge.jobs.max_attempts" in failed
+    assert "jobs.attempts < studyforge.jobs.max_attempts" in requeued and "run_after=" in requeued
+
+    class _Scalars:
+        def first(self):
+            return None
+
+    class _Exec(_Db):
+        def execute(self, stmt):
+            super().execute(stmt)
+            return type("R", (), {"scalars": lambda self: _Scalars()})()
+
+    db = _Exec()
+    assert JobService().claim(db, "w") is None
+    assert "jobs.attempts < studyforge.jobs.max_attempts" in db.statements[0] and "SKIP LOCKED" in db.statements[0]
+
+
+def test_permanent_error_fails_without_retry(monkeypatch):
+    job = _job(attempts=1)
+    db = _Db(rowcounts=[1])
+
+    class _Jobs(JobService):
+        def claim(self, db, worker_id):
+            return job
+
+        async def run(self, db, job):
+            raise PermanentJobError("Document not found")
+
+    monkeypatch.setattr(worker, "jobs", _Jobs())
+    monkeypatch.setattr(worker, "SessionLocal", lambda: db)
+    assert asyncio.run(worker._process_one("w")) is True
+    assert db.params[0]["status"] == "failed" and db.params[0]["error"] == "Document not found"
+    assert db.rollbacks == 1
+
+
+def test_heartbeat_refreshes_the_lease_while_the_job_runs(monkeypatch):
+    job = _job()
+    db = _Db(rowcounts=[1] * 10)
+
+    class _Jobs(JobService):
+        def claim(self, db, worker_id):
+            return job
+
+        async def run(self, db, job):
+            await asyncio.sleep(0.05)
+            return {"summary_id": 9}
+
+    monkeypatch.setattr(worker, "JOB_HEARTBEAT_S", 0.01)
+    monkeypatch.setattr(worker, "jobs", _Jobs())
+    monkeypatch.setattr(worker, "SessionLocal", lambda: db)
+    asyncio.run(worker._process_one("w"))
+    done = [p for p in db.params if p.get("status") == "done"]
+    assert done and done[0]["result"] == {"summary_id": 9}
+    beats = [s for s in db.statements if "locked_at=" in s]
+    assert beats and all("locked_by = %(locked_by_1)s" in s for s in beats)
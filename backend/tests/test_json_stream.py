@@ -0,0 +1,31 @@
+# tests/test_json_stream.py
+import json
+
+from app.services.json_stream import QuizStreamParser, parse_questions_prefix
+
+QUESTIONS = [
+    {"question": "¿Qué es {x}?", "options": ["a", "b \"c\"", "}", "]"], "answer_index": 1, "explanation": "x\\y"},
+    {"question": "¿Y [esto]?", "options": ["1", "2", "3", "4"], "answer_index": 0, "explanation": "ok"},
+    {"question": "¿Último?", "options": ["w", "x", "y", "z"], "answer_index": 3, "explanation": "fin"},
+]
+RAW = "```json\n" + json.dumps({"title": "Célula", " \"questions\" ": QUESTIONS}, ensure_ascii=False, indent=2) + "\n```"
+
+
+def test_questions_are_emitted_as_soon_as_each_object_closes():
+    parser = QuizStreamParser()
+    seen = []
+    for i, c in enumerate(RAW):
+        for q in parser.feed(c):
+            seen.append((q, i))
+
+    assert [q for q, _ in seen] == QUESTIONS
+    # la primera sale bastante antes del final del texto
+    assert seen[0][1] < len(RAW) // 2
+    assert parser.title == "Célula"
+    assert parser.done
+
+
+def test_truncated_stream_keeps_the_valid_prefix():
+    cut = RAW.index("¿Último?") + 5
+    assert parse_questions_prefix(RAW[:cut]) == QUESTIONS[:2]
+    assert parse_questions_prefix("no hay json") == []
@@ -0,0 +1,72 @@
+# tests/test_llm_cache.py
+import asyncio
+
+from app.services.llm_cache import CachedLlmProvider, LlmResponseCache
+from app.services.llm_provider import LlmProvider
+
+
+class CountingProvider(LlmProvider):
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def cache_params(self, op):
+        return {"model": "m1"}
+
+    async def summarize_text(self, text, *, target_sentences, timeout_s=12.0):
+        self.calls += 1
+        return f"resumen de {text} en {target_sentences}"
+
+    async def generate_quiz(self, title, text, *, size=6, timeout_s=20.0, avoid=None):
+        self.calls += 1
+        return {"questions": [{"question": text, "options": ["a", "b"], "answer_index": 0}] * size}
+
+
+def test_cached_provider_hits_memory_and_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    inner = CountingProvider()
+    prov = CachedLlmProvider(inner, LlmResponseCache(path, ttl_s=60))
+
+    a = asyncio.run(prov.summarize_text("hola", target_sentences=3))
+    b = asyncio.run(prov.summarize_text("hola", target_sentences=3))
+    c = asyncio.run(prov.summarize_text("hola", target_sentences=4))  # otros params → otra clave
+    assert a == b
+    assert c != a
+    assert inner.calls == 2
+
+    q1 = asyncio.run(prov.generate_quiz("t", "texto", size=3))
+    q2 = asyncio.run(prov.generate_quiz("t", "texto", size=3))
+    assert q1 == q2
+    assert inner.calls == 3
+
+    # Otra instancia (memoria vacía) reutiliza el nivel SQLite
+    cold = LlmResponseCache(path, ttl_s=60)
+    prov2 = CachedLlmProvider(inner, cold)
+    assert asyncio.run(prov2.summarize_text("hola", target_sentences=3)) == a
+    assert inner.calls == 3
+    assert cold.stats()["disk_hits"] == 1
+
+
+def test_cache_ttl_and_lru_eviction():
+    cache = LlmResponseCache("", ttl_s=60, max_memory_items=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")          # "a" pasa a ser el más reciente
+    cache.set("c", "3")     # expulsa "b"
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    expired = LlmResponseCache("", ttl_s=-1)
+    expired.set("k", "v")
+    assert expired.get("k") is None
+    assert expired.stats()["expired"] == 1
+
+
+def test_cache_opens_sqlite_on_first_use(tmp_path):
+    path = tmp_path / "sub" / "cache.sqlite3"
+    cache = LlmResponseCache(str(path), ttl_s=60)
+    assert not path.exists()  # construirla (al importar un router) no toca el disco
+
+    assert cache.get("k") is None
+    assert path.exists()
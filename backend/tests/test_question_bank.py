@@ -0,0 +1,95 @@
+# tests/test_question_bank.py
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import question_bank
+from app.services.question_bank import QuestionBankService
+
+
+class _Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class _FakeDb:
+    """Sólo lo que usa refill(): la lectura de preguntas existentes."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Rows(self.existing)
+
+
+class _Provider:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_quiz(self, title, text, *, size=6, timeout_s=20.0, avoid=None):
+        self.calls.append((text.split()[0], size, list(avoid or [])))
+        topic = text.split()[0]
+        qs = [
+            {"question": f"¿{topic} {i}?", "options": ["a", "b", "c", "d"], "answer_index": 2, "explanation": "x"}
+            for i in range(size)
+        ]
+        qs.append({"question": f"¿{topic.upper()}   0?", "options": ["a", "b"], "answer_index": 0})  # duplicada
+        return {"questions": qs}
+
+
+def _bank(prov):
+    bank = QuestionBankService(prov)
+    bank.added = []
+
+    def add(db, rows, commit=True):
+        bank.added.extend(rows)
+        return {r["text_hash"]: i for i, r in enumerate(rows)}
+
+    bank.add = add
+    return bank
+
+
+def test_refill_targets_least_covered_sections_and_dedupes():
+    doc = SimpleNamespace(id=7, title="Bio", content="\n\n".join(f"{t} " + "palabra " * 300 for t in ("alfa", "beta", "gamma")))
+    prov = _Provider()
+    bank = _bank(prov)
+    # alfa ya tiene 2 preguntas en el banco, beta 1, gamma ninguna
+    db = _FakeDb([(0, "¿alfa vieja 1?"), (0, "¿alfa vieja 2?"), (1, "¿beta vieja?")])
+
+    inserted = asyncio.run(bank.refill(db, doc, needed=8))
+
+    assert [c[0] for c in prov.calls] == ["gamma", "beta"]
+    assert prov.calls[1][2] == ["¿beta vieja?"]  # se le pide no repetir lo existente
+    assert inserted == len(bank.added) == 8
+    assert {r["chunk_index"] for r in bank.added} == {1, 2}
+    assert all(r["document_id"] == 7 and len(r["text_hash"]) == 64 for r in bank.added)
+
+
+def test_fresh_document_refills_from_selected_chunks_not_the_first_ones(monkeypatch):
+    topics = ("alfa", "beta", "gamma", "delta")
+    doc = SimpleNamespace(id=7, title="Bio", content="\n\n".join(f"{t} " + "palabra " * 300 for t in topics))
+    monkeypatch.setattr(question_bank, "select_chunks", lambda chunks, budget: [1, 3])
+    prov = _Provider()
+
+    asyncio.run(_bank(prov).refill(_FakeDb([]), doc, needed=8))
+
+    assert sorted(c[0] for c in prov.calls) == ["beta", "delta"]
+
+
+def test_sample_query_compiles_for_postgres():
+    captured = {}
+
+    class _Db:
+        def execute(self, stmt):
+            captured["sql"] = str(stmt.compile(dialect=postgresql.dialect()))
+            return SimpleNamespace(all=lambda: [])
+
+    assert QuestionBankService(_Provider()).sample(_Db(), user_id=1, document_id=2, size=5) == []
+    sql = captured["sql"]
+    assert "row_number() OVER (PARTITION BY" in sql and "LIMIT" in sql
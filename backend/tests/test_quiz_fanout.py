@@ -0,0 +1,133 @@
+# tests/test_quiz_fanout.py
+import asyncio
+from types import SimpleNamespace
+
+from app.services import quiz_service
+from app.services.quiz_parsing import merge_questions, normalize_question
+from app.services.quiz_service import QuizService
+
+
+def _q(text):
+    return {"question": text, "options": ["a", "b", "c", "d"], "answer_index": 1, "explanation": "porque sí"}
+
+
+class _SectionProvider:
+    """Devuelve preguntas según la sección; la que habla de 'ribosomas' falla."""
+
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_quiz(self, title, text, *, size=6, timeout_s=20.0):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if "ribosomas" in text:
+            return None
+        if "mitosis" in text:
+            raise RuntimeError("JSON inválido")
+        topic = text.split()[1]
+        qs = [_q(f"¿Qué hace {topic}? ({i})") for i in range(size)]
+        qs.append(_q(f"¿qué hace {topic}?  (0)"))  # duplicada (mayúsculas/espacios)
+        qs.append({"question": "sin opciones", "options": []})  # inválida
+        return {"title": "Biología", "questions": qs}
+
+
+def test_normalize_question_pads_options_and_clamps_index():
+    q = normalize_question({' "question" ': "¿X?", "options": ["1", "2"], "answer_index": 7})
+    assert q == {"question": "¿X?", "options": ["1", "2", "", ""], "answer_index": 0, "explanation": None}
+    assert normalize_question({"question": "", "options": ["a", "b"]}) is None
+
+
+def test_merge_interleaves_sections_dedupes_and_trims():
+    a = [_q("A1"), _q("A2"), _q("A3")]
+    b = [_q("B1"), _q("a1"), _q("B2")]
+    merged = [q["question"] for q in merge_questions([a, b], 4)]
+    assert merged == ["A1", "B1", "A2", "A3"]
+
+
+def test_fanout_keeps_the_valid_subset_when_sections_fail():
+    # 3 secciones de 2 temas: la 1.ª lanza, la 2.ª devuelve None, la 3.ª sirve
+    topics = ["fotosíntesis", "mitosis", "ribosomas", "membrana", "vacuola", "pared"]
+    text = "\n\n".join(f"La {t} " + " ".join([f"describe el papel de la {t} en la célula."] * 20) for t in topics)
+    svc = QuizService()
+    svc.prov = _SectionProvider()
+
+    title, questions = asyncio.run(svc._generate_fanout("Bio", text, 9))
+
+    assert title == "Biología"
+    assert svc.prov.calls == 3
+    assert svc.prov.peak > 1  # las secciones se piden en paralelo
+    texts = [q["question"] for q in questions]
+    assert len(texts) == len(set(t.lower() for t in texts)) <= 9
+    assert texts and all("vacuola" in t for t in texts)
+
+
+class _StreamProvider:
+    """Emite dos preguntas (una repetida) y después se corta."""
+
+    name = "fake"
+
+    async def stream_quiz_questions(self, *, title, text, size, timeout_s=20.0, avoid=None):
+        yield _q("¿Qué es la célula?")
+        yield _q("¿qué es la célula? ")  # duplicada: no se guarda
+        yield _q("¿Qué es el núcleo?")
+        raise RuntimeError("stream cortado")
+
+
+class _StreamDb:
+    def __init__(self):
+        self.quiz = None
+        self.deleted = []
+        self.commits = 0
+
+    def query(self, model):
+        doc = SimpleNamespace(id=7, title="Biología", content_hash=None, content="La célula " * 50)
+        return SimpleNamespace(filter=lambda *a: SimpleNamespace(first=lambda: doc))
+
+    def add(self, obj):
+        self.quiz = obj
+
+    def refresh(self, obj):
+        obj.id, obj.created_at = 42, None
+
+    def commit(self):
+        self.commits += 1
+
+    def delete(self, obj):
+        self.deleted.append(obj)
+
+
+class _StreamRepo:
+    def __init__(self):
+        self.saved = []
+
+    def insert_questions(self, db, quiz_id, questions):
+        self.saved.extend((quiz_id, q["question"]) for q in questions)
+        return [len(self.saved)]
+
+
+def test_stream_auto_persists_as_it_goes_and_keeps_questions_on_error(monkeypatch):
+    monkeypatch.setattr(quiz_service, "QUIZ_BANK_ENABLED", False)
+    svc = QuizService()
+    svc.prov, svc.repo = _StreamProvider(), _StreamRepo()
+    db = _StreamDb()
+
+    async def collect():
+        out = []
+        async for event, data in svc.stream_auto(db, 1, 7, size=5):
+            # cada pregunta ya está guardada cuando se emite
+            if event == "question":
+                assert svc.repo.saved[-1] == (42, data["question"])
+            out.append((event, data))
+        return out
+
+    events = asyncio.run(collect())
+
+    assert [e for e, _ in events] == ["quiz", "question", "question", "done"]
+    assert svc.repo.saved == [(42, "¿Qué es la célula?"), (42, "¿Qué es el núcleo?")]
+    assert events[-1][1] == {"quiz_id": 42, "size": 2, "partial": True, "detail": "AI provider error: stream cortado"}
+    assert db.deleted == [] and db.quiz.size == 2  # el quiz conserva lo ya emitido
@@ -0,0 +1,67 @@
+# tests/test_quiz_repo.py
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.repositories.quiz_repo import QuizRepo
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+
+class _Db:
+    def __init__(self, row):
+        self.row = row
+        self.calls = []
+
+    def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+        return _Result(self.row)
+
+
+def test_quiz_and_questions_go_in_a_single_statement():
+    now = datetime.now(timezone.utc)
+    db = _Db((42, now, 2))
+    questions = [
+        {"question": "¿A?", "options": ["1", "2", "3", "4"], "answer_index": 2, "explanation": "e", "bank_question_id": 9},
+        {"question": "¿B?", "options": ["x", "y", "", ""], "answer_index": 0, "explanation": None},
+    ]
+
+    quiz = QuizRepo().create_with_questions(db, user_id=1, document_id=3, title="Quiz", questions=questions)
+
+    assert len(db.calls) == 1
+    stmt, params = db.calls[0]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.count("INSERT INTO studyforge.") == 2 and "jsonb_to_recordset" in sql
+    rows = json.loads(params["questions"])
+    assert [r["ord"] for r in rows] == [0, 1]
+    assert rows[0]["options_json"] == ["1", "2", "3", "4"]
+    assert rows[0]["bank_question_id"] == 9 and rows[1]["bank_question_id"] is None
+    assert (quiz.id, quiz.size, quiz.created_at, quiz.document_id) == (42, 2, now, 3)
+
+
+def test_get_json_is_one_query_shaped_by_postgres():
+    class _Scalar:
+        def scalar_one_or_none(self):
+            return '{"id": 5, "questions": []}'
+
+    calls = []
+
+    class _JsonDb:
+        def execute(self, stmt, params=None):
+            calls.append((str(stmt), params))
+            return _Scalar()
+
+    body = QuizRepo().get_json(_JsonDb(), user_id=1, quiz_id=5)
+
+    assert body == '{"id": 5, "questions": []}'
+    assert len(calls) == 1
+    sql, params = calls[0]
+    assert "json_agg" in sql and "::text" in sql
+    assert params == {"quiz_id": 5, "user_id": 1}
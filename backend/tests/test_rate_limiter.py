@@ -0,0 +1,74 @@
+# tests/test_rate_limiter.py
+import asyncio
+import time
+
+from app.services.rate_limiter import AdaptiveConcurrency, ModelRateLimiter, TokenBucket
+
+
+def test_token_bucket_queues_reservations_beyond_burst():
+    bucket = TokenBucket(rate_per_min=60, capacity=2)  # 1/s
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    wait = bucket.reserve(1)
+    assert 0.9 < wait <= 1.0
+    # la siguiente espera detrás de la anterior
+    assert 1.9 < bucket.reserve(1) <= 2.0
+
+
+def test_aimd_halves_on_throttle_and_probes_up_slowly():
+    c = AdaptiveConcurrency(initial=8, minimum=1, maximum=16, backoff=0.5)
+    c.on_throttle()
+    assert c.limit == 4
+    for _ in range(4):
+        c.on_success()
+    assert 4.9 < c.limit < 5.1
+    for _ in range(10):
+        c.on_throttle()
+    assert c.limit == 1
+
+
+def test_slot_limits_concurrency_and_honors_retry_after():
+    async def main():
+        lim = ModelRateLimiter("m", rpm=0, tpm=0, initial_concurrency=2, min_concurrency=1, max_concurrency=4)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with lim.slot():
+                peak = max(peak, lim.concurrency.in_flight)
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert peak == 2
+
+        lim.on_throttle(0.1)
+        assert lim.concurrency.limit == 1
+        t0 = time.monotonic()
+        await call()
+        return time.monotonic() - t0, lim.stats()
+
+    elapsed, stats = asyncio.run(main())
+    assert elapsed >= 0.1
+    assert stats["throttled"] == 1 and stats["calls"] == 7
+
+
+def test_limiter_survives_a_new_event_loop_and_sleeps_without_a_permit():
+    lim = ModelRateLimiter("m", rpm=0, tpm=0, initial_concurrency=1, min_concurrency=1, max_concurrency=1)
+
+    async def once():
+        async with lim.slot():
+            await asyncio.sleep(0)
+
+    asyncio.run(once())
+    asyncio.run(once())  # otro loop: la Condition se recrea
+
+    async def paused():
+        lim.on_throttle(0.1)
+        waiter = asyncio.create_task(once())
+        await asyncio.sleep(0.02)
+        # durante la pausa no se ocupa el único lugar
+        assert lim.concurrency.in_flight == 0
+        await waiter
+
+    asyncio.run(paused())
+    assert lim.stats()["calls"] == 3 and lim.stats()["in_flight"] == 0
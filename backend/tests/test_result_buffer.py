@@ -0,0 +1,111 @@
+# tests/test_result_buffer.py
+import json
+import time
+
+from app.repositories.quiz_repo import QuizRepo
+from app.services.result_buffer import ResultWriteBehind
+
+
+class _Db:
+    def __init__(self, log, fail=False, stats=None):
+        self.log = log
+        self.stats = stats if stats is not None else []
+        self.fail = fail
+
+    def execute(self, stmt, params):
+        if self.fail:
+            raise RuntimeError("db caída")
+        if "results" not in params:
+            self.stats.append(json.loads(params["rows"]))
+            return None
+        rows = json.loads(params["results"])
+        self.log.append(rows)
+        return type("R", (), {"rowcount": len(rows)})()
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_batches_by_size_and_flushes_on_close():
+    batches = []
+    buf = ResultWriteBehind(lambda: _Db(batches), batch_size=3, flush_interval_s=60)
+    for i in range(3):
+        buf.record(quiz_id=1, user_id=2, score=i, total=2, answers=[0, True, 3])
+
+    deadline = time.time() + 2
+    while not batches and time.time() < deadline:
+        time.sleep(0.01)
+    assert [len(b) for b in batches] == [3]  # lote por tamaño, sin esperar el intervalo
+    assert batches[0][0]["answers"] == [0, None]  # recortadas a total; no-int → null
+
+    buf.record(quiz_id=1, user_id=2, score=3, total=2, answers=[1])
+    buf.close()
+    assert [len(b) for b in batches] == [3, 1]
+    assert buf.stats() == {"enqueued": 4, "written": 4, "dropped": 0, "batches": 2, "errors": 0, "pending": 0}
+
+
+def test_failed_batch_is_kept_for_retry_and_bounded():
+    buf = ResultWriteBehind(lambda: _Db([], fail=True), batch_size=10, flush_interval_s=60, max_pending=3)
+    buf._closed = True  # sin hilo de fondo: flush manual
+    for i in range(5):
+        buf.record(quiz_id=1, user_id=2, score=i, total=1, answers=[0])
+
+    assert buf.flush() == 0
+    stats = buf.stats()
+    assert stats["pending"] == 3 and stats["dropped"] == 2 and stats["errors"] == 1
+    assert [r["score"] for r in buf._pending] == [2, 3, 4]  # se conservan los más nuevos, en orden
+
+    batches = []
+    buf.session_factory = lambda: _Db(batches)
+    assert buf.flush() == 3
+
+
+def test_insert_results_skips_empty_batches():
+    assert QuizRepo().insert_results(None, []) == 0
+
+
+def test_stats_are_incremented_per_batch_aggregated_by_key():
+    stats = []
+    buf = ResultWriteBehind(lambda: _Db([], stats=stats), batch_size=10, flush_interval_s=60)
+    buf._closed = True
+    buf.record(7, 1, 1, 2, [0, 1], question_ids=[70, 71], correct=[True, False])
+    buf.record(7, 2, 2, 2, [0, 2], question_ids=[70, 71], correct=[True, True])
+    buf.record(3, 1, 0, 1, [1], question_ids=[30], correct=[False])
+    buf.flush()
+
+    quizzes, questions = stats
+    assert quizzes == [
+        {"quiz_id": 3, "attempts": 1, "score_sum": 0, "total_sum": 1},
+        {"quiz_id": 7, "attempts": 2, "score_sum": 3, "total_sum": 4},
+    ]
+    assert questions == [
+        {"question_id": 30, "attempts": 1, "correct": 0},
+        {"question_id": 70, "attempts": 2, "correct": 2},
+        {"question_id": 71, "attempts": 2, "correct": 1},
+    ]
+
+
+def test_dropped_attempts_still_count_in_stats():
+    stats = []
+    buf = ResultWriteBehind(lambda: _Db([], fail=True), batch_size=10, flush_interval_s=60, max_pending=2)
+    buf._closed = True
+    buf.record(7, 1, 1, 2, [0, 1], question_ids=[70, 71], correct=[True, False])
+    buf.record(7, 2, 2, 2, [0, 2], question_ids=[70, 71], correct=[True, True])
+    buf.record(7, 3, 0, 2, [1, 1], question_ids=[70, 71], correct=[False, False])  # descarta el 1.º
+    assert buf.flush() == 0  # falla: el lote vuelve y los contadores descartados se conservan
+    buf.record(7, 4, 2, 2, [0, 2], question_ids=[70, 71], correct=[True, True])  # descarta el 2.º
+
+    batches = []
+    buf.session_factory = lambda: _Db(batches, stats=stats)
+    assert buf.flush() == 2
+    assert buf.stats()["dropped"] == 2
+    quizzes, questions = stats
+    # los 4 intentos cuentan, aunque sólo 2 lleguen a quiz_results
+    assert quizzes == [{"quiz_id": 7, "attempts": 4, "score_sum": 5, "total_sum": 8}]
+    assert questions == [
+        {"question_id": 70, "attempts": 4, "correct": 3},
+        {"question_id": 71, "attempts": 4, "correct": 2},
+    ]
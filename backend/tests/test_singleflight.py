@@ -0,0 +1,47 @@
+# tests/test_singleflight.py
+import asyncio
+
+from app.services.singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    sf = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        key = flight_key("quiz", "mismo documento", size=6)
+        other = flight_key("quiz", "mismo documento", size=8)
+        results = await asyncio.gather(*(sf.do(key, compute) for _ in range(30)), sf.do(other, compute))
+        return results
+
+    results = asyncio.run(main())
+    assert calls == 2
+    assert all(r == {"ok": True} for r in results)
+    assert sf.stats == {"leaders": 2, "followers": 29}
+    assert sf.in_flight() == 0
+
+
+def test_errors_propagate_to_every_waiter_and_key_is_released():
+    sf = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("AI down")
+
+    async def main():
+        return await asyncio.gather(*(sf.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert sf.in_flight() == 0
+
+    async def ok():
+        return 1
+
+    assert asyncio.run(sf.do("k", ok)) == 1
@@ -0,0 +1,117 @@
+# tests/test_summary_map.py
+import asyncio
+import time
+
+import pytest
+
+from app.services import summary_service
+from app.services.llm_provider import LlmProvider
+
+
+class FakeProvider(LlmProvider):
+    name = "fake"
+
+    def __init__(self, fail_on=None, delay=0.05):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.calls = 0
+
+    async def summarize_text(self, text, *, target_sentences, timeout_s=12.0):
+        self.calls += 1
+        if self.fail_on and self.fail_on in text:
+            return None
+        await asyncio.sleep(self.delay)
+        return f"S({text[:6]})"
+
+
+def test_map_phase_keeps_order_and_runs_concurrently():
+    prov = FakeProvider(delay=0.1)
+    chunks = [f"chunk{i}" for i in range(8)]
+
+    t0 = time.perf_counter()
+    out = asyncio.run(summary_service._summarize_chunks(prov, chunks, per_chunk=2, concurrency=8))
+    elapsed = time.perf_counter() - t0
+
+    assert out == [f"S(chunk{i})" for i in range(8)]
+    assert elapsed < 0.5  # serial serían ~0.8 s
+
+
+def test_map_phase_fails_fast():
+    prov = FakeProvider(fail_on="chunk0", delay=0.2)
+    chunks = [f"chunk{i}" for i in range(20)]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(summary_service._summarize_chunks(prov, chunks, per_chunk=2, concurrency=2))
+    # Los chunks pendientes se cancelan: no se llega a llamar a los 20
+    assert prov.calls < len(chunks)
+
+
+class ReduceProvider(LlmProvider):
+    name = "fake"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def summarize_text(self, text, *, target_sentences, timeout_s=12.0):
+        self.prompts.append(text)
+        return "x" * 50
+
+
+def test_tree_reduce_respects_fan_in_and_budget():
+    prov = ReduceProvider()
+    partials = ["p" * 50 for _ in range(100)]
+
+    out = asyncio.run(
+        summary_service._tree_reduce(prov, partials, 5, fan_in=4, max_chars=1000, level_sentences=[3])
+    )
+
+    assert out == "x" * 50
+    # 100 → 25 → 7 → 2 → final: 25 + 7 + 2 + 1 llamadas
+    assert len(prov.prompts) == 35
+    assert max(len(p) for p in prov.prompts) <= 1000
+
+
+
+class VerboseProvider(LlmProvider):
+    """Nunca acorta: cada "resumen" es tan largo como el presupuesto entero."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def summarize_text(self, text, *, target_sentences, timeout_s=12.0):
+        self.prompts.append(text)
+        return "palabra " * 125
+
+
+def test_tree_reduce_truncates_partials_when_levels_run_out():
+    prov = VerboseProvider()
+    partials = ["p" * 50 for _ in range(100)]
+
+    out = asyncio.run(
+        summary_service._tree_reduce(prov, partials, 5, fan_in=4, max_chars=1000, level_sentences=[3])
+    )
+
+    assert out == "palabra " * 125
+    # se agotan los niveles y aun así el reduce final respeta el presupuesto
+    assert len(prov.prompts) > summary_service.SUMMARY_REDUCE_MAX_LEVELS
+    assert len(prov.prompts[-1]) <= 1000
+    assert not prov.prompts[-1].split("\n\n")[0].endswith(" ")
+
+def test_summarize_stream_emits_progress_then_deltas(monkeypatch):
+    prov = FakeProvider(delay=0.01)
+    monkeypatch.setattr(summary_service, "_choose_provider", lambda: prov)
+    text = "\n\n".join(f"Párrafo {i}. " + "x" * 3000 for i in range(5))
+
+    async def _collect():
+        return [e async for e in summary_service.summarize_stream("t", text, max_sentences=3)]
+
+    events = asyncio.run(_collect())
+    names = [name for name, _ in events]
+
+    assert names[0] == "start"
+    assert names.count("chunk") == events[0][1]["chunks"]
+    assert names.index("delta") > max(i for i, n in enumerate(names) if n == "chunk")
+    assert events[-1][0] == "final"
+    assert events[-1][1]["content"].startswith("S(")
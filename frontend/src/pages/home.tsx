@@ -4,15 +4,26 @@ import { health, listDocuments, createDocument, type DocumentOut } from "../serv
 export default function Home() {
   const [status, setStatus] = useState("checking...");
   const [docs, setDocs] = useState<DocumentOut[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [title, setTitle] = useState("");
   const [desc, setDesc] = useState("");
   const [content, setContent] = useState("");
 
   useEffect(() => {
     health().then(h => setStatus(h.status)).catch(() => setStatus("down"));
-    listDocuments().then(d => setDocs(d.items)).catch(console.error);
+    listDocuments().then(d => { setDocs(d.items); setNextCursor(d.next_cursor ?? null); }).catch(console.error);
   }, []);
 
+  async function onLoadMore() {
+    try {
+      const page = await listDocuments(nextCursor);
+      setDocs(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch (err) {
+      console.error(err);
+    }
+  }
+
   async function onCreate(e: React.FormEvent) {
     e.preventDefault();
     if (!title.trim() || !content.trim()) {
@@ -73,6 +84,11 @@ export default function Home() {
             ))}
           </ul>
         )}
+        {nextCursor && (
+          <button className="px-3 py-1 border rounded text-sm" onClick={onLoadMore}>
+            Cargar más
+          </button>
+        )}
       </div>
     </div>
   );
@@ -12,6 +12,7 @@ export interface DocumentOut {
 }
 export interface DocumentListOut {
   items: DocumentOut[];
+  next_cursor?: string | null;
 }
 
 export async function health(): Promise<{ status: string }> {
@@ -20,8 +21,11 @@ export async function health(): Promise<{ status: string }> {
   return r.json();
 }
 
-export async function listDocuments(): Promise<DocumentListOut> {
-  const r = await fetch(`${API}/documents`);
+// GET /documents pagina por cursor: una página por llamada; la siguiente
+// se pide con el next_cursor de la anterior (null = no hay más)
+export async function listDocuments(cursor?: string | null): Promise<DocumentListOut> {
+  const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  const r = await fetch(`${API}/documents${qs}`);
   if (!r.ok) throw new Error(`List failed: ${r.status}`);
   return r.json();
 }